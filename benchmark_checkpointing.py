@@ -0,0 +1,61 @@
+import argparse
+import multiprocessing
+import resource
+import time
+
+import torch
+
+from deepNormalize.models.unet3d import Unet, CHECKPOINTING
+
+
+def max_rss():
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def time_steps(checkpointing: str, batch_size: int, patch_size: int, steps: int, warmup: int, results):
+    torch.manual_seed(0)
+    model = Unet(1, 4, checkpointing=checkpointing)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.001, momentum=0.9)
+    inputs = torch.rand(batch_size, 1, patch_size, patch_size, patch_size)
+    target = torch.randint(0, 4, (batch_size, patch_size, patch_size, patch_size))
+    baseline = max_rss()
+
+    timings = []
+    for step in range(warmup + steps):
+        start = time.time()
+        optimizer.zero_grad()
+        loss = torch.nn.functional.cross_entropy(model(inputs), target)
+        loss.backward()
+        optimizer.step()
+        if step >= warmup:
+            timings.append(time.time() - start)
+
+    results.put((sum(timings) / len(timings), max_rss() - baseline))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CPU peak memory and step time of the 3D UNet per checkpointing "
+                                                 "granularity.")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--patch-sizes", type=int, nargs="+", default=[32, 64])
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    args = parser.parse_args()
+
+    # Every configuration runs in a fresh process, ru_maxrss only ever grows within a process.
+    context = multiprocessing.get_context("spawn")
+    print("{:<8}{:<18}{:>12}{:>16}{:>10}".format("patch", "checkpointing", "step (ms)", "peak mem (MB)", "memory"))
+    for patch_size in args.patch_sizes:
+        baseline = None
+        for checkpointing in CHECKPOINTING.keys():
+            results = context.Queue()
+            process = context.Process(target=time_steps, args=(
+                checkpointing, args.batch_size, patch_size, args.steps, args.warmup, results))
+            process.start()
+            step_time, peak_memory = results.get()
+            process.join()
+            baseline = peak_memory if baseline is None else baseline
+            print("{:<8}{:<18}{:>12.1f}{:>16.1f}{:>10.2f}".format(
+                "{}^3".format(patch_size), checkpointing, step_time * 1000, peak_memory / 1024 ** 2,
+                peak_memory / baseline))
@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import torch
+
+from deepNormalize.metrics.metrics import batch_histogram
+
+
+def histc_loop(images: torch.Tensor, bins: int):
+    histograms = torch.Tensor().new_zeros((images.shape[0], bins))
+    for image in range(images.shape[0]):
+        histograms[image] = torch.histc(images[image].float(), bins=bins)
+    return histograms
+
+
+def time_function(function, images: torch.Tensor, bins: int, steps: int, warmup: int):
+    timings = []
+    for step in range(warmup + steps):
+        if images.is_cuda:
+            torch.cuda.synchronize()
+        start = time.time()
+        function(images, bins)
+        if images.is_cuda:
+            torch.cuda.synchronize()
+        if step >= warmup:
+            timings.append(time.time() - start)
+
+    return sum(timings) / len(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per image histograms of a batch of patches, torch.histc loop versus "
+                                                 "a single batched bincount.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--patch-size", type=int, default=32)
+    parser.add_argument("--bins", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    print("{:<8}{:>16}{:>16}{:>10}".format("batch", "histc (ms)", "batched (ms)", "speedup"))
+    for batch_size in args.batch_sizes:
+        images = torch.randn(batch_size, args.patch_size ** 3, device=args.device)
+        loop_time = time_function(histc_loop, images, args.bins, args.steps, args.warmup)
+        batched_time = time_function(batch_histogram, images, args.bins, args.steps, args.warmup)
+        print("{:<8}{:>16.2f}{:>16.2f}{:>10.2f}".format(batch_size, loop_time * 1000, batched_time * 1000,
+                                                         loop_time / batched_time))
@@ -0,0 +1,56 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import torch
+from matplotlib.figure import Figure
+
+from deepNormalize.utils.utils import construct_class_histogram, figure_to_rgb
+
+
+def time_function(function, steps: int):
+    start = time.time()
+    for _ in range(steps):
+        function()
+    return (time.time() - start) / steps
+
+
+def empty_panel():
+    figure = Figure(figsize=(12, 10))
+    figure.subplots(nrows=4, ncols=2)
+    figure.tight_layout()
+    return figure
+
+
+def png_round_trip(figure: Figure):
+    # The former path: render to a PNG file and read it back.
+    path = os.path.join(tempfile.gettempdir(), "histograms-benchmark.png")
+    figure.savefig(path)
+    image = cv2.imread(path).transpose((2, 0, 1))
+    os.remove(path)
+    return image
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render cost of the per-dataset histogram panel.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--patch-size", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    inputs = torch.rand(args.batch_size, 1, args.patch_size, args.patch_size, args.patch_size, device=args.device)
+    gen_pred = inputs * 0.5 + 0.25
+    target = [torch.randint(0, 4, inputs.shape, device=args.device),
+              torch.randint(0, 3, (args.batch_size,), device=args.device)]
+
+    print("{:<40}{:>12}".format("", "ms"))
+    print("{:<40}{:>12.1f}".format("histograms and Agg rendering",
+                                   time_function(lambda: construct_class_histogram(inputs, target, gen_pred),
+                                                 args.steps) * 1000))
+    print("{:<40}{:>12.1f}".format("Agg rendering of the empty panel",
+                                   time_function(lambda: figure_to_rgb(empty_panel()), args.steps) * 1000))
+    print("{:<40}{:>12.1f}".format("PNG round trip of the empty panel",
+                                   time_function(lambda: png_round_trip(empty_panel()), args.steps) * 1000))
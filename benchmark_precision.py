@@ -0,0 +1,47 @@
+import argparse
+import time
+
+import torch
+
+from deepNormalize.config.types import PrecisionType
+from deepNormalize.models.unet3d import Unet
+from deepNormalize.training.precision import PrecisionPolicy
+
+
+def time_steps(precision: PrecisionType, batch_size: int, patch_size: int, steps: int, warmup: int):
+    torch.manual_seed(0)
+    model = Unet(1, 4)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.001, momentum=0.9)
+    policy = PrecisionPolicy(precision, device_type="cpu")
+    inputs = torch.rand(batch_size, 1, patch_size, patch_size, patch_size)
+    target = torch.randint(0, 4, (batch_size, patch_size, patch_size, patch_size))
+
+    timings = []
+    for step in range(warmup + steps):
+        start = time.time()
+        optimizer.zero_grad()
+        with policy.autocast():
+            loss = torch.nn.functional.cross_entropy(model(inputs).float(), target)
+        policy.backward(loss)
+        optimizer.step()
+        policy.update()
+        if step >= warmup:
+            timings.append(time.time() - start)
+
+    return sum(timings) / len(timings), loss.item()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CPU step time of the 3D UNet for each precision policy.")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--patch-size", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    args = parser.parse_args()
+
+    baseline = None
+    print("{:<10}{:>14}{:>10}{:>12}".format("precision", "step (ms)", "speedup", "loss"))
+    for precision in [PrecisionType.FP32, PrecisionType.BF16]:
+        step_time, loss = time_steps(precision, args.batch_size, args.patch_size, args.steps, args.warmup)
+        baseline = step_time if baseline is None else baseline
+        print("{:<10}{:>14.1f}{:>10.2f}{:>12.4f}".format(str(precision), step_time * 1000, baseline / step_time, loss))
@@ -38,3 +38,10 @@ class ModelType(Enum):
             return False
 
 
+class PrecisionType(Enum):
+    FP32 = "fp32"
+    FP16 = "fp16"
+    BF16 = "bf16"
+
+    def __str__(self):
+        return self.value
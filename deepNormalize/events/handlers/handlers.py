@@ -1,4 +1,14 @@
+import logging
+import numbers
+import os
+import signal
+import threading
+
+import numpy as np
+import torch
+from kerosene.configs.parsers import YamlConfigurationParser
 from kerosene.events import TemporalEvent, Monitor
+from kerosene.events.handlers.base_handler import EventHandler
 from kerosene.events.handlers.visdom import BaseVisdomHandler
 from kerosene.loggers.visdom import PlotType
 from kerosene.loggers.visdom.data import VisdomData
@@ -6,6 +16,11 @@ from kerosene.loggers.visdom.visdom import VisdomLogger
 from kerosene.training.events import Event
 from kerosene.training.trainers import Trainer
 
+from deepNormalize.loggers.metrics import MetricsStore
+from deepNormalize.training.step_timer import StepTimer
+
+LOGGER = logging.getLogger("Handlers")
+
 
 class PlotGPUMemory(BaseVisdomHandler):
     SUPPORTED_EVENTS = [Event.ON_EPOCH_END, Event.ON_TRAIN_EPOCH_END, Event.ON_VALID_EPOCH_END, Event.ON_TEST_EPOCH_END,
@@ -19,7 +34,8 @@ class PlotGPUMemory(BaseVisdomHandler):
     def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
         data = None
 
-        if self.should_handle(event):
+        # The GPU memory is not sampled on CPU only nodes.
+        if self.should_handle(event) and self._variable_name in trainer.custom_variables:
             data = self.create_visdom_data(event, trainer)
 
         if data is not None:
@@ -88,3 +104,345 @@ class PlotCustomLinePlotWithLegend(BaseVisdomHandler):
                                                                                          str(event.frequency))),
                                             'legend': self._params.get("legend", ["Training", "Validation", "Test"]),
                                             'name': None}})]
+
+
+class PlotCustomLinePlot(BaseVisdomHandler):
+    """
+    Plot a custom variable of the trainer holding a list of values, one per line. Nothing is plotted while the variable
+    is missing, e.g. before it is first sampled or on platforms not exposing it.
+    """
+    SUPPORTED_EVENTS = [Event.ON_EPOCH_END, Event.ON_TRAIN_EPOCH_END, Event.ON_VALID_EPOCH_END, Event.ON_TEST_EPOCH_END,
+                        Event.ON_TRAIN_BATCH_END, Event.ON_VALID_BATCH_END, Event.ON_TEST_BATCH_END, Event.ON_BATCH_END]
+
+    def __init__(self, visdom_logger: VisdomLogger, variable_name, params, every=1):
+        super().__init__(self.SUPPORTED_EVENTS, visdom_logger, every)
+        self._variable_name = variable_name
+        self._params = params
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        data = None
+
+        if self.should_handle(event) and self._variable_name in trainer.custom_variables:
+            data = self.create_visdom_data(event, trainer)
+
+        if data is not None:
+            self.visdom_logger(data)
+
+    def create_visdom_data(self, event: TemporalEvent, trainer):
+        return [VisdomData(trainer.name, self._variable_name, PlotType.LINE_PLOT, event.frequency, [event.iteration],
+                           trainer.custom_variables[self._variable_name],
+                           params={'opts': {'xlabel': str(event.frequency), 'ylabel': self._params.get("ylabel", ""),
+                                            'title': self._params.get("title", self._variable_name),
+                                            'legend': self._params.get("legend", [self._variable_name]),
+                                            'name': None}})]
+
+
+class PlotCustomHistogram(BaseVisdomHandler):
+    """
+    Plot a histogram stored in the trainer's custom variables as (counts, bin_edges), as returned by `numpy.histogram`.
+    """
+    SUPPORTED_EVENTS = [Event.ON_EPOCH_END, Event.ON_TRAIN_EPOCH_END, Event.ON_VALID_EPOCH_END, Event.ON_TEST_EPOCH_END,
+                        Event.ON_TRAIN_BATCH_END, Event.ON_VALID_BATCH_END, Event.ON_TEST_BATCH_END, Event.ON_BATCH_END]
+
+    def __init__(self, visdom_logger: VisdomLogger, variable_name, params, every=1):
+        super().__init__(self.SUPPORTED_EVENTS, visdom_logger, every)
+        self._variable_name = variable_name
+        self._params = params
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        data = None
+
+        if self.should_handle(event) and self._variable_name in trainer.custom_variables:
+            data = self.create_visdom_data(event, trainer)
+
+        if data is not None:
+            self.visdom_logger(data)
+
+    def create_visdom_data(self, event: TemporalEvent, trainer):
+        counts, bin_edges = trainer.custom_variables[self._variable_name]
+        return [VisdomData(trainer.name, self._variable_name, PlotType.BAR_PLOT, event.frequency,
+                           [int(count) for count in counts],
+                           ["{:.3f}".format((low + high) / 2.0) for low, high in zip(bin_edges[:-1], bin_edges[1:])],
+                           params=self._params)]
+
+
+class PlotStepTimes(BaseVisdomHandler):
+    """
+    Plot the "{phase} {section} Time" percentiles published by a `StepTimer` in the trainer's custom variables, one
+    plot per phase and section with one line per percentile. Sections are plotted once they were first timed.
+    """
+    SUPPORTED_EVENTS = [Event.ON_EPOCH_END, Event.ON_TRAIN_EPOCH_END, Event.ON_VALID_EPOCH_END, Event.ON_TEST_EPOCH_END,
+                        Event.ON_TRAIN_BATCH_END, Event.ON_VALID_BATCH_END, Event.ON_TEST_BATCH_END, Event.ON_BATCH_END]
+
+    def __init__(self, visdom_logger: VisdomLogger, phases=("Training", "Validation", "Test"), every=1):
+        super().__init__(self.SUPPORTED_EVENTS, visdom_logger, every)
+        self._phases = phases
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        data = None
+
+        if self.should_handle(event):
+            data = self.create_visdom_data(event, trainer)
+
+        if data:
+            self.visdom_logger(data)
+
+    def _is_step_time(self, name, value):
+        # The loader stage times reported by `ReportLoaderStages` share the suffix but are plain seconds.
+        return name.endswith(" Time") and name.split(" ", 1)[0] in self._phases and isinstance(value, list) and \
+               len(value) == len(StepTimer.PERCENTILES)
+
+    def create_visdom_data(self, event: TemporalEvent, trainer):
+        return [VisdomData(trainer.name, name, PlotType.LINE_PLOT, event.frequency, [event.iteration], [value],
+                           params={'opts': {'xlabel': str(event.frequency), 'ylabel': "Time per step (ms)",
+                                            'title': name,
+                                            'legend': ["p{}".format(percentile) for percentile in
+                                                       StepTimer.PERCENTILES],
+                                            'name': None}})
+                for name, value in sorted(trainer.custom_variables.items()) if self._is_step_time(name, value)]
+
+
+class StoreMetrics(EventHandler):
+    """
+    Append the scalars, histograms and confusion matrices of the trainer's custom variables to a `MetricsStore`.
+
+    Variables are stored again only once the trainer assigns them a new value. Images and text are not stored.
+    """
+    SUPPORTED_EVENTS = [Event.ON_EPOCH_END, Event.ON_TRAIN_EPOCH_END, Event.ON_VALID_EPOCH_END, Event.ON_TEST_EPOCH_END,
+                        Event.ON_TRAIN_BATCH_END, Event.ON_VALID_BATCH_END, Event.ON_TEST_BATCH_END, Event.ON_BATCH_END]
+
+    def __init__(self, metrics_store: MetricsStore, every=1):
+        super().__init__(self.SUPPORTED_EVENTS, every)
+        self._metrics_store = metrics_store
+        self._stored = {}
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        if not self.should_handle(event):
+            return
+
+        for tag, value in trainer.custom_variables.items():
+            if self._stored.get(tag) is value:
+                continue
+            self._stored[tag] = value
+            self._store(trainer.epoch, event.iteration, str(event.phase), tag, value)
+
+    def _store(self, epoch, step, phase, tag, value):
+        if isinstance(value, tuple) and len(value) == 2:
+            self._metrics_store.log_histogram(epoch, step, phase, tag, *value)
+        elif tag.endswith("Confusion Matrix") or tag.endswith("Confusion Matrix Training"):
+            self._metrics_store.log_confusion_matrix(epoch, step, phase, tag, value)
+        elif isinstance(value, numbers.Number):
+            self._metrics_store.log_scalar(epoch, step, phase, tag, value)
+        elif isinstance(value, (list, np.ndarray)) and len(value) > 0:
+            # Line plot values are a list holding either a number or an array of the points of several traces.
+            try:
+                values = np.asarray(value[0] if len(value) == 1 and np.ndim(value[0]) == 1 else value)
+            except ValueError:
+                return
+            if values.ndim != 1 or not all(isinstance(element, numbers.Number) for element in values.tolist()):
+                return
+            if len(values) == 1:
+                self._metrics_store.log_scalar(epoch, step, phase, tag, values[0])
+            else:
+                for index, element in enumerate(values):
+                    self._metrics_store.log_scalar(epoch, step, phase, "{} {}".format(tag, index), element)
+
+
+class ReportLoaderStages(EventHandler):
+    """
+    Report the data loading stages counted during the epoch by the `LoaderCounters` of every data loader, alongside
+    the time the main process waited for batches, then reset the counters.
+
+    Per stage totals are set in the trainer's custom variables as "{loader} Loader {stage} Time" in seconds and
+    "{loader} Loader {stage} MB", and a table with the time of every worker as "{loader} Loader Stages".
+    """
+    SUPPORTED_EVENTS = [Event.ON_EPOCH_END]
+
+    def __init__(self, loader_counters: dict, every=1):
+        super().__init__(self.SUPPORTED_EVENTS, every)
+        self._loader_counters = {name: counters for name, counters in loader_counters.items() if counters is not None}
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        if not self.should_handle(event):
+            return
+
+        for name, counters in self._loader_counters.items():
+            summary = counters.summary()
+            for stage, (calls, seconds, megabytes, _) in summary.items():
+                trainer.custom_variables["{} Loader {} Time".format(name, stage)] = seconds
+                if stage != "Wait":
+                    trainer.custom_variables["{} Loader {} MB".format(name, stage)] = megabytes
+            trainer.custom_variables["{} Loader Stages".format(name)] = counters.to_html()
+
+            LOGGER.info("{} loader stages of epoch {}: {}".format(
+                name, trainer.epoch, ", ".join("{} {:.2f}s".format(stage, seconds)
+                                               for stage, (_, seconds, _, _) in summary.items())))
+            counters.reset()
+
+
+class ProfileSteps(EventHandler):
+    """
+    Profile a window of training steps with `torch.profiler`.
+
+    A window is armed by the `profile_steps` ([start, stop]) training variable, read again from `config_file` whenever
+    the file changes, or by sending `signum` to the process, which profiles the next `window` steps. Operators are
+    recorded with their input shapes and memory allocations. The forward pass of every model runs in a range named
+    after the model, so its operators can be told apart. The Chrome trace of the window and a summary of the top
+    operators per model are written to the save folder.
+    """
+    SUPPORTED_EVENTS = [Event.ON_TRAIN_BATCH_END]
+
+    def __init__(self, save_folder: str, profile_steps: list = None, config_file: str = None, window: int = 5,
+                 signum=signal.SIGUSR1, row_limit: int = 15, every=1):
+        super().__init__(self.SUPPORTED_EVENTS, every)
+        self._save_folder = save_folder
+        self._profile_steps = tuple(profile_steps) if profile_steps is not None else None
+        self._config_file = config_file
+        self._config_mtime = os.path.getmtime(config_file) if config_file is not None else None
+        self._window = window
+        self._row_limit = row_limit
+        self._requested = threading.Event()
+        self._profiler = None
+        self._model_names = []
+        self._hooks = []
+        self._start_step = None
+        self._stop_step = None
+
+        if signum is not None:
+            try:
+                signal.signal(signum, lambda *_: self._requested.set())
+            except ValueError:
+                LOGGER.warning("Signal handlers can only be installed from the main thread, profiling on signal is "
+                               "disabled.")
+
+    @classmethod
+    def from_config(cls, training_config, save_folder: str, config_file: str = None):
+        return cls(save_folder, training_config.variables.get("profile_steps", None), config_file,
+                   training_config.variables.get("profile_window", 5))
+
+    @property
+    def is_profiling(self):
+        return self._profiler is not None
+
+    def __call__(self, event: TemporalEvent, monitors: dict, trainer: Trainer):
+        if not self.should_handle(event):
+            return
+
+        next_step = trainer.current_train_step + 1
+
+        if self._profiler is not None:
+            if next_step >= self._stop_step:
+                self.close()
+            return
+
+        self._reload_config()
+
+        if self._requested.is_set():
+            self._requested.clear()
+            self._start(trainer, next_step, next_step + self._window)
+        elif self._profile_steps is not None and self._profile_steps[0] <= next_step < self._profile_steps[1]:
+            self._start(trainer, next_step, self._profile_steps[1])
+            self._profile_steps = None
+
+    def _reload_config(self):
+        if self._config_file is None:
+            return
+
+        try:
+            mtime = os.path.getmtime(self._config_file)
+            if mtime == self._config_mtime:
+                return
+            self._config_mtime = mtime
+            _, training_config = YamlConfigurationParser.parse(self._config_file)
+        except Exception as e:
+            LOGGER.warning("Unable to reload {}: {}".format(self._config_file, e))
+            return
+
+        profile_steps = training_config.variables.get("profile_steps", None)
+        self._profile_steps = tuple(profile_steps) if profile_steps is not None else None
+
+    def _start(self, trainer: Trainer, start: int, stop: int):
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        self._model_names = [model_trainer.name for model_trainer in trainer.model_trainers]
+        self._hooks = [hook for model_trainer in trainer.model_trainers for hook in
+                       self._record_forward(model_trainer.name, model_trainer.model)]
+        self._start_step, self._stop_step = start, stop
+        self._profiler = torch.profiler.profile(activities=activities, record_shapes=True, profile_memory=True)
+        self._profiler.start()
+
+        LOGGER.info("Profiling training steps {} to {}.".format(start, stop - 1))
+
+    @staticmethod
+    def _record_forward(name: str, model: torch.nn.Module):
+        ranges = []
+
+        def begin(module, inputs):
+            ranges.append(torch.autograd.profiler.record_function(name))
+            ranges[-1].__enter__()
+
+        def end(module, inputs, outputs):
+            ranges.pop().__exit__(None, None, None)
+
+        return [model.register_forward_pre_hook(begin), model.register_forward_hook(end)]
+
+    def close(self):
+        if self._profiler is None:
+            return
+
+        self._profiler.stop()
+        for hook in self._hooks:
+            hook.remove()
+
+        path = os.path.join(self._save_folder, "profile_steps_{}_{}".format(self._start_step, self._stop_step))
+        self._profiler.export_chrome_trace(path + ".json")
+        with open(path + ".txt", "w") as summary:
+            summary.write(self.summarize(self._profiler, self._model_names, self._row_limit))
+
+        LOGGER.info("Profile of training steps {} to {} written to {}.".format(self._start_step, self._stop_step - 1,
+                                                                               path))
+        self._profiler = None
+        self._hooks = []
+
+    @staticmethod
+    def summarize(profiler, model_names: list, row_limit: int = 15):
+        """
+        Top operators, by self device time then self CPU time, of the forward pass of every model, followed by the top
+        operators of the whole window grouped by input shapes.
+        """
+        sections = []
+
+        for model_name in model_names:
+            totals = {}
+            events = [event for event in profiler.events() if event.name == model_name]
+            while events:
+                event = events.pop()
+                events.extend(event.cpu_children)
+                if event.name == model_name:
+                    continue
+                total = totals.setdefault((event.name, str(event.input_shapes)), [0, 0.0, 0.0, 0])
+                total[0] += 1
+                total[1] += event.self_cpu_time_total
+                # The CUDA attribute is deprecated and warns when read, so it is only read on older torch versions.
+                if hasattr(event, "self_device_time_total"):
+                    total[2] += event.self_device_time_total
+                else:
+                    total[2] += getattr(event, "self_cuda_time_total", 0.0)
+                total[3] += event.self_cpu_memory_usage
+
+            rows = sorted(totals.items(), key=lambda item: (item[1][2], item[1][1]), reverse=True)[:row_limit]
+            sections.append("\n".join(
+                ["{}".format(model_name),
+                 "{:<40} {:>8} {:>16} {:>16} {:>12}  {}".format("Operator", "Calls", "Self CPU (ms)",
+                                                                "Self device (ms)", "CPU MB", "Input shapes")] +
+                ["{:<40} {:>8} {:>16.3f} {:>16.3f} {:>12.2f}  {}".format(name[:40], calls, cpu / 1000.0,
+                                                                          device / 1000.0, memory / 1024 ** 2,
+                                                                          shapes)
+                 for (name, shapes), (calls, cpu, device, memory) in rows]))
+
+        sort_by = "self_cuda_time_total" if torch.cuda.is_available() else "self_cpu_time_total"
+        sections.append(profiler.key_averages(group_by_input_shape=True).table(sort_by=sort_by, row_limit=row_limit))
+
+        return "\n\n".join(sections) + "\n"
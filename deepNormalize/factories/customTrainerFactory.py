@@ -6,7 +6,8 @@ from kerosene.events.handlers.visdom import PlotMonitors, PlotLR, PlotCustomVari
 from kerosene.loggers.visdom import PlotType
 from kerosene.training.events import Event
 
-from deepNormalize.events.handlers.handlers import PlotCustomLinePlotWithLegend, PlotCustomLoss
+from deepNormalize.events.handlers.handlers import PlotCustomLinePlotWithLegend, PlotCustomLoss, \
+    PlotCustomHistogram
 from deepNormalize.training.dcgan import DCGANTrainer
 from deepNormalize.training.dual_unet import DualUNetTrainer
 from deepNormalize.training.lsgan import LSGANTrainer
@@ -186,55 +187,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Inputs Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                         params={"opts": {"title": "Classification hit per classes",
                                                                          "legend": list(map(lambda key: key,
@@ -620,55 +611,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Inputs Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                         params={"opts": {"title": "Classification hit per classes",
                                                                          "legend": list(map(lambda key: key,
@@ -1058,55 +1039,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Inputs Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                         params={"opts": {"title": "Classification hit per classes",
                                                                          "legend": list(map(lambda key: key,
@@ -1496,55 +1467,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Inputs Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                         params={"opts": {"title": "Classification hit per classes",
                                                                          "legend": list(map(lambda key: key,
@@ -1932,56 +1893,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={
-                                        "opts": {"title": "Inputs Intensity Histogram",
-                                                 "store_history": True,
-                                                 "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Mean Hausdorff Distance", PlotType.LINE_PLOT,
                                                         params={"opts": {"title": "Mean Hausdorff Distance",
                                                                          "legend": ["Test"]}},
@@ -2292,31 +2242,25 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={
-                                        "opts": {"title": "Inputs Intensity Histogram",
-                                                 "store_history": True,
-                                                 "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Mean Hausdorff Distance", PlotType.LINE_PLOT,
                                                         params={"opts": {"title": "Mean Hausdorff Distance",
                                                                          "legend": ["Test"]}},
@@ -2650,55 +2594,45 @@ class TrainerFactory(object):
                                                          run_config.local_rank)}},
                                     every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Generated Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Inputs Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "Background Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "CSF Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "GM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
-                .with_event_handler(
-                PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                                    params={"opts": {"title": "WM Input Intensity Histogram",
-                                                     "store_history": True,
-                                                     "numbins": 128}}, every=100), Event.ON_TEST_BATCH_END) \
+                PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                                    params={"opts": {"title": "Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                                    params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                                    params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                                    params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                                    params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                                    params={"opts": {"title": "Inputs Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                                    params={"opts": {"title": "Background Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                                    params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                                    params={"opts": {"title": "GM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
+                .with_event_handler(
+                PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                                    params={"opts": {"title": "WM Input Intensity Histogram"}},
+                                    every=100), Event.ON_TEST_BATCH_END) \
                 .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                         params={"opts": {"title": "Classification hit per classes",
                                                                          "legend": list(map(lambda key: key,
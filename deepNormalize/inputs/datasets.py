@@ -3,6 +3,7 @@ from typing import List, Callable, Union, Tuple, Optional
 import numpy as np
 import os
 import pandas
+import time
 import torch
 from math import ceil
 from samitorch.inputs.augmentation.strategies import DataAugmentationStrategy
@@ -32,11 +33,14 @@ class SliceDataset(Dataset):
         self._dataset_id = dataset_id
         self._transform = transforms
         self._augment = augment
+        # Set by `LoaderCounters.instrument()` to time the slicing of patches from the loaded volumes.
+        self._slice_stage = None
 
     def __len__(self):
         return len(self._patches)
 
     def __getitem__(self, idx):
+        start = time.perf_counter()
         patch = self._patches[idx]
         image_id = patch.image_id
 
@@ -55,6 +59,9 @@ class SliceDataset(Dataset):
             slice_x_augmented = augmented_image[tuple(slice)]
             patch_sample.augmented_x = slice_x_augmented
 
+        if self._slice_stage is not None:
+            self._slice_stage.record(start, patch_sample)
+
         if self._transform is not None:
             patch_sample = self._transform(patch_sample)
 
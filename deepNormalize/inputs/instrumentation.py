@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, get_worker_info
+from torchvision.transforms import Compose
+
+MB = 1024 ** 2
+
+# Stages named after what their transform does rather than after the transform.
+STAGE_NAMES = {"ToNumpyArray": "Decode", "PadToPatchShape": "Pad"}
+
+
+def nbytes(data):
+    """
+    Size in bytes of the arrays and tensors of a sample, a batch or a collection of them.
+    """
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, torch.Tensor):
+        return data.numel() * data.element_size()
+    if isinstance(data, (list, tuple)):
+        return sum(nbytes(element) for element in data)
+    if isinstance(data, dict):
+        return sum(nbytes(element) for element in data.values())
+    if hasattr(data, "x"):
+        return sum(nbytes(getattr(data, name, None)) for name in ("x", "y", "augmented_x"))
+    return 0
+
+
+class LoaderCounters(object):
+    """
+    Calls, seconds and output bytes of every data loading stage, per data loader worker.
+
+    The counters live in a block of shared memory, so data loader workers write them and the main process reads them
+    without any message passing. Worker `i` writes row `i + 1` and the main process row 0. Stages must be registered
+    in the main process, before the workers start.
+    """
+
+    def __init__(self, max_workers: int = 32):
+        self._stages = []
+        self._counters = torch.zeros((max_workers + 1, 64, 3), dtype=torch.float64).share_memory_()
+        self._array = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_array"] = None
+        return state
+
+    @property
+    def stages(self):
+        return list(self._stages)
+
+    def stage(self, name: str):
+        if name not in self._stages:
+            if len(self._stages) == self._counters.size(1):
+                raise ValueError("Cannot count more than {} stages.".format(self._counters.size(1)))
+            self._stages.append(name)
+        return self._stages.index(name)
+
+    def add(self, stage: int, seconds: float, size: int):
+        if self._array is None:
+            self._array = self._counters.numpy()
+
+        worker_info = get_worker_info()
+        row = 0 if worker_info is None else min(worker_info.id + 1, self._array.shape[0] - 1)
+        self._array[row, stage] += (1, seconds, size)
+
+    def timed(self, name: str, function=None):
+        return TimedStage(self, self.stage(name), function)
+
+    def instrument(self, dataset):
+        """
+        Time the transforms and the augmentation of a dataset, of every dataset of a `ConcatDataset` or of the dataset
+        of a `Subset`.
+        """
+        if hasattr(dataset, "datasets"):
+            for inner_dataset in dataset.datasets:
+                self.instrument(inner_dataset)
+            return dataset
+        if hasattr(dataset, "indices"):
+            self.instrument(dataset.dataset)
+            return dataset
+
+        if hasattr(dataset, "_slice_stage"):
+            dataset._slice_stage = self.timed("Slice")
+
+        transform = getattr(dataset, "_transform", None)
+        if isinstance(transform, Compose):
+            transform.transforms = [
+                self.timed(STAGE_NAMES.get(type(inner).__name__, type(inner).__name__), inner)
+                if not isinstance(inner, TimedStage) else inner for inner in transform.transforms]
+        elif transform is not None and not isinstance(transform, TimedStage):
+            dataset._transform = self.timed("Transform", transform)
+
+        augment = getattr(dataset, "_augment", None)
+        if augment is not None and not isinstance(augment, TimedStage):
+            dataset._augment = self.timed("Augment", augment)
+
+        return dataset
+
+    def snapshot(self):
+        """
+        Counters of shape (workers + 1, stages, 3) holding calls, seconds and bytes.
+        """
+        return self._counters[:, :len(self._stages)].numpy().copy()
+
+    def reset(self):
+        self._counters.zero_()
+
+    def summary(self):
+        """
+        Per stage calls, seconds, MB and seconds per worker, the main process first.
+        """
+        snapshot = self.snapshot()
+        workers = np.flatnonzero(snapshot[:, :, 0].sum(axis=1))
+
+        return {stage: (int(snapshot[:, index, 0].sum()), snapshot[:, index, 1].sum(), snapshot[:, index, 2].sum() / MB,
+                        snapshot[workers, index, 1].tolist())
+                for index, stage in enumerate(self._stages) if snapshot[:, index, 0].sum() > 0}
+
+    def to_html(self):
+        rows = "".join(
+            "<tr><td>{}</td><td>{}</td><td>{:.3f}</td><td>{:.3f}</td><td>{:.1f}</td><td>{}</td></tr>".format(
+                stage, calls, seconds, 1000.0 * seconds / calls, megabytes,
+                ", ".join("{:.2f}".format(worker_seconds) for worker_seconds in per_worker))
+            for stage, (calls, seconds, megabytes, per_worker) in self.summary().items())
+
+        return "<table><tr><th>Stage</th><th>Calls</th><th>Total (s)</th><th>Mean (ms)</th><th>MB</th>" \
+               "<th>Per worker (s)</th></tr>{}</table>".format(rows)
+
+
+class TimedStage(object):
+    """
+    Count the calls, time and output bytes of a data loading function, e.g. a transform or a collate function.
+    """
+
+    def __init__(self, counters: LoaderCounters, stage: int, function=None):
+        self._counters = counters
+        self._stage = stage
+        self._function = function
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        output = self._function(*args, **kwargs)
+        self.record(start, output)
+        return output
+
+    def record(self, start: float, output):
+        self._counters.add(self._stage, time.perf_counter() - start, nbytes(output))
+
+    def __repr__(self):
+        return repr(self._function)
+
+
+class InstrumentedDataLoader(DataLoader):
+    """
+    Data loader counting its loading stages in `counters`, and the time the main process waits for its batches as
+    the "Wait" stage. Without counters it is a plain `DataLoader`.
+    """
+
+    def __init__(self, dataset, *args, counters: LoaderCounters = None, **kwargs):
+        if counters is not None:
+            counters.instrument(dataset)
+            kwargs["collate_fn"] = counters.timed("Collate", kwargs.get("collate_fn", None) or
+                                                  torch.utils.data.dataloader.default_collate)
+            self._wait = counters.timed("Wait")
+        super().__init__(dataset, *args, **kwargs)
+        self.counters = counters
+
+    def __iter__(self):
+        iterator = super().__iter__()
+        return iterator if self.counters is None else self._timed_iterator(iterator)
+
+    def _timed_iterator(self, iterator):
+        while True:
+            start = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            self._wait.record(start, None)
+            yield batch
@@ -1,14 +1,23 @@
 from typing import Tuple
 
-import random
 import torch
 
 
 class ImagePool(object):
+    """
+    Pool of previously generated images, kept in preallocated buffers on the device of the queried images.
+
+    Until the pool is full every image is stored and returned as is. Afterwards each image is, with a 50% chance,
+    swapped with a stored image, which is returned in its place along with its target and dataset id. Stored images
+    swapped within the same query are distinct.
+    """
+
     def __init__(self, size: int = 50):
         self._size = size
-        self._inputs = []
-        self._targets = []
+        self._inputs = None
+        self._targets = None
+        self._dataset_ids = None
+        self._nb_images = 0
 
     @property
     def size(self):
@@ -16,48 +25,50 @@ class ImagePool(object):
 
     @property
     def nb_images(self):
-        return len(self._inputs)
+        return self._nb_images
 
     @property
     def is_full(self):
         return self.nb_images >= self.size
 
-    def query(self, images: Tuple[torch.Tensor, torch.Tensor]):
-        xs, ys, dataset_ids = images[0], images[1][0], images[1][1]
+    def _allocate(self, xs: torch.Tensor, ys: torch.Tensor, dataset_ids: torch.Tensor):
+        self._inputs = xs.new_empty((self._size, *xs.shape[1:]))
+        self._targets = ys.new_empty((self._size, *ys.shape[1:]))
+        self._dataset_ids = dataset_ids.new_empty((self._size, *dataset_ids.shape[1:]))
 
-        xs = xs.cpu().data
-        ys = ys.cpu().data
-        dataset_ids = dataset_ids.cpu().data
-
-        return_images = []
+    def query(self, images: Tuple[torch.Tensor, torch.Tensor]):
+        xs, ys, dataset_ids = images[0].detach(), images[1][0].detach(), images[1][1].detach()
 
         if self._size == 0:
             return xs, [ys, dataset_ids]
 
-        for x, y, dataset_id in zip(xs, ys, dataset_ids):
-
-            if not self.is_full:
-                self._inputs.append(x)
-                self._targets.append([y, dataset_id])
-                return_images.append((x, [y, dataset_id]))
-
-            else:
-                if random.uniform(0, 1) > 0.5:
-                    random_id = random.randint(0, self.size - 1)
-
-                    x_tmp = self._inputs[random_id].clone()
-                    y_tmp = self._targets[random_id][0].clone()
-                    dataset_id_tmp = self._targets[random_id][1].clone()
-
-                    self._inputs[random_id] = x
-                    self._targets[random_id] = [y, dataset_id]
+        if self._inputs is None:
+            self._allocate(xs, ys, dataset_ids)
+        elif self._inputs.device != xs.device:
+            self._inputs, self._targets, self._dataset_ids = self._inputs.to(xs.device), self._targets.to(
+                xs.device), self._dataset_ids.to(xs.device)
+
+        # Fill the free slots first, these images are returned unchanged.
+        stored = min(self._size - self._nb_images, xs.size(0))
+        if stored > 0:
+            self._inputs[self._nb_images:self._nb_images + stored] = xs[:stored]
+            self._targets[self._nb_images:self._nb_images + stored] = ys[:stored]
+            self._dataset_ids[self._nb_images:self._nb_images + stored] = dataset_ids[:stored]
+            self._nb_images += stored
+
+        swap = torch.rand(xs.size(0), device=xs.device) > 0.5
+        swap[:stored] = False
+        indices = torch.nonzero(swap).squeeze(1)[:self._size]
+
+        if indices.numel() == 0:
+            return xs, [ys, dataset_ids]
 
-                    return_images.append((x_tmp, [y_tmp, dataset_id_tmp]))
-                else:
-                    return_images.append((x, [y, dataset_id]))
+        slots = torch.randperm(self._size, device=xs.device)[:indices.numel()]
 
-        x = torch.stack([return_image[0] for return_image in return_images], 0).to(images[0].device)
-        y = torch.stack([return_image[1][0] for return_image in return_images], 0).to(images[0].device)
-        dataset_id = torch.stack([return_image[1][1] for return_image in return_images], 0).to(images[0].device)
+        xs, ys, dataset_ids = xs.clone(), ys.clone(), dataset_ids.clone()
+        for batch, pool in ((xs, self._inputs), (ys, self._targets), (dataset_ids, self._dataset_ids)):
+            new = batch[indices]
+            batch[indices] = pool[slots]
+            pool[slots] = new
 
-        return x, [y, dataset_id]
+        return xs, [ys, dataset_ids]
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import io
+import sqlite3
+
+import numpy as np
+import pandas
+from kerosene.loggers.visdom import PlotType, PlotFrequency
+from kerosene.loggers.visdom.data import VisdomData
+
+SCALAR = "scalar"
+HISTOGRAM = "histogram"
+CONFUSION_MATRIX = "confusion_matrix"
+
+
+def _to_blob(array):
+    if array is None:
+        return None
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _from_blob(blob):
+    return None if blob is None else np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+class MetricsStore(object):
+    """
+    Append-only SQLite store of the scalars, histograms and confusion matrices of training runs.
+
+    Every event is indexed by run, epoch, step and tag. Rows are buffered and written by batches of `batch_size`, so
+    call `flush()` or `close()` before querying a store that is still being written to.
+    """
+
+    def __init__(self, path: str, run: str = None, batch_size: int = 256):
+        self._connection = sqlite3.connect(path)
+        self._run = run
+        self._batch_size = batch_size
+        self._rows = []
+        self._connection.execute("CREATE TABLE IF NOT EXISTS metrics (run TEXT NOT NULL, epoch INTEGER, "
+                                 "step INTEGER, phase TEXT, tag TEXT NOT NULL, kind TEXT NOT NULL, value REAL, "
+                                 "data BLOB, bin_edges BLOB)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS metrics_run_tag ON metrics (run, tag, epoch, step)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS metrics_tag ON metrics (tag, run)")
+        self._connection.commit()
+
+    @property
+    def run(self):
+        return self._run
+
+    def _append(self, epoch, step, phase, tag, kind, value=None, data=None, bin_edges=None):
+        self._rows.append((self._run, epoch, step, phase, tag, kind, value, _to_blob(data), _to_blob(bin_edges)))
+
+        if len(self._rows) >= self._batch_size:
+            self.flush()
+
+    def log_scalar(self, epoch: int, step: int, phase: str, tag: str, value: float):
+        self._append(epoch, step, phase, tag, SCALAR, value=float(value))
+
+    def log_histogram(self, epoch: int, step: int, phase: str, tag: str, counts, bin_edges):
+        self._append(epoch, step, phase, tag, HISTOGRAM, data=counts, bin_edges=bin_edges)
+
+    def log_confusion_matrix(self, epoch: int, step: int, phase: str, tag: str, confusion_matrix):
+        self._append(epoch, step, phase, tag, CONFUSION_MATRIX, data=confusion_matrix)
+
+    def flush(self):
+        if self._rows:
+            self._connection.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._rows)
+            self._connection.commit()
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def _select(self, columns, kind, tag=None, runs=None, phase=None):
+        query = "SELECT {} FROM metrics WHERE kind = ?".format(", ".join(columns))
+        parameters = [kind]
+        if tag is not None:
+            query += " AND tag = ?"
+            parameters.append(tag)
+        if runs is not None:
+            query += " AND run IN ({})".format(", ".join("?" * len(runs)))
+            parameters.extend(runs)
+        if phase is not None:
+            query += " AND phase = ?"
+            parameters.append(phase)
+        query += " ORDER BY run, epoch, step, rowid"
+
+        return self._connection.execute(query, parameters).fetchall()
+
+    def runs(self):
+        return [row[0] for row in self._connection.execute("SELECT DISTINCT run FROM metrics ORDER BY run")]
+
+    def tags(self, run: str = None, kind: str = None):
+        query, parameters = "SELECT DISTINCT tag FROM metrics WHERE 1", []
+        if run is not None:
+            query += " AND run = ?"
+            parameters.append(run)
+        if kind is not None:
+            query += " AND kind = ?"
+            parameters.append(kind)
+        return [row[0] for row in self._connection.execute(query + " ORDER BY tag", parameters)]
+
+    def scalars(self, tag: str = None, runs: list = None, phase: str = None):
+        columns = ["run", "epoch", "step", "phase", "tag", "value"]
+        return pandas.DataFrame(self._select(columns, SCALAR, tag, runs, phase), columns=columns)
+
+    def compare(self, tag: str, runs: list = None, phase: str = None, index: str = "epoch"):
+        """
+        Last value of a scalar per `index` (epoch or step), with one column per run.
+        """
+        scalars = self.scalars(tag, runs, phase)
+        return scalars.groupby([index, "run"])["value"].last().unstack("run")
+
+    def histograms(self, tag: str, runs: list = None, phase: str = None):
+        columns = ["run", "epoch", "step", "phase", "tag", "data", "bin_edges"]
+        return [(run, epoch, step, phase, tag, _from_blob(counts), _from_blob(bin_edges))
+                for run, epoch, step, phase, tag, counts, bin_edges in self._select(columns, HISTOGRAM, tag, runs,
+                                                                                      phase)]
+
+    def confusion_matrices(self, tag: str, runs: list = None, phase: str = None):
+        columns = ["run", "epoch", "step", "phase", "tag", "data"]
+        return [(run, epoch, step, phase, tag, _from_blob(confusion_matrix))
+                for run, epoch, step, phase, tag, confusion_matrix in self._select(columns, CONFUSION_MATRIX, tag,
+                                                                                     runs, phase)]
+
+    def replay(self, visdom_logger, run: str, phase: str = None):
+        """
+        Send the events of a run to a Visdom logger, e.g. to look at an archived run in a live Visdom server.
+        """
+        runs = [run]
+        for tag in self.tags(run, SCALAR):
+            scalars = self.scalars(tag, runs, phase)
+            visdom_logger([VisdomData(run, tag, PlotType.LINE_PLOT, PlotFrequency.EVERY_STEP, [step], [value],
+                                      params={"opts": {"title": tag, "xlabel": "Step", "ylabel": tag,
+                                                       "name": event_phase, "legend": [event_phase]}})
+                           for step, event_phase, value in zip(scalars["step"], scalars["phase"], scalars["value"])])
+
+        for tag in self.tags(run, HISTOGRAM):
+            visdom_logger([VisdomData(run, tag, PlotType.BAR_PLOT, PlotFrequency.EVERY_STEP,
+                                      [int(count) for count in counts],
+                                      ["{:.3f}".format(center) for center in (bin_edges[:-1] + bin_edges[1:]) / 2.0],
+                                      params={"opts": {"title": "{} (step {})".format(tag, step)}})
+                           for _, _, step, _, _, counts, bin_edges in self.histograms(tag, runs, phase)])
+
+        for tag in self.tags(run, CONFUSION_MATRIX):
+            visdom_logger([VisdomData(run, tag, PlotType.HEATMAP_PLOT, PlotFrequency.EVERY_EPOCH, None,
+                                      confusion_matrix, params={"opts": {"title": "{} (epoch {})".format(tag, epoch)}})
+                           for _, epoch, _, _, _, confusion_matrix in self.confusion_matrices(tag, runs, phase)])
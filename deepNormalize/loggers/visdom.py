@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import logging
+import threading
+from collections import OrderedDict
+
+from kerosene.loggers.visdom import PlotType
+
+LOGGER = logging.getLogger("AsyncVisdomLogger")
+
+
+class AsyncVisdomLogger(object):
+    """
+    Forward Visdom data to a logger from a background thread, so the training loop never waits on the Visdom server.
+
+    Updates are queued per window and sent every `flush_interval` seconds. Within a flush only the latest update of a
+    window that redraws itself (images, histograms, bars, text...) is sent, whereas every point of a line plot is
+    kept. When more than `max_pending` updates are queued, the longest line plot is downsampled by dropping every
+    other pending point, or the least recently updated window is dropped, and `dropped` counts the lost updates.
+    """
+
+    def __init__(self, visdom_logger, flush_interval: float = 0.5, max_pending: int = 1000):
+        self._visdom_logger = visdom_logger
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._pending = OrderedDict()
+        self._nb_pending = 0
+        self._dropped = 0
+        self._requested = 0
+        self._sent = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="AsyncVisdomLogger", daemon=True)
+        self._thread.start()
+
+    @property
+    def visdom_logger(self):
+        return self._visdom_logger
+
+    @property
+    def nb_pending(self):
+        return self._nb_pending
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def __call__(self, visdom_data):
+        visdom_data = visdom_data if isinstance(visdom_data, list) else [visdom_data]
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot log to a closed AsyncVisdomLogger.")
+
+            for visdom_datum in visdom_data:
+                key = (visdom_datum.source_name, visdom_datum.variable_name)
+                updates = self._pending.pop(key, [])
+
+                if visdom_datum.plot_type == PlotType.LINE_PLOT:
+                    updates.append(visdom_datum)
+                    self._nb_pending += 1
+                else:
+                    self._nb_pending += 1 - len(updates)
+                    updates = [visdom_datum]
+
+                self._pending[key] = updates
+
+            while self._nb_pending > self._max_pending:
+                self._shed()
+
+    def _shed(self):
+        key, updates = max(self._pending.items(), key=lambda item: len(item[1]))
+
+        if len(updates) > 1:
+            # Keep the latest point and every other point before it.
+            kept = updates[::-1][::2][::-1]
+            self._pending[key] = kept
+        else:
+            kept = []
+            self._pending.popitem(last=False)
+
+        self._dropped += len(updates) - len(kept)
+        self._nb_pending -= len(updates) - len(kept)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._requested > self._sent,
+                                         timeout=self._flush_interval)
+                requested, closed = self._requested, self._closed
+                pending, self._pending, self._nb_pending = self._pending, OrderedDict(), 0
+
+            for updates in pending.values():
+                try:
+                    self._visdom_logger(updates)
+                except Exception as e:
+                    LOGGER.warning("Unable to send {} to Visdom: {}".format(updates[-1].variable_name, e))
+
+            with self._condition:
+                self._sent = requested
+                self._condition.notify_all()
+
+            if closed:
+                return
+
+    def flush(self):
+        """
+        Block until every update queued so far has been sent.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._requested += 1
+            requested = self._requested
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._sent >= requested)
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
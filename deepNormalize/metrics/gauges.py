@@ -0,0 +1,183 @@
+import numpy as np
+import torch
+
+from deepNormalize.utils.constants import EPSILON
+
+
+class TensorAverageGauge(object):
+    """
+    Running average kept as a device tensor.
+
+    Drop-in replacement of kerosene's AverageGauge: `update()` accepts tensors, numpy arrays or numbers and never
+    synchronizes with the host, `compute()` copies the average back once.
+    """
+
+    def __init__(self):
+        self._sum = None
+        self._count = 0
+
+    def update(self, value):
+        if isinstance(value, torch.Tensor):
+            value = value.detach().to(torch.float64)
+        else:
+            value = torch.as_tensor(np.asarray(value, dtype=np.float64))
+
+        if self._sum is None:
+            self._sum = value.clone()
+        elif self._sum.device != value.device and value.device.type != "cpu":
+            # Keep the sum on the accelerator rather than copying every update back to the host.
+            self._sum = self._sum.to(value.device) + value
+        else:
+            self._sum += value.to(self._sum.device)
+
+        self._count += 1
+
+    def compute(self):
+        if self._count == 0:
+            return 0.0
+
+        average = (self._sum / self._count).cpu().numpy()
+        return average.item() if average.ndim == 0 else average
+
+    def has_been_updated(self):
+        return self._count > 0
+
+    def reset(self):
+        self._sum = None
+        self._count = 0
+
+
+class PerDatasetConfusionMatrix(object):
+    """
+    Confusion matrices of every dataset, accumulated on device with a single bincount over (dataset, target, pred).
+
+    Rows are targets and columns are predictions, as in ignite's ConfusionMatrix.
+    """
+
+    def __init__(self, num_datasets: int, num_classes: int):
+        self._num_datasets = num_datasets
+        self._num_classes = num_classes
+        self._counts = None
+
+    def update(self, pred: torch.Tensor, target: torch.Tensor, dataset_ids: torch.Tensor):
+        """
+        Count a batch of label maps of shape (B, ...) with their dataset ids of shape (B,) and return the
+        (num_datasets, num_classes, num_classes) counts of this batch.
+        """
+        dataset_ids = dataset_ids.long().view(-1, *([1] * (target.dim() - 1)))
+        index = (dataset_ids * self._num_classes + target.long()) * self._num_classes + pred.long()
+        counts = torch.bincount(index.flatten(), minlength=self._num_datasets * self._num_classes ** 2).view(
+            self._num_datasets, self._num_classes, self._num_classes)
+
+        self._counts = counts if self._counts is None else self._counts + counts
+
+        return counts
+
+    def compute(self, dataset_id: int = None):
+        if self._counts is None:
+            return torch.zeros((self._num_classes, self._num_classes), dtype=torch.long)
+
+        return self._counts.sum(dim=0) if dataset_id is None else self._counts[dataset_id]
+
+    def has_been_updated(self):
+        return self._counts is not None
+
+    def reset(self):
+        self._counts = None
+
+    @staticmethod
+    def dice(counts: torch.Tensor):
+        true_positives = torch.diagonal(counts, dim1=-2, dim2=-1).double()
+        return 2.0 * true_positives / (counts.sum(dim=-1) + counts.sum(dim=-2) + EPSILON)
+
+    @staticmethod
+    def iou(counts: torch.Tensor):
+        true_positives = torch.diagonal(counts, dim1=-2, dim2=-1).double()
+        return true_positives / (counts.sum(dim=-1) + counts.sum(dim=-2) - true_positives + EPSILON)
+
+    @staticmethod
+    def metrics(counts: torch.Tensor, ignore_index: int = 0):
+        """
+        Segmenter metrics of (num_classes, num_classes) counts, named as in the configuration files: Dice and IoU
+        averaged over the classes but `ignore_index`, precision and recall averaged over all the classes.
+        """
+        counts = counts.double()
+        true_positives = torch.diagonal(counts)
+        classes = torch.arange(counts.size(0), device=counts.device) != ignore_index
+
+        return {"Dice": PerDatasetConfusionMatrix.dice(counts)[classes].mean(),
+                "IoU": PerDatasetConfusionMatrix.iou(counts)[classes].mean(),
+                "Accuracy": true_positives.sum() / (counts.sum() + EPSILON),
+                "Precision": (true_positives / (counts.sum(dim=0) + EPSILON)).mean(),
+                "Recall": (true_positives / (counts.sum(dim=1) + EPSILON)).mean()}
+
+
+def update_segmenter_metrics(update_metric, metric_names, confusion_matrix_gauge: PerDatasetConfusionMatrix):
+    """
+    Update the segmenter metrics named in `metric_names` from the confusion counts of a whole epoch, so they are
+    derived once per epoch rather than once per step. Returns the metrics, or None if no step was counted.
+    """
+    if not confusion_matrix_gauge.has_been_updated():
+        return None
+
+    metrics = PerDatasetConfusionMatrix.metrics(confusion_matrix_gauge.compute())
+    for name in metric_names:
+        if name in metrics:
+            update_metric(name, metrics[name].item())
+
+    return metrics
+
+
+class IntensityHistogramGauge(object):
+    """
+    Intensity histograms per (dataset, class) over fixed bin edges, accumulated on device with a single bincount.
+
+    Intensities outside of `value_range` are counted in the first or last bin.
+    """
+
+    def __init__(self, num_datasets: int, num_classes: int, bins: int = 128, value_range: tuple = (0.0, 1.0)):
+        self._num_datasets = num_datasets
+        self._num_classes = num_classes
+        self._bins = bins
+        self._value_range = value_range
+        self._counts = None
+
+    @classmethod
+    def from_config(cls, training_config, num_datasets: int, num_classes: int):
+        return cls(num_datasets, num_classes, training_config.variables.get("intensity_histogram_bins", 128),
+                   tuple(training_config.variables.get("intensity_histogram_range", (0.0, 1.0))))
+
+    @property
+    def bin_edges(self):
+        return np.linspace(self._value_range[0], self._value_range[1], self._bins + 1)
+
+    def update(self, images: torch.Tensor, labels: torch.Tensor, dataset_ids: torch.Tensor):
+        """
+        Count images of shape (B, 1, ...) with their label maps of the same shape and their dataset ids of shape (B,).
+        """
+        images = images.detach().float()
+        bins = ((images - self._value_range[0]) * self._bins / (self._value_range[1] - self._value_range[0])).long()
+        dataset_ids = dataset_ids.long().view(-1, *([1] * (images.dim() - 1)))
+        index = (dataset_ids * self._num_classes + labels.long()) * self._bins + bins.clamp_(0, self._bins - 1)
+        counts = torch.bincount(index.flatten(), minlength=self._num_datasets * self._num_classes * self._bins)
+
+        self._counts = counts if self._counts is None else self._counts + counts
+
+    def compute(self):
+        if self._counts is None:
+            return np.zeros((self._num_datasets, self._num_classes, self._bins), dtype=np.int64)
+
+        return self._counts.view(self._num_datasets, self._num_classes, self._bins).cpu().numpy()
+
+    def histogram(self, dataset_id: int = None, class_id: int = None):
+        """
+        Counts and bin edges, as `numpy.histogram`, of one dataset and one class or of all of them.
+        """
+        counts = self.compute()
+        counts = counts[dataset_id] if dataset_id is not None else counts.sum(axis=0)
+        counts = counts[class_id] if class_id is not None else counts.sum(axis=0)
+
+        return counts, self.bin_edges
+
+    def reset(self):
+        self._counts = None
@@ -1,16 +1,116 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from kerosene.utils.tensors import flatten
-from scipy.spatial.distance import directed_hausdorff
+import torch
+from kerosene.utils.tensors import to_onehot
+from scipy.ndimage import binary_erosion, distance_transform_edt, generate_binary_structure
+
+from deepNormalize.utils.constants import EPSILON
+
+
+def _surface(mask):
+    return mask & ~binary_erosion(mask, structure=generate_binary_structure(mask.ndim, 1), border_value=0)
+
+
+def _surface_distance(seg_pred, target, percentile):
+    """
+    Hausdorff distance, percentile Hausdorff distance and average symmetric surface distance, in voxels, between two
+    binary volumes.
+
+    An empty volume against a non empty one is given the length of the volume diagonal, the largest possible distance.
+    """
+    if not seg_pred.any() and not target.any():
+        return 0.0, 0.0, 0.0
+    if not seg_pred.any() or not target.any():
+        diagonal = float(np.linalg.norm(seg_pred.shape))
+        return diagonal, diagonal, diagonal
+
+    seg_pred_surface, target_surface = _surface(seg_pred), _surface(target)
+    # Distance of every voxel to the nearest surface voxel of the other volume.
+    seg_pred_to_target = distance_transform_edt(~target_surface)[seg_pred_surface]
+    target_to_seg_pred = distance_transform_edt(~seg_pred_surface)[target_surface]
+
+    return (max(seg_pred_to_target.max(), target_to_seg_pred.max()),
+            max(np.percentile(seg_pred_to_target, percentile), np.percentile(target_to_seg_pred, percentile)),
+            (seg_pred_to_target.sum() + target_to_seg_pred.sum()) / (seg_pred_to_target.size + target_to_seg_pred.size))
+
+
+def per_example_surface_distances(seg_pred, target, percentile=95, num_workers=None):
+    """
+    Surface distances of every example and class of one-hot segmentations of shape (B, C, ...).
+
+    Every (example, class) pair is computed from distance transforms of the class boundaries, in parallel over
+    `num_workers` threads (all cores by default). Threads are enough: scipy.ndimage releases the GIL in the distance
+    transform and the erosion (with scipy 1.17, a pure Python thread keeps running during both calls while it stalls
+    during a call holding the GIL), so the pairs run concurrently without copying the volumes to other processes.
+
+    Returns:
+        An array of shape (B, C, 3) holding the Hausdorff distance, the `percentile` Hausdorff distance and the average
+        surface distance of every example and class.
+    """
+    if isinstance(seg_pred, torch.Tensor):
+        seg_pred = seg_pred.detach().cpu().numpy()
+    if isinstance(target, torch.Tensor):
+        target = target.detach().cpu().numpy()
+    seg_pred, target = seg_pred.astype(bool), target.astype(bool)
+
+    pairs = [(seg_pred[example, channel], target[example, channel], percentile) for example in
+             range(seg_pred.shape[0]) for channel in range(seg_pred.shape[1])]
+    with ThreadPoolExecutor(max_workers=min(num_workers or os.cpu_count() or 1, len(pairs))) as executor:
+        distances = np.array(list(executor.map(lambda pair: _surface_distance(*pair), pairs)))
+
+    return distances.reshape(seg_pred.shape[0], seg_pred.shape[1], 3)
+
+
+def surface_distances(seg_pred, target, percentile=95, num_workers=None):
+    """
+    Surface distances between one-hot segmentations of shape (B, C, ...), averaged over the batch.
+
+    Returns:
+        The Hausdorff distance, the `percentile` Hausdorff distance and the average surface distance of every class,
+        as three arrays of shape (C,).
+    """
+    distances = per_example_surface_distances(seg_pred, target, percentile, num_workers).mean(axis=0)
+
+    return distances[:, 0], distances[:, 1], distances[:, 2]
 
 
 def mean_hausdorff_distance(seg_pred, target):
-    distances = np.zeros((4,))
-    for channel in range(seg_pred.size(1)):
-        distances[channel] = max(
-            directed_hausdorff(
-                flatten(seg_pred[:, channel, ...]).cpu().detach().numpy(),
-                flatten(target[:, channel, ...]).cpu().detach().numpy())[0],
-            directed_hausdorff(
-                flatten(target[:, channel, ...]).cpu().detach().numpy(),
-                flatten(seg_pred[:, channel, ...]).cpu().detach().numpy())[0])
-    return distances
+    return surface_distances(seg_pred, target)[0]
+
+
+def volume_hausdorff_distance(seg_pred, target, num_classes=4):
+    """
+    Hausdorff distance of every class between two label maps of shape (D, H, W), computed over the whole volumes rather
+    than slice by slice.
+    """
+    return mean_hausdorff_distance(
+        *[to_onehot(torch.as_tensor(label_map, dtype=torch.long).unsqueeze(0), num_classes=num_classes)
+          for label_map in (seg_pred, target)])
+
+
+def batch_histogram(images: torch.Tensor, bins: int = 256):
+    """
+    Histograms of every row of a (B, N) tensor, each over the row's own [min, max] range as `torch.histc` does, from a
+    single offset bincount.
+    """
+    images = images.float()
+    minimum, maximum = images.min(dim=1, keepdim=True)[0], images.max(dim=1, keepdim=True)[0]
+    constant = minimum == maximum
+    minimum, maximum = torch.where(constant, minimum - 1, minimum), torch.where(constant, maximum + 1, maximum)
+
+    index = ((images - minimum) * bins / (maximum - minimum)).long().clamp_(0, bins - 1)
+    index += torch.arange(images.size(0), device=images.device).unsqueeze(1) * bins
+
+    return torch.bincount(index.flatten(), minlength=images.size(0) * bins).view(images.size(0), bins).float()
+
+
+def dice_coefficient(seg_pred, target, num_classes=4):
+    dice = np.zeros((num_classes,))
+    for class_id in range(num_classes):
+        pred_mask = seg_pred == class_id
+        target_mask = target == class_id
+        dice[class_id] = (2.0 * np.logical_and(pred_mask, target_mask).sum() + EPSILON) / (
+                pred_mask.sum() + target_mask.sum() + EPSILON)
+    return dice
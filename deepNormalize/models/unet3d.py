@@ -1,6 +1,45 @@
+from contextlib import contextmanager
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
+
+ENCODER_BLOCKS = ["inc", "down1", "down2", "down3", "down4"]
+DECODER_BLOCKS = ["up1", "up2", "up3", "up4"]
+CHECKPOINTING = {"none": [], "encoder": ENCODER_BLOCKS, "decoder": DECODER_BLOCKS,
+                 "full_resolution": ["inc", "up4"], "all": ENCODER_BLOCKS + DECODER_BLOCKS}
+
+
+@contextmanager
+def frozen_running_statistics(module):
+    batch_norms = [m for m in module.modules() if isinstance(m, nn.modules.batchnorm._BatchNorm)]
+    momentums = [m.momentum for m in batch_norms]
+    for m in batch_norms:
+        m.momentum = 0.0
+    try:
+        yield
+    finally:
+        for m, momentum in zip(batch_norms, momentums):
+            m.momentum = momentum
+
+
+def checkpoint_block(block, *inputs):
+    """
+    Run a block without keeping its activations, they are recomputed during backward.
+
+    The extra tensor requiring grad makes the parameters receive gradients even when none of the inputs requires
+    grad (e.g. the `inc` block). The first pass runs under no_grad and the recomputation with grad enabled, so
+    BatchNorm running statistics are only updated once.
+    """
+
+    def run(_, *block_inputs):
+        if torch.is_grad_enabled():
+            with frozen_running_statistics(block):
+                return block(*block_inputs)
+        return block(*block_inputs)
+
+    return checkpoint(run, torch.ones(1, requires_grad=True), *inputs)
 
 
 class DoubleConv(nn.Module):
@@ -74,11 +113,19 @@ class OutConv(nn.Module):
 
 
 class Unet(nn.Module):
-    def __init__(self, in_channels, out_channels, interpolate=False, leaky=False):
+    def __init__(self, in_channels, out_channels, interpolate=False, leaky=False, checkpointing="none"):
         super(Unet, self).__init__()
         self.in_channels = in_channels
         self.out_channels = out_channels
         self.interpolate = interpolate
+        self.checkpointing = checkpointing
+        # Either a granularity name of CHECKPOINTING or an explicit list of block names.
+        self.checkpointed_blocks = set(
+            CHECKPOINTING[checkpointing] if isinstance(checkpointing, str) else checkpointing)
+
+        if not self.checkpointed_blocks.issubset(ENCODER_BLOCKS + DECODER_BLOCKS):
+            raise ValueError("Unknown UNet blocks to checkpoint: {}".format(
+                sorted(self.checkpointed_blocks.difference(ENCODER_BLOCKS + DECODER_BLOCKS))))
 
         self.inc = DoubleConv(in_channels, 64)
         self.down1 = Down(64, 128, leaky)
@@ -114,15 +161,21 @@ class Unet(nn.Module):
 
         self.encoder_frozen = False
 
+    def _block(self, name, *inputs):
+        block = getattr(self, name)
+        if name in self.checkpointed_blocks and self.training and torch.is_grad_enabled():
+            return checkpoint_block(block, *inputs)
+        return block(*inputs)
+
     def forward(self, x):
-        x1 = self.inc(x)
-        x2 = self.down1(x1)
-        x3 = self.down2(x2)
-        x4 = self.down3(x3)
-        x5 = self.down4(x4)
-        x = self.up1(x5, x4)
-        x = self.up2(x, x3)
-        x = self.up3(x, x2)
-        x = self.up4(x, x1)
+        x1 = self._block("inc", x)
+        x2 = self._block("down1", x1)
+        x3 = self._block("down2", x2)
+        x4 = self._block("down3", x3)
+        x5 = self._block("down4", x4)
+        x = self._block("up1", x5, x4)
+        x = self._block("up2", x, x3)
+        x = self._block("up3", x, x2)
+        x = self._block("up4", x, x1)
 
         return self.out_conv(x)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import torch
+from kerosene.training.trainers import ModelTrainer
+from torch.nn.modules.batchnorm import _BatchNorm
+
+
+def has_training_batch_norm(model: torch.nn.Module):
+    return any(isinstance(module, _BatchNorm) and module.training for module in model.modules())
+
+
+def forward_real_fake(D: ModelTrainer, real: torch.Tensor, fake: torch.Tensor,
+                      preserve_batch_norm_statistics: bool = True):
+    """
+    Run the discriminator on the real and fake batches and return the real logits, the fake logits and the real
+    feature maps.
+
+    Both batches go through a single forward pass over `[real; fake]`. A BatchNorm layer in training mode would then
+    normalize with statistics of the joint batch, so when `preserve_batch_norm_statistics` is set such a model falls
+    back to two separate forward passes. GroupNorm discriminators and models in eval mode are always fused.
+    """
+    if preserve_batch_norm_statistics and has_training_batch_norm(D.model):
+        pred_real, x_conv1, x_layer1, x_layer2, x_layer3 = D.forward(real)
+        pred_fake, _, _, _, _ = D.forward(fake)
+        return pred_real, pred_fake, (x_conv1, x_layer1, x_layer2, x_layer3)
+
+    n = real.size(0)
+    pred, x_conv1, x_layer1, x_layer2, x_layer3 = D.forward(torch.cat((real, fake), dim=0))
+
+    return pred[:n], pred[n:], (x_conv1[:n], x_layer1[:n], x_layer2[:n], x_layer3[:n])
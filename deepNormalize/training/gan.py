@@ -14,39 +14,39 @@
 # limitations under the License.
 # ==============================================================================
 import time
-import uuid
 from datetime import timedelta
+from functools import partial
 from typing import List
 
-import cv2
-import matplotlib.pyplot as plt
 import numpy as np
-import os
-import pynvml
 import torch
-from fastai.utils.mem import gpu_mem_get
 from ignite.metrics.confusion_matrix import ConfusionMatrix
 from kerosene.configs.configs import RunConfiguration
-from kerosene.metrics.gauges import AverageGauge
 from kerosene.nn.functional import js_div
 from kerosene.training.trainers import ModelTrainer
 from kerosene.training.trainers import Trainer
-from kerosene.utils.tensors import flatten, to_onehot
-from samitorch.inputs.transformers import ToNifti1Image, NiftiToDisk
-from scipy.spatial.distance import directed_hausdorff
+from kerosene.utils.tensors import to_onehot
 from torch.utils.data import DataLoader, Dataset
-from torchvision.transforms.transforms import Compose
 
 from deepNormalize.inputs.datasets import SliceDataset
 from deepNormalize.inputs.images import SliceType
+from deepNormalize.metrics.gauges import TensorAverageGauge, PerDatasetConfusionMatrix, IntensityHistogramGauge, \
+    update_segmenter_metrics
+from deepNormalize.metrics.metrics import per_example_surface_distances, batch_histogram
+from deepNormalize.training.discriminator import forward_real_fake
+from deepNormalize.training.precision import PrecisionPolicy
+from deepNormalize.training.reconstruction import ReconstructionWorker
 from deepNormalize.training.sampler import Sampler
+from deepNormalize.training.step_scheduler import StepScheduler
+from deepNormalize.training.step_timer import StepTimer
 from deepNormalize.utils.constants import GENERATOR, SEGMENTER, DISCRIMINATOR, IMAGE_TARGET, DATASET_ID, ABIDE_ID, \
     NON_AUGMENTED_INPUTS, AUGMENTED_INPUTS, NON_AUGMENTED_TARGETS, AUGMENTED_TARGETS
 from deepNormalize.utils.constants import ISEG_ID, MRBRAINS_ID
-from deepNormalize.utils.image_slicer import ImageSlicer, SegmentationSlicer, LabelMapper, FeatureMapSlicer
-from deepNormalize.utils.utils import to_html, to_html_per_dataset, to_html_JS, to_html_time, natural_sort
-
-pynvml.nvmlInit()
+from deepNormalize.utils.image_slicer import ImageSlicer, SegmentationSlicer, LabelMapper, FeatureMapSlicer, \
+    SlicePlotter
+from deepNormalize.utils.telemetry import TelemetrySampler
+from deepNormalize.utils.utils import to_html, to_html_per_dataset, to_html_JS, to_html_time, \
+    construct_class_histogram
 
 
 class DeepNormalizeTrainer(Trainer):
@@ -61,6 +61,10 @@ class DeepNormalizeTrainer(Trainer):
                                                    test_data_loader, model_trainers, run_config)
 
         self._training_config = training_config
+        self._precision = PrecisionPolicy.from_config(training_config, {
+            "generator": model_trainers[GENERATOR], "segmenter": model_trainers[SEGMENTER],
+            "discriminator": model_trainers[DISCRIMINATOR]})
+        self._preserve_batch_norm_statistics = training_config.variables.get("preserve_batch_norm_statistics", True)
         self._run_config = run_config
         self._dataset_configs = dataset_config
         self._patience_segmentation = training_config.patience_segmentation
@@ -68,6 +72,7 @@ class DeepNormalizeTrainer(Trainer):
         self._seg_slicer = SegmentationSlicer()
         self._fm_slicer = FeatureMapSlicer()
         self._label_mapper = LabelMapper()
+        self._slice_plotter = SlicePlotter()
         self._reconstruction_datasets = reconstruction_datasets
         self._normalize_reconstructors = normalize_reconstructors
         self._input_reconstructors = input_reconstructors
@@ -78,33 +83,40 @@ class DeepNormalizeTrainer(Trainer):
         self._generator = self._model_trainers[GENERATOR]
         self._discriminator = self._model_trainers[DISCRIMINATOR]
         self._segmenter = self._model_trainers[SEGMENTER]
-        self._D_G_X_as_X_training_gauge = AverageGauge()
-        self._D_G_X_as_X_validation_gauge = AverageGauge()
-        self._D_G_X_as_X_test_gauge = AverageGauge()
-        self._total_loss_training_gauge = AverageGauge()
-        self._total_loss_validation_gauge = AverageGauge()
-        self._total_loss_test_gauge = AverageGauge()
-        self._class_hausdorff_distance_gauge = AverageGauge()
-        self._mean_hausdorff_distance_gauge = AverageGauge()
-        self._per_dataset_hausdorff_distance_gauge = AverageGauge()
-        self._iSEG_dice_gauge = AverageGauge()
-        self._MRBrainS_dice_gauge = AverageGauge()
-        self._ABIDE_dice_gauge = AverageGauge()
-        self._iSEG_hausdorff_gauge = AverageGauge()
-        self._MRBrainS_hausdorff_gauge = AverageGauge()
-        self._ABIDE_hausdorff_gauge = AverageGauge()
-        self._valid_dice_gauge = AverageGauge()
-        self._class_dice_gauge = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_iseg_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_mrbrains_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_abide_images = AverageGauge()
-        self._js_div_inputs_gauge = AverageGauge()
-        self._js_div_gen_gauge = AverageGauge()
-        self._general_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._iSEG_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._MRBrainS_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._ABIDE_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
+        self._autoencoder_scheduler = StepScheduler.from_config(
+            training_config, {"Generator": training_config.variables["train_generator_every_n_steps"],
+                              "Discriminator": 1, "Segmenter": 1}, "Autoencoder")
+        self._segmentation_scheduler = StepScheduler.from_config(
+            training_config, {"Generator": 1, "Discriminator": 1, "Segmenter": 1}, "Segmentation")
+        self._D_G_X_as_X_training_gauge = TensorAverageGauge()
+        self._D_G_X_as_X_validation_gauge = TensorAverageGauge()
+        self._D_G_X_as_X_test_gauge = TensorAverageGauge()
+        self._total_loss_training_gauge = TensorAverageGauge()
+        self._total_loss_validation_gauge = TensorAverageGauge()
+        self._total_loss_test_gauge = TensorAverageGauge()
+        self._class_hausdorff_distance_gauge = TensorAverageGauge()
+        self._class_hausdorff_95_distance_gauge = TensorAverageGauge()
+        self._class_average_surface_distance_gauge = TensorAverageGauge()
+        self._mean_hausdorff_distance_gauge = TensorAverageGauge()
+        self._per_dataset_hausdorff_distance_gauge = TensorAverageGauge()
+        self._iSEG_hausdorff_gauge = TensorAverageGauge()
+        self._MRBrainS_hausdorff_gauge = TensorAverageGauge()
+        self._ABIDE_hausdorff_gauge = TensorAverageGauge()
+        self._valid_dice_gauge = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_iseg_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_mrbrains_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_abide_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images = TensorAverageGauge()
+        self._js_div_inputs_gauge = TensorAverageGauge()
+        self._js_div_gen_gauge = TensorAverageGauge()
+        self._train_confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._valid_confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._input_histogram_gauge = IntensityHistogramGauge.from_config(training_config, 3, 4)
+        self._generated_histogram_gauge = IntensityHistogramGauge.from_config(training_config, 3, 4)
         self._discriminator_confusion_matrix_gauge = ConfusionMatrix(num_classes=self._num_datasets + 1)
         self._discriminator_confusion_matrix_gauge_training = ConfusionMatrix(num_classes=self._num_datasets + 1)
         self._previous_mean_dice = 0.0
@@ -113,385 +125,333 @@ class DeepNormalizeTrainer(Trainer):
         self._save_folder = save_folder
         self._sampler = Sampler(1.0)
         self._sliced = True if isinstance(self._reconstruction_datasets[0], SliceDataset) else False
+        self._reconstruction_worker = ReconstructionWorker(
+            self._dataset_configs.keys(), self._reconstruction_datasets, self._sliced, self._save_folder,
+            self._model_trainers, input_reconstructors, gt_reconstructors, segmentation_reconstructors,
+            normalize_reconstructors, augmented_reconstructors, training_config.build_augmented_images,
+            device=training_config.variables.get("reconstruction_device", "cpu"),
+            compression_level=training_config.variables.get("nifti_compression_level", 6), noise_slice=128,
+            noise_reference="augmented")
         print("Total number of parameters: {}".format(sum(p.numel() for p in self._segmenter.parameters()) +
                                                       sum(p.numel() for p in self._generator.parameters()) +
                                                       sum(p.numel() for p in self._discriminator.parameters())))
-        pynvml.nvmlInit()
+        self._telemetry = TelemetrySampler.from_config(training_config, run_config.local_rank,
+                                                       {"Training": train_data_loader})
+        self._step_timer = StepTimer.from_config(training_config, save_folder)
 
     def train_step(self, inputs, target):
-        inputs, target = self._sampler(inputs, target)
+        self._step_timer.begin("Training", self.current_train_step)
+        with self._precision.autocast(), self._step_scheduler.measure(self.current_train_step):
+            inputs, target = self._sampler(inputs, target)
+            self._step_timer.lap("Sampler")
+
+            disc_pred = None
+
+            if self._should_activate_autoencoder():
+                self._precision.zero_grad(self._generator)
+                self._precision.zero_grad(self._discriminator)
+                self._precision.zero_grad(self._segmenter)
+
+                # The generator graph is only built on the steps where it is updated.
+                with self._autoencoder_scheduler.forward("Generator", self.current_train_step):
+                    gen_pred = torch.nn.functional.relu(self._generator.forward(inputs[NON_AUGMENTED_INPUTS]))
+                    gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
+                # The per voxel MSE metric is the MSE loss, no need to compute it a second time.
+                self._generator.update_train_metric("MeanSquaredError", gen_loss.detach())
+
+                if self._autoencoder_scheduler.is_stepped("Generator", self.current_train_step):
+                    self._generator.update_train_loss("MSELoss", gen_loss)
+                    self._precision.backward(gen_loss)
+
+                    self._precision.step(self._generator)
+                self._step_timer.lap("Generator")
+
+                disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_discriminator(
+                    inputs[NON_AUGMENTED_INPUTS],
+                    gen_pred.detach(),
+                    target[NON_AUGMENTED_TARGETS][DATASET_ID])
+                self._precision.backward(disc_loss)
+                self._precision.step(self._discriminator)
+                self._step_timer.lap("Discriminator")
+
+                # Pretrain segmenter.
+                seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[NON_AUGMENTED_TARGETS][IMAGE_TARGET],
+                                                                                dim=1).long(), num_classes=4))
+                self._segmenter.update_train_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._train_confusion_matrix_gauge, seg_pred,
+                                              target[NON_AUGMENTED_TARGETS])
+
+                self._precision.backward(seg_loss.mean())
+                self._precision.step(self._segmenter)
+                self._step_timer.lap("Segmenter")
+
+                self._accumulate_histograms(inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS], gen_pred)
+                self._step_timer.lap("Metrics")
+                if self.current_train_step % 100 == 0:
+                    self._update_histograms(inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS], gen_pred)
+
+                if self.current_train_step % 500 == 0:
+                    self._update_image_plots(inputs[NON_AUGMENTED_INPUTS], gen_pred,
+                                             seg_pred,
+                                             target[NON_AUGMENTED_TARGETS][IMAGE_TARGET],
+                                             target[NON_AUGMENTED_TARGETS][DATASET_ID])
+
+                    self._make_disc_pie_plots(disc_pred, inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS])
+                self._step_timer.lap("Visualization")
+
+            if self._should_activate_segmentation():
+                self._precision.zero_grad(self._generator)
+                self._precision.zero_grad(self._discriminator)
+                self._precision.zero_grad(self._segmenter)
+
+                gen_pred = torch.nn.functional.relu(self._generator.forward(inputs[AUGMENTED_INPUTS]))
+                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[AUGMENTED_INPUTS])
+                self._generator.update_train_metric("MeanSquaredError", gen_loss.detach())
+                self._generator.update_train_loss("MSELoss", gen_loss)
+                self._step_timer.lap("Generator")
+
+                seg_pred = self._segmenter.forward(gen_pred)
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[AUGMENTED_TARGETS][IMAGE_TARGET],
+                                                                                dim=1).long(), num_classes=4))
+                self._segmenter.update_train_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._train_confusion_matrix_gauge, seg_pred, target[AUGMENTED_TARGETS])
+                self._step_timer.lap("Segmenter")
+
+                if self.current_train_step % self._training_config.variables["train_generator_every_n_steps_seg"] == 0:
+                    # The discriminator is not stepped on this loss, only the generator needs its gradients.
+                    with StepScheduler.frozen(self._discriminator):
+                        disc_loss_as_X = self._evaluate_loss_D_G_X_as_X(gen_pred,
+                                                                        torch.Tensor().new_full(
+                                                                            fill_value=self._num_datasets,
+                                                                            size=(gen_pred.size(0),),
+                                                                            dtype=torch.long,
+                                                                            device=inputs[AUGMENTED_INPUTS].device,
+                                                                            requires_grad=False))
+
+                    total_loss = self._training_config.variables["seg_ratio"] * seg_loss.mean() + \
+                                 self._training_config.variables["disc_ratio"] * disc_loss_as_X
+                    self._D_G_X_as_X_training_gauge.update(disc_loss_as_X.detach())
+                    self._total_loss_training_gauge.update(total_loss.detach())
+
+                    self._precision.backward(total_loss)
+
+                    self._precision.step(self._segmenter)
+                    self._precision.step(self._generator)
 
-        disc_pred = None
+                else:
+                    self._precision.backward(seg_loss.mean())
 
-        if self._should_activate_autoencoder():
-            self._generator.zero_grad()
-            self._discriminator.zero_grad()
-            self._segmenter.zero_grad()
+                    self._precision.step(self._segmenter)
+                    self._precision.step(self._generator)
+                self._step_timer.lap("Adversarial Backward")
 
-            gen_pred = torch.nn.functional.relu(self._generator.forward(inputs[NON_AUGMENTED_INPUTS]))
-            metric = self._generator.compute_metrics(gen_pred, inputs[NON_AUGMENTED_INPUTS])
-            self._generator.update_train_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
+                self._precision.zero_grad(self._discriminator)
 
-            if self.current_train_step % self._training_config.variables["train_generator_every_n_steps"] == 0:
-                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
-                self._generator.update_train_loss("MSELoss", gen_loss)
-                gen_loss.backward()
-
-                self._generator.step()
-
-            disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_discriminator(
-                inputs[NON_AUGMENTED_INPUTS],
-                gen_pred.detach(),
-                target[NON_AUGMENTED_TARGETS][DATASET_ID])
-            disc_loss.backward()
-            self._discriminator.step()
-
-            # Pretrain segmenter.
-            seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[NON_AUGMENTED_TARGETS][IMAGE_TARGET],
-                                                                            dim=1).long(), num_classes=4))
-            self._segmenter.update_train_loss("DiceLoss", seg_loss.mean())
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[NON_AUGMENTED_TARGETS][IMAGE_TARGET],
-                                                                   dim=1).long())
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_train_metrics(metric)
-
-            seg_loss.mean().backward()
-            self._segmenter.step()
-
-            if self.current_train_step % 100 == 0:
-                self._update_histograms(inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS], gen_pred)
+                disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_discriminator(
+                    inputs[NON_AUGMENTED_INPUTS],
+                    gen_pred.detach(),
+                    target[NON_AUGMENTED_INPUTS][DATASET_ID])
+                self._precision.backward(disc_loss)
 
-            if self.current_train_step % 500 == 0:
-                self._update_image_plots(inputs[NON_AUGMENTED_INPUTS].cpu().detach(), gen_pred.cpu().detach(),
-                                         seg_pred.cpu().detach(),
-                                         target[NON_AUGMENTED_TARGETS][IMAGE_TARGET].cpu().detach(),
-                                         target[NON_AUGMENTED_TARGETS][DATASET_ID].cpu().detach())
+                self._precision.step(self._discriminator)
+                self._step_timer.lap("Discriminator")
 
-                self._make_disc_pie_plots(disc_pred, inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS])
+                self._accumulate_histograms(inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS], gen_pred)
+                self._step_timer.lap("Metrics")
+                if self.current_train_step % 100 == 0:
+                    self._update_histograms(inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS], gen_pred)
 
-        if self._should_activate_segmentation():
-            self._generator.zero_grad()
-            self._discriminator.zero_grad()
-            self._segmenter.zero_grad()
+                if self.current_train_step % 500 == 0:
+                    self._update_image_plots(inputs[AUGMENTED_INPUTS], gen_pred,
+                                             seg_pred,
+                                             target[AUGMENTED_TARGETS][IMAGE_TARGET],
+                                             target[AUGMENTED_TARGETS][DATASET_ID])
 
-            gen_pred = torch.nn.functional.relu(self._generator.forward(inputs[AUGMENTED_INPUTS]))
+                    self._make_disc_pie_plots(disc_pred, inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS])
+                self._step_timer.lap("Visualization")
+
+            self._discriminator_confusion_matrix_gauge_training.update((
+                to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
+                          num_classes=self._num_datasets + 1),
+                disc_target))
+            self._step_timer.lap("Metrics")
+
+            if self.current_train_step % 500 == 0:
+                self._slice_plotter.plot(self.custom_variables, "Conv1 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_conv1[:1],
+                                         scale_factor=5)
+                self._slice_plotter.plot(self.custom_variables, "Layer1 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer1[:1],
+                                         scale_factor=10)
+                self._slice_plotter.plot(self.custom_variables, "Layer2 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer2[:1],
+                                         scale_factor=20)
+                self._slice_plotter.plot(self.custom_variables, "Layer3 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer3[:1],
+                                         scale_factor=20)
+            self._step_timer.lap("Visualization")
+
+        self._precision.update()
+        self._step_timer.end()
+
+    def validate_step(self, inputs, target):
+        self._step_timer.begin("Validation", self.current_valid_step)
+        with self._precision.autocast():
+            gen_pred = self._generator.forward(inputs[NON_AUGMENTED_INPUTS])
             metric = self._generator.compute_metrics(gen_pred, inputs[AUGMENTED_INPUTS])
-            self._generator.update_train_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
-            gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[AUGMENTED_INPUTS])
-            self._generator.update_train_loss("MSELoss", gen_loss)
-
-            seg_pred = self._segmenter.forward(gen_pred)
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[AUGMENTED_TARGETS][IMAGE_TARGET],
-                                                                            dim=1).long(), num_classes=4))
-            self._segmenter.update_train_loss("DiceLoss", seg_loss.mean())
-
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[AUGMENTED_TARGETS][IMAGE_TARGET],
-                                                                   dim=1).long())
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_train_metrics(metric)
-
-            if self.current_train_step % self._training_config.variables["train_generator_every_n_steps_seg"] == 0:
+            self._generator.update_valid_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
+            self._step_timer.lap("Generator")
+
+            if self._should_activate_autoencoder():
+                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
+                self._generator.update_valid_loss("MSELoss", gen_loss)
+
+                disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
+                                                                       target[DATASET_ID])
+                self._step_timer.lap("Discriminator")
+
+                seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
+                                                                  num_classes=4))
+                self._segmenter.update_valid_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._valid_confusion_matrix_gauge, seg_pred, target)
+                self._step_timer.lap("Segmenter")
+
+            if self._should_activate_segmentation():
+                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
+                self._generator.update_valid_loss("MSELoss", gen_loss)
+
+                disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
+                                                                       target[DATASET_ID])
+                self._step_timer.lap("Discriminator")
+
+                seg_pred = self._segmenter.forward(gen_pred)
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
+                                                                  num_classes=4))
+                self._segmenter.update_valid_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._valid_confusion_matrix_gauge, seg_pred, target)
+                self._step_timer.lap("Segmenter")
+
                 disc_loss_as_X = self._evaluate_loss_D_G_X_as_X(gen_pred,
                                                                 torch.Tensor().new_full(
                                                                     fill_value=self._num_datasets,
                                                                     size=(gen_pred.size(0),),
                                                                     dtype=torch.long,
-                                                                    device=inputs[AUGMENTED_INPUTS].device,
-                                                                    requires_grad=False))
+                                                                    device=inputs[NON_AUGMENTED_INPUTS].device,
+                                                                    requires_grad=False),
+                                                                disc_pred[gen_pred.size(0):])
 
                 total_loss = self._training_config.variables["seg_ratio"] * seg_loss.mean() + \
                              self._training_config.variables["disc_ratio"] * disc_loss_as_X
-                self._D_G_X_as_X_training_gauge.update(disc_loss_as_X.item())
-                self._total_loss_training_gauge.update(total_loss.item())
+                self._D_G_X_as_X_validation_gauge.update(disc_loss_as_X.detach())
+                self._total_loss_validation_gauge.update(total_loss.detach())
+                self._step_timer.lap("Metrics")
+        self._step_timer.end()
 
-                total_loss.backward()
-
-                self._segmenter.step()
-                self._generator.step()
-
-            else:
-                seg_loss.mean().backward()
-
-                self._segmenter.step()
-                self._generator.step()
-
-            self._discriminator.zero_grad()
-
-            disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_discriminator(
-                inputs[NON_AUGMENTED_INPUTS],
-                gen_pred.detach(),
-                target[NON_AUGMENTED_INPUTS][DATASET_ID])
-            disc_loss.backward()
-
-            self._discriminator.step()
+    def test_step(self, inputs, target):
+        self._step_timer.begin("Test", self.current_test_step)
+        with self._precision.autocast():
+            gen_pred = self._generator.forward(inputs[NON_AUGMENTED_INPUTS])
+            metric = self._generator.compute_metrics(gen_pred, inputs[AUGMENTED_INPUTS])
+            self._generator.update_test_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
+            self._step_timer.lap("Generator")
+
+            if self._should_activate_autoencoder():
+                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[AUGMENTED_INPUTS])
+                self._generator.update_test_loss("MSELoss", gen_loss)
+
+                disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
+                                                                       target[DATASET_ID], test=True)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
+                                                                  num_classes=4))
+                self._segmenter.update_test_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._confusion_matrix_gauge, seg_pred, target)
+                self._step_timer.lap("Segmenter")
+
+            if self._should_activate_segmentation():
+                gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
+                self._generator.update_test_loss("MSELoss", gen_loss)
 
-            if self.current_train_step % 100 == 0:
-                self._update_histograms(inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS], gen_pred)
+                disc_loss, disc_pred, disc_target = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
+                                                                                 target[DATASET_ID],
+                                                                                 test=True)
+                self._step_timer.lap("Discriminator")
 
-            if self.current_train_step % 500 == 0:
-                self._update_image_plots(inputs[AUGMENTED_INPUTS].cpu().detach(), gen_pred.cpu().detach(),
-                                         seg_pred.cpu().detach(),
-                                         target[AUGMENTED_TARGETS][IMAGE_TARGET].cpu().detach(),
-                                         target[AUGMENTED_TARGETS][DATASET_ID].cpu().detach())
-
-                self._make_disc_pie_plots(disc_pred, inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS])
-
-        self._discriminator_confusion_matrix_gauge_training.update((
-            to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
-                      num_classes=self._num_datasets + 1),
-            disc_target))
-
-        if self.current_train_step % 500 == 0:
-            self.custom_variables["Conv1 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_conv1.cpu().detach(), scale_factor=5, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer1 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer1.cpu().detach(), scale_factor=10, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer2 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer2.cpu().detach(), scale_factor=20, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer3 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer3.cpu().detach(), scale_factor=20, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
+                seg_pred = self._segmenter.forward(gen_pred)
+                seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
+                                                        to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
+                                                                  num_classes=4))
+                self._segmenter.update_test_loss("DiceLoss", seg_loss.mean())
+                self._update_confusion_matrix(self._confusion_matrix_gauge, seg_pred, target)
+                self._step_timer.lap("Segmenter")
 
-    def validate_step(self, inputs, target):
-        gen_pred = self._generator.forward(inputs[NON_AUGMENTED_INPUTS])
-        metric = self._generator.compute_metrics(gen_pred, inputs[AUGMENTED_INPUTS])
-        self._generator.update_valid_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
-
-        if self._should_activate_autoencoder():
-            gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
-            self._generator.update_valid_loss("MSELoss", gen_loss)
-
-            disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
-                                                                   target[DATASET_ID])
-
-            seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
-                                                              num_classes=4))
-            self._segmenter.update_valid_loss("DiceLoss", seg_loss.mean())
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[IMAGE_TARGET], dim=1).long())
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_valid_metrics(metric)
-            self._valid_dice_gauge.update(metric["Dice"])
-
-        if self._should_activate_segmentation():
-            gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
-            self._generator.update_valid_loss("MSELoss", gen_loss)
-
-            disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
-                                                                   target[DATASET_ID])
-
-            seg_pred = self._segmenter.forward(gen_pred)
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
-                                                              num_classes=4))
-            self._segmenter.update_valid_loss("DiceLoss", seg_loss.mean())
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[IMAGE_TARGET], dim=1).long())
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_valid_metrics(metric)
-            self._valid_dice_gauge.update(metric["Dice"])
-
-            disc_loss_as_X = self._evaluate_loss_D_G_X_as_X(gen_pred,
-                                                            torch.Tensor().new_full(
-                                                                fill_value=self._num_datasets,
-                                                                size=(gen_pred.size(0),),
-                                                                dtype=torch.long,
-                                                                device=inputs[NON_AUGMENTED_INPUTS].device,
-                                                                requires_grad=False))
-
-            total_loss = self._training_config.variables["seg_ratio"] * seg_loss.mean() + \
-                         self._training_config.variables["disc_ratio"] * disc_loss_as_X
-            self._D_G_X_as_X_validation_gauge.update(disc_loss_as_X.item())
-            self._total_loss_validation_gauge.update(total_loss.item())
+                disc_loss_as_X = self._evaluate_loss_D_G_X_as_X(gen_pred,
+                                                                torch.Tensor().new_full(
+                                                                    fill_value=self._num_datasets,
+                                                                    size=(gen_pred.size(0),),
+                                                                    dtype=torch.long,
+                                                                    device=inputs[NON_AUGMENTED_INPUTS].device,
+                                                                    requires_grad=False),
+                                                                disc_pred[gen_pred.size(0):])
 
-    def test_step(self, inputs, target):
-        gen_pred = self._generator.forward(inputs[NON_AUGMENTED_INPUTS])
-        metric = self._generator.compute_metrics(gen_pred, inputs[AUGMENTED_INPUTS])
-        self._generator.update_test_metric("MeanSquaredError", metric["MeanSquaredError"] / 32768)
-
-        if self._should_activate_autoencoder():
-            gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[AUGMENTED_INPUTS])
-            self._generator.update_test_loss("MSELoss", gen_loss)
-
-            disc_loss, disc_pred, _ = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
-                                                                   target[DATASET_ID], test=True)
-
-            seg_pred = self._segmenter.forward(inputs[NON_AUGMENTED_INPUTS])
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
-                                                              num_classes=4))
-            self._segmenter.update_test_loss("DiceLoss", seg_loss.mean())
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[IMAGE_TARGET], dim=1).long())
-
-            self._class_dice_gauge.update(np.array(metric["Dice"]))
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_test_metrics(metric)
-
-        if self._should_activate_segmentation():
-            gen_loss = self._generator.compute_loss("MSELoss", gen_pred, inputs[NON_AUGMENTED_INPUTS])
-            self._generator.update_test_loss("MSELoss", gen_loss)
-
-            disc_loss, disc_pred, disc_target = self._validate_discriminator(inputs[NON_AUGMENTED_INPUTS], gen_pred,
-                                                                             target[DATASET_ID],
-                                                                             test=True)
-
-            seg_pred = self._segmenter.forward(gen_pred)
-            seg_loss = self._segmenter.compute_loss("DiceLoss", torch.nn.functional.softmax(seg_pred, dim=1),
-                                                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(),
-                                                              num_classes=4))
-            self._segmenter.update_test_loss("DiceLoss", seg_loss.mean())
-            metric = self._segmenter.compute_metrics(torch.nn.functional.softmax(seg_pred, dim=1),
-                                                     torch.squeeze(target[IMAGE_TARGET], dim=1).long())
-
-            self._class_dice_gauge.update(np.array(metric["Dice"]))
-            metric["Dice"] = metric["Dice"].mean()
-            metric["IoU"] = metric["IoU"].mean()
-            self._segmenter.update_test_metrics(metric)
-
-            disc_loss_as_X = self._evaluate_loss_D_G_X_as_X(gen_pred,
-                                                            torch.Tensor().new_full(
-                                                                fill_value=self._num_datasets,
-                                                                size=(gen_pred.size(0),),
-                                                                dtype=torch.long,
-                                                                device=inputs[NON_AUGMENTED_INPUTS].device,
-                                                                requires_grad=False))
-
-            total_loss = self._training_config.variables["seg_ratio"] * seg_loss.mean() + \
-                         self._training_config.variables["disc_ratio"] * disc_loss_as_X
-
-            self._D_G_X_as_X_test_gauge.update(disc_loss_as_X.item())
-            self._total_loss_test_gauge.update(total_loss.item())
-
-            if seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)].shape[0] != 0:
-                self._iSEG_dice_gauge.update(np.array(self._segmenter.compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._iSEG_hausdorff_gauge.update(self._compute_mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)], dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._iSEG_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)].long(), dim=1)))
-
-            else:
-                self._iSEG_dice_gauge.update(np.zeros((3,)))
-                self._iSEG_hausdorff_gauge.update(np.zeros((3,)))
-
-            if seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)].shape[0] != 0:
-                self._MRBrainS_dice_gauge.update(np.array(self._segmenter.compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._MRBrainS_hausdorff_gauge.update(self._compute_mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                                        dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                      dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._MRBrainS_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                                        dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)].long(), dim=1)))
-
-            if seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)].shape[0] != 0:
-                self._ABIDE_dice_gauge.update(np.array(self._segmenter.compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._ABIDE_hausdorff_gauge.update(self._compute_mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._ABIDE_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)].long(), dim=1)))
-            else:
-                self._ABIDE_dice_gauge.update(np.zeros((3,)))
-                self._ABIDE_hausdorff_gauge.update(np.zeros((3,)))
-
-            self._class_hausdorff_distance_gauge.update(
-                self._compute_mean_hausdorff_distance(
-                    to_onehot(torch.argmax(torch.nn.functional.softmax(seg_pred, dim=1), dim=1), num_classes=4),
-                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4))[-3:])
-
-            self._general_confusion_matrix_gauge.update((
-                to_onehot(torch.argmax(torch.nn.functional.softmax(seg_pred, dim=1), dim=1, keepdim=False),
-                          num_classes=4),
-                torch.squeeze(target[IMAGE_TARGET].long(), dim=1)))
-
-            self._discriminator_confusion_matrix_gauge.update((
-                to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
-                          num_classes=self._num_datasets + 1),
-                disc_target))
+                total_loss = self._training_config.variables["seg_ratio"] * seg_loss.mean() + \
+                             self._training_config.variables["disc_ratio"] * disc_loss_as_X
 
-            inputs_reshaped = inputs[AUGMENTED_INPUTS].reshape(inputs[AUGMENTED_INPUTS].shape[0],
-                                                               inputs[AUGMENTED_INPUTS].shape[1] *
-                                                               inputs[AUGMENTED_INPUTS].shape[2] *
-                                                               inputs[AUGMENTED_INPUTS].shape[3] *
-                                                               inputs[AUGMENTED_INPUTS].shape[4])
-
-            gen_pred_reshaped = gen_pred.reshape(gen_pred.shape[0],
-                                                 gen_pred.shape[1] * gen_pred.shape[2] * gen_pred.shape[3] *
-                                                 gen_pred.shape[4])
-            inputs_ = torch.Tensor().new_zeros((inputs_reshaped.shape[0], 256))
-            gen_pred_ = torch.Tensor().new_zeros((gen_pred_reshaped.shape[0], 256))
-            for image in range(inputs_reshaped.shape[0]):
-                inputs_[image] = torch.nn.functional.softmax(torch.histc(inputs_reshaped[image], bins=256), dim=0)
-                gen_pred_[image] = torch.nn.functional.softmax(torch.histc(gen_pred_reshaped[image].float(), bins=256),
-                                                               dim=0)
-
-            self._js_div_inputs_gauge.update(js_div(inputs_).item())
-            self._js_div_gen_gauge.update(js_div(gen_pred_).item())
+                self._D_G_X_as_X_test_gauge.update(disc_loss_as_X.detach())
+                self._total_loss_test_gauge.update(total_loss.detach())
+
+                seg_onehot = to_onehot(torch.argmax(seg_pred, dim=1), num_classes=4)
+                target_onehot = to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4)
+
+                # Surface distances of every example and brain class, computed once and averaged per dataset.
+                distances = per_example_surface_distances(seg_onehot[:, -3:], target_onehot[:, -3:])
+                dataset_ids = target[DATASET_ID].cpu().numpy()
+
+                per_dataset_gauges = [(ISEG_ID, self._iSEG_hausdorff_gauge),
+                                      (MRBRAINS_ID, self._MRBrainS_hausdorff_gauge),
+                                      (ABIDE_ID, self._ABIDE_hausdorff_gauge)]
+                for dataset_id, hausdorff_gauge in per_dataset_gauges:
+                    # A dataset absent from the batch counts as a zero Hausdorff distance.
+                    mask = dataset_ids == dataset_id
+                    hausdorff_gauge.update(distances[mask, :, 0].mean(axis=0) if mask.any() else np.zeros((3,)))
+
+                self._class_hausdorff_distance_gauge.update(distances[:, :, 0].mean(axis=0))
+                self._class_hausdorff_95_distance_gauge.update(distances[:, :, 1].mean(axis=0))
+                self._class_average_surface_distance_gauge.update(distances[:, :, 2].mean(axis=0))
+
+                self._discriminator_confusion_matrix_gauge.update((
+                    to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
+                              num_classes=self._num_datasets + 1),
+                    disc_target))
+
+                inputs_reshaped = inputs[AUGMENTED_INPUTS].reshape(inputs[AUGMENTED_INPUTS].shape[0],
+                                                                   inputs[AUGMENTED_INPUTS].shape[1] *
+                                                                   inputs[AUGMENTED_INPUTS].shape[2] *
+                                                                   inputs[AUGMENTED_INPUTS].shape[3] *
+                                                                   inputs[AUGMENTED_INPUTS].shape[4])
+
+                gen_pred_reshaped = gen_pred.reshape(gen_pred.shape[0],
+                                                     gen_pred.shape[1] * gen_pred.shape[2] * gen_pred.shape[3] *
+                                                     gen_pred.shape[4])
+                inputs_ = torch.nn.functional.softmax(batch_histogram(inputs_reshaped, bins=256), dim=1)
+                gen_pred_ = torch.nn.functional.softmax(batch_histogram(gen_pred_reshaped, bins=256), dim=1)
+
+                self._js_div_inputs_gauge.update(js_div(inputs_).detach())
+                self._js_div_gen_gauge.update(js_div(gen_pred_).detach())
+                self._step_timer.lap("Metrics")
+        self._step_timer.end()
 
     def scheduler_step(self):
+        self._precision.flush()
         self._generator.scheduler_step()
         self._discriminator.scheduler_step()
         self._segmenter.scheduler_step()
@@ -504,21 +464,20 @@ class DeepNormalizeTrainer(Trainer):
         self._total_loss_validation_gauge.reset()
         self._total_loss_test_gauge.reset()
         self._class_hausdorff_distance_gauge.reset()
+        self._class_hausdorff_95_distance_gauge.reset()
+        self._class_average_surface_distance_gauge.reset()
         self._mean_hausdorff_distance_gauge.reset()
         self._per_dataset_hausdorff_distance_gauge.reset()
-        self._iSEG_dice_gauge.reset()
-        self._MRBrainS_dice_gauge.reset()
-        self._ABIDE_dice_gauge.reset()
         self._iSEG_hausdorff_gauge.reset()
         self._MRBrainS_hausdorff_gauge.reset()
         self._ABIDE_hausdorff_gauge.reset()
-        self._class_dice_gauge.reset()
         self._js_div_inputs_gauge.reset()
         self._js_div_gen_gauge.reset()
-        self._general_confusion_matrix_gauge.reset()
-        self._iSEG_confusion_matrix_gauge.reset()
-        self._MRBrainS_confusion_matrix_gauge.reset()
-        self._ABIDE_confusion_matrix_gauge.reset()
+        self._train_confusion_matrix_gauge.reset()
+        self._valid_confusion_matrix_gauge.reset()
+        self._confusion_matrix_gauge.reset()
+        self._input_histogram_gauge.reset()
+        self._generated_histogram_gauge.reset()
         self._discriminator_confusion_matrix_gauge.reset()
         self._discriminator_confusion_matrix_gauge_training.reset()
 
@@ -526,15 +485,25 @@ class DeepNormalizeTrainer(Trainer):
             self._generator.optimizer_lr = 0.001
 
     def on_train_batch_end(self):
-        self.custom_variables["GPU {} Memory".format(self._run_config.local_rank)] = [
-            np.array(gpu_mem_get(self._run_config.local_rank))]
+        self._telemetry.publish(self.custom_variables)
+        if self.current_train_step % 100 == 0:
+            self._step_timer.publish(self.custom_variables)
 
     def on_train_epoch_end(self):
+        self._step_scheduler.log_statistics(self._current_epoch)
+        update_segmenter_metrics(self._segmenter.update_train_metric, self._segmenter._train_metrics.keys(),
+                                 self._train_confusion_matrix_gauge)
+
         if self._run_config.local_rank == 0:
             self.custom_variables["D(G(X)) | X"] = [self._D_G_X_as_X_training_gauge.compute()]
             self.custom_variables["Total Loss"] = [self._total_loss_training_gauge.compute()]
 
     def on_valid_epoch_end(self):
+        metrics = update_segmenter_metrics(self._segmenter.update_valid_metric, self._segmenter._valid_metrics.keys(),
+                                           self._valid_confusion_matrix_gauge)
+        if metrics is not None:
+            self._valid_dice_gauge.update(metrics["Dice"])
+
         if self._run_config.local_rank == 0:
             self.custom_variables["D(G(X)) | X"] = [self._D_G_X_as_X_validation_gauge.compute()]
             self.custom_variables["Total Loss"] = [self._total_loss_validation_gauge.compute()]
@@ -548,148 +517,20 @@ class DeepNormalizeTrainer(Trainer):
                 (self._num_datasets + 1, self._num_datasets + 1))
 
     def on_test_epoch_end(self):
+        update_segmenter_metrics(self._segmenter.update_test_metric, self._segmenter._test_metrics.keys(),
+                                 self._confusion_matrix_gauge)
+
+        # Dice per class of the whole test epoch, overall and per dataset, derived from its confusion counts.
+        class_dice = PerDatasetConfusionMatrix.dice(self._confusion_matrix_gauge.compute())[-3:].cpu().numpy()
+        iseg_dice, mrbrains_dice, abide_dice = [
+            PerDatasetConfusionMatrix.dice(self._confusion_matrix_gauge.compute(dataset_id))[-3:].cpu().numpy()
+            for dataset_id in (ISEG_ID, MRBRAINS_ID, ABIDE_ID)]
+
         if self.epoch % 20 == 0:
-            if not self._sliced:
-                all_patches = list(map(lambda dataset: natural_sort([sample.x for sample in dataset._samples]),
-                                       self._reconstruction_datasets))
-                ground_truth_patches = list(
-                    map(lambda dataset: natural_sort([sample.y for sample in dataset._samples]),
-                        self._reconstruction_datasets))
-            else:
-                all_patches = list(map(lambda dataset: [patch.slice for patch in dataset._patches],
-                                       self._reconstruction_datasets))
-                ground_truth_patches = list(
-                    map(lambda dataset: [patch.slice for patch in dataset._patches],
-                        self._reconstruction_datasets))
-            img_input = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                map(lambda patches, reconstructor: reconstructor.reconstruct_from_patches_3d(patches), all_patches,
-                    self._input_reconstructors)))}
-            img_gt = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                map(lambda patches, reconstructor: reconstructor.reconstruct_from_patches_3d(patches),
-                    ground_truth_patches, self._gt_reconstructors)))}
-            img_norm = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                map(lambda patches, reconstructor: reconstructor.reconstruct_from_patches_3d(patches), all_patches,
-                    self._normalize_reconstructors)))}
-            img_seg = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                map(lambda patches, reconstructor: reconstructor.reconstruct_from_patches_3d(patches), all_patches,
-                    self._segmentation_reconstructors)))}
-
-            if self._training_config.build_augmented_images:
-                img_augmented = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                    map(lambda patches, reconstructor: reconstructor.reconstruct_from_patches_3d(patches),
-                        all_patches,
-                        self._augmented_reconstructors)))}
-
-                augmented_minus_inputs = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                    map(lambda augmented, input: augmented - input, img_augmented.values(), img_input.values())))}
-
-                norm_minus_augmented = {k: v for (k, v) in zip(self._dataset_configs.keys(), list(
-                    map(lambda augmented, input: augmented - input, img_norm.values(), img_augmented.values())))}
-
-            for dataset in self._dataset_configs.keys():
-                self.custom_variables[
-                    "Reconstructed Normalized {} Image".format(dataset)] = self._slicer.get_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_norm[dataset], 0), 0), 160)
-                self.custom_variables[
-                    "Reconstructed Segmented {} Image".format(dataset)] = self._seg_slicer.get_colored_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_seg[dataset], 0), 0), 160).squeeze(0)
-                self.custom_variables[
-                    "Reconstructed Ground Truth {} Image".format(dataset)] = self._seg_slicer.get_colored_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_gt[dataset], 0), 0), 160).squeeze(0)
-                self.custom_variables[
-                    "Reconstructed Input {} Image".format(dataset)] = self._slicer.get_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_input[dataset], 0), 0), 160)
-
-                if not os.path.exists(os.path.join(self._save_folder, "reconstructed_images")):
-                    os.makedirs(os.path.join(self._save_folder, "reconstructed_images"))
-
-                transform_img_norm = Compose(
-                    [ToNifti1Image(), NiftiToDisk(os.path.join(self._save_folder, "reconstructed_images",
-                                                               "Reconstructed_Normalized_{}_Image_{}.nii.gz".format(
-                                                                   dataset, str(self._current_epoch))))])
-                transform_img_seg = Compose(
-                    [ToNifti1Image(), NiftiToDisk(os.path.join(self._save_folder, "reconstructed_images",
-                                                               "Reconstructed_Segmented_{}_Image_{}.nii.gz".format(
-                                                                   dataset, str(self._current_epoch))))])
-                transform_img_gt = Compose(
-                    [ToNifti1Image(), NiftiToDisk(os.path.join(self._save_folder, "reconstructed_images",
-                                                               "Reconstructed_Ground_Truth_{}_Image_{}.nii.gz".format(
-                                                                   dataset, str(self._current_epoch))))])
-                transform_img_input = Compose(
-                    [ToNifti1Image(), NiftiToDisk(os.path.join(self._save_folder, "reconstructed_images",
-                                                               "Reconstructed_Input_{}_Image.nii.gz".format(
-                                                                   dataset, str(self._current_epoch))))])
-
-                transform_img_norm(img_norm[dataset])
-                transform_img_seg(img_seg[dataset])
-                transform_img_gt(img_gt[dataset])
-                transform_img_input(img_input[dataset])
-
-                metric = self._segmenter.compute_metrics(
-                    to_onehot(torch.tensor(img_seg[dataset]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt[dataset]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_images.update(np.array(metric["Dice"]))
-
-                if self._training_config.build_augmented_images:
-                    self.custom_variables[
-                        "Reconstructed Initial Noise {} Image".format(
-                            dataset)] = self._seg_slicer.get_colored_slice(
-                        SliceType.AXIAL,
-                        np.expand_dims(np.expand_dims(augmented_minus_inputs[dataset], 0), 0), 128).squeeze(0)
-                    self.custom_variables[
-                        "Reconstructed Noise {} After Normalization".format(
-                            dataset)] = self._seg_slicer.get_colored_slice(
-                        SliceType.AXIAL,
-                        np.expand_dims(np.expand_dims(norm_minus_augmented[dataset], 0), 0), 128).squeeze(0)
-                else:
-                    self.custom_variables[
-                        "Reconstructed Initial Noise {} Image".format(
-                            dataset)] = np.zeros((224, 192))
-                    self.custom_variables[
-                        "Reconstructed Noise {} After Normalization".format(
-                            dataset)] = np.zeros((224, 192))
-
-            if "iSEG" in img_seg:
-                metric = self._segmenter.compute_metrics(
-                    to_onehot(torch.tensor(img_seg["iSEG"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["iSEG"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_iseg_images.update(np.array(metric["Dice"]))
-            else:
-                self._class_dice_gauge_on_reconstructed_iseg_images.update(np.array([0.0, 0.0, 0.0]))
-            if "MRBrainS" in img_seg:
-                metric = self._segmenter.compute_metrics(
-                    to_onehot(torch.tensor(img_seg["MRBrainS"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["MRBrainS"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_mrbrains_images.update(np.array(metric["Dice"]))
-            else:
-                self._class_dice_gauge_on_reconstructed_mrbrains_images.update(np.array([0.0, 0.0, 0.0]))
-            if "ABIDE" in img_seg:
-                metric = self._segmenter.compute_metrics(
-                    to_onehot(torch.tensor(img_seg["ABIDE"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["ABIDE"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_abide_images.update(np.array(metric["Dice"]))
-            else:
-                self._class_dice_gauge_on_reconstructed_abide_images.update(np.array([0.0, 0.0, 0.0]))
-
-            if len(img_input) == 3:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    self._construct_histrogram(img_norm["iSEG"],
-                                               img_input["iSEG"],
-                                               img_norm["MRBrainS"],
-                                               img_input["MRBrainS"],
-                                               img_norm["ABIDE"],
-                                               img_input["ABIDE"])).transpose((2, 0, 1))
-            elif len(img_input) == 2:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    self._construct_double_histrogram(img_norm["iSEG"],
-                                                      img_input["iSEG"],
-                                                      img_norm["MRBrainS"],
-                                                      img_input["MRBrainS"])).transpose((2, 0, 1))
-            elif len(img_input) == 1:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    self._construct_single_histogram(img_norm[list(self._dataset_configs.keys())[0]],
-                                                     img_input[list(self._dataset_configs.keys())[0]],
-                                                     )).transpose((2, 0, 1))
+            self._reconstruction_worker.submit(self._current_epoch)
+
+        for result in self._reconstruction_worker.poll():
+            self._update_reconstruction_metrics(result)
 
         if "ABIDE" not in self._dataset_configs.keys():
             self.custom_variables["Reconstructed Normalized ABIDE Image"] = np.zeros((224, 192))
@@ -715,29 +556,17 @@ class DeepNormalizeTrainer(Trainer):
 
         self.custom_variables["Runtime"] = to_html_time(timedelta(seconds=time.time() - self._start_time))
 
-        if self._general_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["Confusion Matrix"] = np.array(
-                np.fliplr(self._general_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute().cpu().numpy())
 
-        if self._iSEG_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["iSEG Confusion Matrix"] = np.array(
-                np.fliplr(self._iSEG_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["iSEG Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["iSEG Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(ISEG_ID).cpu().numpy())
 
-        if self._MRBrainS_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["MRBrainS Confusion Matrix"] = np.array(
-                np.fliplr(self._MRBrainS_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["MRBrainS Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["MRBrainS Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(MRBRAINS_ID).cpu().numpy())
 
-        if self._ABIDE_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["ABIDE Confusion Matrix"] = np.array(
-                np.fliplr(self._ABIDE_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["ABIDE Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["ABIDE Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(ABIDE_ID).cpu().numpy())
 
         if self._discriminator_confusion_matrix_gauge._num_examples != 0:
             self.custom_variables["Discriminator Confusion Matrix"] = np.array(
@@ -746,18 +575,15 @@ class DeepNormalizeTrainer(Trainer):
             self.custom_variables["Discriminator Confusion Matrix"] = np.zeros(
                 (self._num_datasets + 1, self._num_datasets + 1))
 
+        # Surface distances of the whole test epoch, zero until a test step updated them.
+        epoch_distances = [gauge.compute() if gauge.has_been_updated() else np.zeros((3,)) for gauge in
+                           (self._class_hausdorff_distance_gauge, self._class_hausdorff_95_distance_gauge,
+                            self._class_average_surface_distance_gauge)]
         self.custom_variables["Metric Table"] = to_html(["CSF", "Grey Matter", "White Matter"],
-                                                        ["DSC", "HD"],
-                                                        [
-                                                            self._class_dice_gauge.compute() if self._class_dice_gauge.has_been_updated() else np.array(
-                                                                [0.0, 0.0, 0.0]),
-                                                            self._class_hausdorff_distance_gauge.compute() if self._class_hausdorff_distance_gauge.has_been_updated() else np.array(
-                                                                [0.0, 0.0, 0.0])
-                                                        ])
+                                                        ["DSC", "HD", "HD95", "ASD"], [class_dice] + epoch_distances)
 
         self.custom_variables[
-            "Dice score per class per epoch"] = self._class_dice_gauge.compute() if self._class_dice_gauge.has_been_updated() else np.array(
-            [0.0, 0.0, 0.0])
+            "Dice score per class per epoch"] = class_dice
         self.custom_variables[
             "Dice score per class per epoch on reconstructed image"] = self._class_dice_gauge_on_reconstructed_images.compute() if self._class_dice_gauge_on_reconstructed_images.has_been_updated() else np.array(
             [0.0, 0.0, 0.0])
@@ -770,6 +596,15 @@ class DeepNormalizeTrainer(Trainer):
         self.custom_variables[
             "Dice score per class per epoch on reconstructed ABIDE image"] = self._class_dice_gauge_on_reconstructed_abide_images.compute() if self._class_dice_gauge_on_reconstructed_abide_images.has_been_updated() else np.array(
             [0.0, 0.0, 0.0])
+        self.custom_variables[
+            "Hausdorff Distance per class per epoch on reconstructed iSEG image"] = self._hausdorff_distance_gauge_on_reconstructed_iseg_images.compute() if self._hausdorff_distance_gauge_on_reconstructed_iseg_images.has_been_updated() else np.array(
+            [0.0, 0.0, 0.0])
+        self.custom_variables[
+            "Hausdorff Distance per class per epoch on reconstructed MRBrainS image"] = self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.compute() if self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.has_been_updated() else np.array(
+            [0.0, 0.0, 0.0])
+        self.custom_variables[
+            "Hausdorff Distance per class per epoch on reconstructed ABIDE image"] = self._hausdorff_distance_gauge_on_reconstructed_abide_images.compute() if self._hausdorff_distance_gauge_on_reconstructed_abide_images.has_been_updated() else np.array(
+            [0.0, 0.0, 0.0])
 
         if self._valid_dice_gauge.compute() > self._previous_mean_dice:
             new_table = to_html_per_dataset(
@@ -777,18 +612,15 @@ class DeepNormalizeTrainer(Trainer):
                 ["DSC", "HD"],
                 [
                     [
-                        self._iSEG_dice_gauge.compute() if self._iSEG_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        iseg_dice,
                         self._iSEG_hausdorff_gauge.compute() if self._iSEG_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])],
                     [
-                        self._MRBrainS_dice_gauge.compute() if self._MRBrainS_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        mrbrains_dice,
                         self._MRBrainS_hausdorff_gauge.compute() if self._MRBrainS_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])],
                     [
-                        self._ABIDE_dice_gauge.compute() if self._ABIDE_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        abide_dice,
                         self._ABIDE_hausdorff_gauge.compute() if self._ABIDE_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])]],
                 ["iSEG", "MRBrainS", "ABIDE"])
@@ -816,301 +648,91 @@ class DeepNormalizeTrainer(Trainer):
         self.custom_variables["D(G(X)) | X"] = [self._D_G_X_as_X_test_gauge.compute()]
         self.custom_variables["Total Loss"] = [self._total_loss_test_gauge.compute()]
 
+    def close(self):
+        self._telemetry.close()
+        self._step_timer.close()
+
+        for result in self._reconstruction_worker.close():
+            self._update_reconstruction_metrics(result)
+
+    def _update_reconstruction_metrics(self, result):
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images.reset()
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.reset()
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images.reset()
+
+        self.custom_variables.update(result.custom_variables)
+        self.custom_variables["Reconstruction Skipped Patches"] = [np.array(list(result.skipped_fraction.values()))]
+        self.custom_variables["Reconstruction Time Saved"] = [result.time_saved]
+
+        for dataset in result.dice.keys():
+            self._class_dice_gauge_on_reconstructed_images.update(result.dice[dataset])
+
+        self._class_dice_gauge_on_reconstructed_iseg_images.update(
+            result.dice.get("iSEG", np.array([0.0, 0.0, 0.0])))
+        self._class_dice_gauge_on_reconstructed_mrbrains_images.update(
+            result.dice.get("MRBrainS", np.array([0.0, 0.0, 0.0])))
+        self._class_dice_gauge_on_reconstructed_abide_images.update(
+            result.dice.get("ABIDE", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images.update(
+            result.hausdorff.get("iSEG", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.update(
+            result.hausdorff.get("MRBrainS", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images.update(
+            result.hausdorff.get("ABIDE", np.array([0.0, 0.0, 0.0])))
+
     @staticmethod
     def _merge_tensors(tensor_0, tensor_1):
         return torch.cat((tensor_0, tensor_1), dim=0)
 
+    @property
+    def _step_scheduler(self):
+        return self._autoencoder_scheduler if self._should_activate_autoencoder() else self._segmentation_scheduler
+
+    @staticmethod
+    def _update_confusion_matrix(confusion_matrix_gauge: PerDatasetConfusionMatrix, seg_pred, target):
+        return confusion_matrix_gauge.update(torch.argmax(seg_pred, dim=1),
+                                             torch.squeeze(target[IMAGE_TARGET], dim=1).long(), target[DATASET_ID])
+
     def _should_activate_autoencoder(self):
         return self._current_epoch < self._patience_segmentation
 
     def _should_activate_segmentation(self):
         return self._current_epoch >= self._patience_segmentation
 
+    def _accumulate_histograms(self, inputs, target, gen_pred):
+        self._input_histogram_gauge.update(inputs, target[IMAGE_TARGET], target[DATASET_ID])
+        self._generated_histogram_gauge.update(gen_pred, target[IMAGE_TARGET], target[DATASET_ID])
+
     def _update_histograms(self, inputs, target, gen_pred):
-        self.custom_variables["Generated Intensity Histogram"] = flatten(gen_pred.cpu().detach())
-        self.custom_variables["Input Intensity Histogram"] = flatten(inputs.cpu().detach())
-        self.custom_variables["Per-Dataset Histograms"] = cv2.imread(
-            self._construct_class_histogram(inputs, target, gen_pred)).transpose((2, 0, 1))
-        self.custom_variables["Background Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 0)].cpu().detach()
-        self.custom_variables["CSF Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 1)].cpu().detach()
-        self.custom_variables["GM Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 2)].cpu().detach()
-        self.custom_variables["WM Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 3)].cpu().detach()
-        self.custom_variables["Background Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 0)].cpu().detach()
-        self.custom_variables["CSF Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 1)].cpu().detach()
-        self.custom_variables["GM Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 2)].cpu().detach()
-        self.custom_variables["WM Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 3)].cpu().detach()
+        self.custom_variables["Generated Intensity Histogram"] = self._generated_histogram_gauge.histogram()
+        self.custom_variables["Input Intensity Histogram"] = self._input_histogram_gauge.histogram()
+        self.custom_variables["Per-Dataset Histograms"] = construct_class_histogram(inputs, target, gen_pred)
+        for class_id, class_name in enumerate(["Background", "CSF", "GM", "WM"]):
+            self.custom_variables["{} Generated Intensity Histogram".format(class_name)] = \
+                self._generated_histogram_gauge.histogram(class_id=class_id)
+            self.custom_variables["{} Input Intensity Histogram".format(class_name)] = \
+                self._input_histogram_gauge.histogram(class_id=class_id)
 
     def _update_image_plots(self, inputs, generator_predictions, segmenter_predictions, target, dataset_ids):
-        inputs = torch.nn.functional.interpolate(inputs, scale_factor=5, mode="trilinear",
-                                                 align_corners=True).numpy()
-        generator_predictions = torch.nn.functional.interpolate(generator_predictions, scale_factor=5, mode="trilinear",
-                                                                align_corners=True).numpy()
-        segmenter_predictions = torch.nn.functional.interpolate(
-            torch.argmax(torch.nn.functional.softmax(segmenter_predictions, dim=1), dim=1, keepdim=True).float(),
-            scale_factor=5, mode="nearest").numpy()
-
-        target = torch.nn.functional.interpolate(target.float(), scale_factor=5, mode="nearest").numpy()
-
-        self.custom_variables[
-            "Input Batch Process {}".format(self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, inputs, inputs.shape[2] // 2)
-        self.custom_variables[
-            "Generated Batch Process {}".format(self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, generator_predictions, generator_predictions.shape[2] // 2)
-        self.custom_variables[
-            "Segmented Batch Process {}".format(self._run_config.local_rank)] = self._seg_slicer.get_colored_slice(
-            SliceType.AXIAL, segmenter_predictions, segmenter_predictions.shape[2] // 2)
-        self.custom_variables[
-            "Segmentation Ground Truth Batch Process {}".format(
-                self._run_config.local_rank)] = self._seg_slicer.get_colored_slice(
-            SliceType.AXIAL, target, target.shape[2] // 2)
+        image_slice = partial(self._slicer.get_slice, SliceType.AXIAL, slice=0)
+        colored_slice = partial(self._seg_slicer.get_colored_slice, SliceType.AXIAL, slice=0)
+
+        self._slice_plotter.plot(self.custom_variables,
+                                 "Input Batch Process {}".format(self._run_config.local_rank),
+                                 image_slice, inputs, scale_factor=5)
+        self._slice_plotter.plot(self.custom_variables,
+                                 "Generated Batch Process {}".format(self._run_config.local_rank),
+                                 image_slice, generator_predictions, scale_factor=5)
+        self._slice_plotter.plot(self.custom_variables,
+                                 "Segmented Batch Process {}".format(self._run_config.local_rank),
+                                 colored_slice, torch.argmax(segmenter_predictions, dim=1, keepdim=True),
+                                 scale_factor=5, mode="nearest")
+        self._slice_plotter.plot(self.custom_variables,
+                                 "Segmentation Ground Truth Batch Process {}".format(self._run_config.local_rank),
+                                 colored_slice, target, scale_factor=5, mode="nearest")
         self.custom_variables[
             "Label Map Batch Process {}".format(self._run_config.local_rank)] = self._label_mapper.get_label_map(
-            dataset_ids)
-
-    @staticmethod
-    def _construct_histrogram(gen_pred_iseg, input_iseg, gen_pred_mrbrains, input_mrbrains, gen_pred_abide,
-                              input_abide):
-        fig1, ((ax1, ax4), (ax2, ax5), (ax3, ax6)) = plt.subplots(nrows=3, ncols=2,
-                                                                  figsize=(12, 10))
-
-        _, bins, _ = ax1.hist(gen_pred_iseg[gen_pred_iseg > 0].flatten(), bins=128,
-                              density=False, label="iSEG")
-        ax1.set_xlabel("Intensity")
-        ax1.set_ylabel("Frequency")
-        ax1.set_title("Generated iSEG Histogram")
-        ax1.legend()
-
-        _ = ax2.hist(gen_pred_mrbrains[gen_pred_mrbrains > 0].flatten(), bins=bins,
-                     density=False, label="MRBrainS")
-        ax2.set_xlabel("Intensity")
-        ax2.set_ylabel("Frequency")
-        ax2.set_title("Generated MRBrainS Histogram")
-        ax2.legend()
-
-        _ = ax3.hist(gen_pred_abide[gen_pred_abide > 0].flatten(), bins=bins,
-                     density=False, label="ABIDE")
-        ax3.set_xlabel("Intensity")
-        ax3.set_ylabel("Frequency")
-        ax3.set_title("Generated ABIDE Histogram")
-        ax3.legend()
-
-        _, bins, _ = ax4.hist(input_iseg[input_iseg > 0].flatten(), bins=128,
-                              density=False, label="iSEG")
-        ax4.set_xlabel("Intensity")
-        ax4.set_ylabel("Frequency")
-        ax4.set_title("Input iSEG Histogram")
-        ax4.legend()
-        _ = ax5.hist(input_mrbrains[input_mrbrains > 0].flatten(), bins=bins,
-                     density=False, label="MRBrainS")
-        ax5.set_xlabel("Intensity")
-        ax5.set_ylabel("Frequency")
-        ax5.set_title("Input MRBrainS Histogram")
-        ax5.legend()
-
-        _ = ax6.hist(input_abide[input_abide > 0].flatten(), bins=bins,
-                     density=False, label="ABIDE")
-        ax6.set_xlabel("Intensity")
-        ax6.set_ylabel("Frequency")
-        ax6.set_title("Input ABIDE Histogram")
-        ax6.legend()
-
-        fig1.tight_layout()
-        id = str(uuid.uuid4())
-        fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-        fig1.clf()
-        plt.close(fig1)
-
-        return "/tmp/histograms-{}.png".format(str(id))
-
-    @staticmethod
-    def _construct_double_histrogram(gen_pred_iseg, input_iseg, gen_pred_mrbrains, input_mrbrains):
-        fig1, ((ax1, ax3), (ax2, ax4)) = plt.subplots(nrows=2, ncols=2,
-                                                      figsize=(12, 10))
-
-        _, bins, _ = ax1.hist(input_iseg[input_iseg > 0].flatten(), bins=128,
-                              density=False, label="iSEG")
-        ax1.set_xlabel("Intensity")
-        ax1.set_ylabel("Frequency")
-        ax1.set_title("Input iSEG Histogram")
-        ax1.legend()
-
-        _ = ax3.hist(gen_pred_iseg[gen_pred_iseg > 0].flatten(), bins=bins,
-                     density=False, label="iSEG")
-        ax3.set_xlabel("Intensity")
-        ax3.set_ylabel("Frequency")
-        ax3.set_title("Generated iSEG Histogram")
-        ax3.legend()
-
-        _, bins, _ = ax2.hist(input_mrbrains[input_mrbrains > 0].flatten(), bins=128,
-                              density=False, label="MRBrainS")
-        ax2.set_xlabel("Intensity")
-        ax2.set_ylabel("Frequency")
-        ax2.set_title("Input MRBrainS Histogram")
-        ax2.legend()
-
-        _ = ax4.hist(gen_pred_mrbrains[gen_pred_mrbrains > 0].flatten(), bins=bins,
-                     density=False, label="MRBrainS")
-        ax4.set_xlabel("Intensity")
-        ax4.set_ylabel("Frequency")
-        ax4.set_title("Generated MRBrainS Histogram")
-        ax4.legend()
-
-        fig1.tight_layout()
-        id = str(uuid.uuid4())
-        fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-        fig1.clf()
-        plt.close(fig1)
-
-        return "/tmp/histograms-{}.png".format(str(id))
-
-    @staticmethod
-    def _construct_single_histogram(gen_pred, input):
-        fig1, (ax1, ax2) = plt.subplots(nrows=1, ncols=2,
-                                        figsize=(12, 10))
-
-        _, bins, _ = ax1.hist(input[input > 0].flatten(), bins=128,
-                              density=False, label="Input")
-        ax1.set_xlabel("Intensity")
-        ax1.set_ylabel("Frequency")
-        ax1.set_title("Input Histogram")
-        ax1.legend()
-
-        _ = ax2.hist(gen_pred[gen_pred > 0].flatten(), bins=bins,
-                     density=False, label="iSEG")
-        ax2.set_xlabel("Intensity")
-        ax2.set_ylabel("Frequency")
-        ax2.set_title("Generated Histogram")
-        ax2.legend()
-
-        fig1.tight_layout()
-        id = str(uuid.uuid4())
-        fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-        fig1.clf()
-        plt.close(fig1)
-
-        return "/tmp/histograms-{}.png".format(str(id))
-
-    @staticmethod
-    def _construct_class_histogram(inputs, target, gen_pred):
-        iseg_inputs = inputs[torch.where(target[DATASET_ID] == ISEG_ID)]
-        iseg_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)]
-        iseg_gen_pred = gen_pred[torch.where(target[DATASET_ID] == ISEG_ID)]
-        mrbrains_inputs = inputs[torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-        mrbrains_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-        mrbrains_gen_pred = gen_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-        abide_inputs = inputs[torch.where(target[DATASET_ID] == ABIDE_ID)]
-        abide_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)]
-        abide_gen_pred = gen_pred[torch.where(target[DATASET_ID] == ABIDE_ID)]
-
-        fig1, ((ax1, ax5), (ax2, ax6), (ax3, ax7), (ax4, ax8)) = plt.subplots(nrows=4, ncols=2,
-                                                                              figsize=(12, 10))
-
-        _, bins, _ = ax1.hist(iseg_gen_pred[torch.where(iseg_targets == 0)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax1.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 0)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax1.hist(abide_gen_pred[torch.where(abide_targets == 0)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax1.set_xlabel("Intensity")
-        ax1.set_ylabel("Frequency")
-        ax1.set_title("Generated Background Histogram")
-        ax1.legend()
-
-        _, bins, _ = ax2.hist(iseg_gen_pred[torch.where(iseg_targets == 1)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax2.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 1)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax2.hist(abide_gen_pred[torch.where(abide_targets == 1)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax2.set_xlabel("Intensity")
-        ax2.set_ylabel("Frequency")
-        ax2.set_title("Generated CSF Histogram")
-        ax2.legend()
-
-        _, bins, _ = ax3.hist(iseg_gen_pred[torch.where(iseg_targets == 2)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax3.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 2)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax3.hist(abide_gen_pred[torch.where(abide_targets == 2)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax3.set_xlabel("Intensity")
-        ax3.set_ylabel("Frequency")
-        ax3.set_title("Generated Gray Matter Histogram")
-        ax3.legend()
-
-        _, bins, _ = ax4.hist(iseg_gen_pred[torch.where(iseg_targets == 3)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax4.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 3)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax4.hist(abide_gen_pred[torch.where(abide_targets == 3)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax4.set_xlabel("Intensity")
-        ax4.set_ylabel("Frequency")
-        ax4.set_title("Generated White Matter Histogram")
-        ax4.legend()
-
-        _, bins, _ = ax5.hist(iseg_inputs[torch.where(iseg_targets == 0)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax5.hist(mrbrains_inputs[torch.where(mrbrains_targets == 0)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax5.hist(abide_inputs[torch.where(abide_targets == 0)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax5.set_xlabel("Intensity")
-        ax5.set_ylabel("Frequency")
-        ax5.set_title("Input Background Histogram")
-        ax5.legend()
-
-        _, bins, _ = ax6.hist(iseg_inputs[torch.where(iseg_targets == 1)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax6.hist(mrbrains_inputs[torch.where(mrbrains_targets == 1)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax6.hist(abide_inputs[torch.where(abide_targets == 1)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax6.set_xlabel("Intensity")
-        ax6.set_ylabel("Frequency")
-        ax6.set_title("Input CSF Histogram")
-        ax6.legend()
-
-        _, bins, _ = ax7.hist(iseg_inputs[torch.where(iseg_targets == 2)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax7.hist(mrbrains_inputs[torch.where(mrbrains_targets == 2)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax7.hist(abide_inputs[torch.where(abide_targets == 2)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax7.set_xlabel("Intensity")
-        ax7.set_ylabel("Frequency")
-        ax7.set_title("Input Gray Matter Histogram")
-        ax7.legend()
-
-        _, bins, _ = ax8.hist(iseg_inputs[torch.where(iseg_targets == 3)].cpu().detach().numpy(), bins=128,
-                              density=False, label="iSEG")
-        _ = ax8.hist(mrbrains_inputs[torch.where(mrbrains_targets == 3)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="MRBrainS")
-        _ = ax8.hist(abide_inputs[torch.where(abide_targets == 3)].cpu().detach().numpy(), bins=bins,
-                     alpha=0.75, density=False, label="ABIDE")
-        ax8.set_xlabel("Intensity")
-        ax8.set_ylabel("Frequency")
-        ax8.set_title("Input White Matter Histogram")
-        ax8.legend()
-        fig1.tight_layout()
-        id = str(uuid.uuid4())
-        fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-        fig1.clf()
-        plt.close(fig1)
-        return "/tmp/histograms-{}.png".format(str(id))
+            dataset_ids.cpu())
 
     @staticmethod
     def _count(tensor, n_classes):
@@ -1130,8 +752,10 @@ class DeepNormalizeTrainer(Trainer):
         self.custom_variables["Pie Plot"] = count
         self.custom_variables["Pie Plot True"] = real_count
 
-    def _evaluate_loss_D_G_X_as_X(self, inputs, target):
-        pred_D_G_X, x_conv1, x_layer1, x_layer2, x_layer3 = self._discriminator.forward(inputs)
+    def _evaluate_loss_D_G_X_as_X(self, inputs, target, pred_D_G_X=None):
+        # Reuse the fake logits of the discriminator pass when the caller already has them.
+        if pred_D_G_X is None:
+            pred_D_G_X, _, _, _, _ = self._discriminator.forward(inputs)
         ones = torch.Tensor().new_ones(size=pred_D_G_X.size(), device=pred_D_G_X.device, dtype=pred_D_G_X.dtype,
                                        requires_grad=False)
         loss_D_G_X_as_X = self._discriminator.compute_loss("NLLLoss",
@@ -1142,28 +766,14 @@ class DeepNormalizeTrainer(Trainer):
 
         return loss_D_G_X_as_X
 
-    def _compute_mean_hausdorff_distance(self, seg_pred, target):
-        distances = np.zeros((4,))
-        for channel in range(seg_pred.size(1)):
-            distances[channel] = max(
-                directed_hausdorff(
-                    flatten(seg_pred[:, channel, ...]).cpu().detach().numpy(),
-                    flatten(target[:, channel, ...]).cpu().detach().numpy())[0],
-                directed_hausdorff(
-                    flatten(target[:, channel, ...]).cpu().detach().numpy(),
-                    flatten(seg_pred[:, channel, ...]).cpu().detach().numpy())[0])
-        return distances
-
     def _train_discriminator(self, inputs, gen_pred, target):
-        # Forward on real data.
-        pred_D_X, x_conv1, x_layer1, x_layer2, x_layer3 = self._discriminator.forward(inputs)
+        # Forward on real and fake data.
+        pred_D_X, pred_D_G_X, (x_conv1, x_layer1, x_layer2, x_layer3) = forward_real_fake(
+            self._discriminator, inputs, gen_pred, self._preserve_batch_norm_statistics)
 
         # Compute loss on real data with real targets.
         loss_D_X = self._discriminator.compute_loss("NLLLoss", torch.nn.functional.log_softmax(pred_D_X, dim=1), target)
 
-        # Forward on fake data.
-        pred_D_G_X, _, _, _, _ = self._discriminator.forward(gen_pred)
-
         # Choose randomly 8 predictions (to balance with real domains).
         # choices = np.random.choice(a=pred_D_G_X.size(0), size=(int(pred_D_G_X.size(0) / 2),), replace=False)
         # pred_D_G_X = pred_D_G_X[choices]
@@ -1192,15 +802,13 @@ class DeepNormalizeTrainer(Trainer):
         return disc_loss, pred, target, x_conv1, x_layer1, x_layer2, x_layer3
 
     def _validate_discriminator(self, inputs, gen_pred, target, test=False):
-        # Forward on real data.
-        pred_D_X, _, _, _, _ = self._discriminator.forward(inputs)
+        # Forward on real and fake data.
+        pred_D_X, pred_D_G_X, _ = forward_real_fake(self._discriminator, inputs, gen_pred,
+                                                    self._preserve_batch_norm_statistics)
 
         # Compute loss on real data with real targets.
         loss_D_X = self._discriminator.compute_loss("NLLLoss", torch.nn.functional.log_softmax(pred_D_X, dim=1), target)
 
-        # Forward on fake data.
-        pred_D_G_X, _, _, _, _ = self._discriminator.forward(gen_pred)
-
         # Choose randomly 8 predictions (to balance with real domains).
         # choices = np.random.choice(a=pred_D_G_X.size(0), size=(int(pred_D_G_X.size(0) / 2),), replace=False)
         # pred_D_G_X = pred_D_G_X[choices]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import torch
+from kerosene.training.trainers import ModelTrainer
+
+from deepNormalize.config.types import PrecisionType
+
+
+class PrecisionPolicy(object):
+    """
+    Native autocast precision policy shared by all model trainers of a Trainer.
+
+    FP16 scales the losses with a single GradScaler, so `update()` must be called once per iteration after every
+    optimizer step. BF16 has the same dynamic range as FP32 and needs no scaling, it is the only reduced precision
+    supported on CPU. Only the forward passes and the losses run under `autocast()`: `backward()` and the optimizer
+    steps leave it, so the trainers can call them from within their autocast block.
+
+    `accumulation_steps` maps model trainers to the number of `step()` calls accumulated before their optimizer is
+    actually stepped. Gradients are averaged over the accumulated backward passes and `zero_grad()` is a no-op until
+    then, so every model keeps its own effective batch size.
+    """
+
+    DTYPES = {PrecisionType.FP32: torch.float32, PrecisionType.FP16: torch.float16, PrecisionType.BF16: torch.bfloat16}
+
+    def __init__(self, precision: PrecisionType = PrecisionType.FP32, device_type: str = None,
+                 accumulation_steps: dict = None):
+        self._precision = precision
+        self._device_type = device_type if device_type is not None else (
+            "cuda" if torch.cuda.is_available() else "cpu")
+        self._model_trainers = {id(model_trainer): model_trainer for model_trainer in (accumulation_steps or {})}
+        self._accumulation_steps = {id(model_trainer): steps for model_trainer, steps in
+                                    (accumulation_steps or {}).items()}
+        self._accumulated = {}
+        self._stepped = set()
+
+        if self._precision == PrecisionType.FP16 and self._device_type != "cuda":
+            raise ValueError("FP16 precision requires a CUDA device, use BF16 on CPU.")
+
+        if self._precision == PrecisionType.FP16 and any(steps > 1 for steps in self._accumulation_steps.values()):
+            # The loss scale can change between micro-batches, which would mix differently scaled gradients.
+            raise ValueError("Gradient accumulation is not supported with FP16 loss scaling, use BF16 or FP32.")
+
+        self._scaler = torch.amp.GradScaler("cuda", enabled=self._precision == PrecisionType.FP16)
+
+    @classmethod
+    def from_config(cls, training_config, model_trainers: dict = None, device_type: str = None):
+        """
+        Build the policy from the `precision` and `gradient_accumulation` training variables. `model_trainers` maps
+        the role names used in `gradient_accumulation` (generator, segmenter, discriminator) to model trainers.
+        """
+        accumulation = training_config.variables.get("gradient_accumulation", None) or {}
+        return cls(PrecisionType(training_config.variables.get("precision", str(PrecisionType.FP32))), device_type,
+                   {model_trainer: int(accumulation.get(role, 1)) for role, model_trainer in
+                    (model_trainers or {}).items()})
+
+    @property
+    def precision(self):
+        return self._precision
+
+    @property
+    def dtype(self):
+        return self.DTYPES[self._precision]
+
+    def autocast(self):
+        return torch.autocast(device_type=self._device_type, dtype=self.dtype,
+                              enabled=self._precision != PrecisionType.FP32)
+
+    def _no_autocast(self):
+        return torch.autocast(device_type=self._device_type, enabled=False)
+
+    def backward(self, loss: torch.Tensor):
+        with self._no_autocast():
+            self._scaler.scale(loss).backward()
+
+    def accumulated(self, model_trainer: ModelTrainer):
+        return self._accumulated.get(id(model_trainer), 0)
+
+    def zero_grad(self, model_trainer: ModelTrainer):
+        if self.accumulated(model_trainer) == 0:
+            model_trainer.zero_grad()
+
+    def step(self, model_trainer: ModelTrainer):
+        accumulated = self.accumulated(model_trainer) + 1
+
+        if accumulated < self._accumulation_steps.get(id(model_trainer), 1):
+            self._accumulated[id(model_trainer)] = accumulated
+        else:
+            self._step(model_trainer, accumulated)
+
+    def flush(self):
+        """
+        Step the models holding a partially accumulated batch, e.g. before a learning rate scheduler step.
+        """
+        for key, accumulated in list(self._accumulated.items()):
+            if accumulated > 0:
+                self._step(self._model_trainers[key], accumulated)
+
+    def update(self):
+        if self._scaler.is_enabled():
+            self._scaler.update()
+        self._stepped.clear()
+
+    def _step(self, model_trainer: ModelTrainer, accumulated: int):
+        with self._no_autocast():
+            if self._scaler.is_enabled():
+                # The WGAN critics step the same optimizer several times per iteration.
+                if id(model_trainer.optimizer) in self._stepped:
+                    self.update()
+                self._stepped.add(id(model_trainer.optimizer))
+
+            if accumulated > 1:
+                for p in model_trainer.model.parameters():
+                    if p.grad is not None:
+                        p.grad.div_(accumulated)
+
+            if self._scaler.is_enabled():
+                self._scaler.step(model_trainer.optimizer)
+            else:
+                model_trainer.step()
+
+            self._accumulated[id(model_trainer)] = 0
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import copy
+import logging
+import queue
+import time
+from typing import List
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from kerosene.training.trainers import ModelTrainer
+
+from deepNormalize.inputs.images import SliceType
+from deepNormalize.metrics.metrics import volume_hausdorff_distance, dice_coefficient
+from deepNormalize.utils.image_slicer import ImageSlicer, SegmentationSlicer
+from deepNormalize.utils.nifti_writer import NiftiWriter
+from deepNormalize.utils.utils import get_all_patches, rebuild_image, save_rebuilt_image, rebuild_augmented_images, \
+    save_augmented_rebuilt_images, construct_triple_histrogram, construct_double_histrogram, \
+    construct_single_histogram
+
+LOGGER = logging.getLogger("ReconstructionWorker")
+
+
+class ReconstructionResult(object):
+
+    def __init__(self, epoch: int, custom_variables: dict, dice: dict, hausdorff: dict, elapsed: float,
+                 write_latencies: list = None, skipped_fraction: dict = None, time_saved: float = 0.0):
+        self._epoch = epoch
+        self._custom_variables = custom_variables
+        self._dice = dice
+        self._hausdorff = hausdorff
+        self._elapsed = elapsed
+        self._write_latencies = write_latencies if write_latencies is not None else []
+        self._skipped_fraction = skipped_fraction if skipped_fraction is not None else {}
+        self._time_saved = time_saved
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    @property
+    def custom_variables(self):
+        return self._custom_variables
+
+    @property
+    def dice(self):
+        return self._dice
+
+    @property
+    def hausdorff(self):
+        return self._hausdorff
+
+    @property
+    def mean_hausdorff(self):
+        return np.array([distances.mean() for distances in self._hausdorff.values()])
+
+    @property
+    def elapsed(self):
+        return self._elapsed
+
+    @property
+    def write_latencies(self):
+        """
+        Path, write time and time since submission, in seconds, of every volume written.
+        """
+        return self._write_latencies
+
+    @property
+    def skipped_fraction(self):
+        """
+        Fraction of the patches of every dataset skipped as background by the segmentation.
+        """
+        return self._skipped_fraction
+
+    @property
+    def time_saved(self):
+        """
+        Estimated inference time, in seconds, saved by skipping background patches.
+        """
+        return self._time_saved
+
+
+class ReconstructionWorker(object):
+    """
+    Rebuild, save and evaluate the full test volumes in a background process from snapshots of the model weights.
+
+    The noise images show the axial slice `noise_slice` of the augmented minus the input images and of the normalized
+    minus the input images, both masked, or with `noise_reference="augmented"` of the unmasked augmented minus input and
+    normalized minus augmented images.
+    """
+
+    def __init__(self, datasets: List[str], reconstruction_datasets: list, is_sliced: bool, save_folder: str,
+                 model_trainers: List[ModelTrainer], input_reconstructors: list, gt_reconstructors: list,
+                 segmentation_reconstructors: list, normalize_reconstructors: list = None,
+                 augmented_reconstructors: list = None, build_augmented_images: bool = False,
+                 device: str = "cpu", num_threads: int = 4, max_pending: int = 1, compression_level: int = 6,
+                 noise_slice: int = 160, noise_reference: str = "inputs"):
+        self._datasets = list(datasets)
+        self._reconstruction_datasets = reconstruction_datasets
+        self._is_sliced = is_sliced
+        self._save_folder = save_folder
+        self._model_trainers = model_trainers
+        self._input_reconstructors = input_reconstructors
+        self._gt_reconstructors = gt_reconstructors
+        self._segmentation_reconstructors = segmentation_reconstructors
+        self._normalize_reconstructors = normalize_reconstructors
+        self._augmented_reconstructors = augmented_reconstructors
+        self._build_augmented_images = build_augmented_images
+        self._device = device
+        self._num_threads = num_threads
+        self._max_pending = max_pending
+        self._compression_level = compression_level
+        self._noise_slice = noise_slice
+        self._noise_reference = noise_reference
+        self._context = mp.get_context("spawn")
+        self._jobs = None
+        self._results = None
+        self._process = None
+        self._used_model_ids = None
+
+    def _model_ids(self, reconstructor):
+        return [self._model_trainers.index(model) for model in reconstructor.models]
+
+    def _detach(self, reconstructors):
+        if reconstructors is None:
+            return None
+        return [(reconstructor.with_models(None), self._model_ids(reconstructor) if reconstructor.models else None)
+                for reconstructor in reconstructors]
+
+    def _start(self):
+        all_patches, ground_truth_patches = get_all_patches(self._reconstruction_datasets, self._is_sliced)
+        model_ids = set()
+        for reconstructors in [self._segmentation_reconstructors, self._normalize_reconstructors]:
+            for reconstructor in reconstructors if reconstructors is not None else []:
+                model_ids.update(self._model_ids(reconstructor))
+        models = {model_id: copy.deepcopy(self._model_trainers[model_id].model).cpu() for model_id in model_ids}
+        self._used_model_ids = sorted(model_ids)
+
+        self._jobs = self._context.Queue(maxsize=self._max_pending)
+        self._results = self._context.Queue()
+        self._process = self._context.Process(
+            target=_reconstruct,
+            args=(self._jobs, self._results, self._datasets, all_patches, ground_truth_patches, models,
+                  self._detach(self._input_reconstructors), self._detach(self._gt_reconstructors),
+                  self._detach(self._segmentation_reconstructors), self._detach(self._normalize_reconstructors),
+                  self._detach(self._augmented_reconstructors) if self._build_augmented_images else None,
+                  self._save_folder, self._device, self._num_threads, self._compression_level, self._noise_slice,
+                  self._noise_reference),
+            daemon=True)
+        self._process.start()
+
+    def submit(self, epoch: int):
+        if self._process is None:
+            self._start()
+
+        if self._jobs.full():
+            LOGGER.warning("Reconstruction of epoch {} skipped: previous reconstruction still pending.".format(epoch))
+            return False
+
+        # Only the models used by the reconstructors, e.g. not the discriminator.
+        state_dicts = {}
+        for model_id in self._used_model_ids:
+            state_dicts[model_id] = {name: tensor.detach().to("cpu", copy=True) for name, tensor in
+                                     self._model_trainers[model_id].model.state_dict().items()}
+
+        try:
+            self._jobs.put_nowait((epoch, state_dicts))
+        except queue.Full:
+            LOGGER.warning("Reconstruction of epoch {} skipped: previous reconstruction still pending.".format(epoch))
+            return False
+
+        return True
+
+    def poll(self):
+        results = []
+        if self._results is None:
+            return results
+
+        while True:
+            try:
+                results.append(_log_result(self._results.get_nowait()))
+            except queue.Empty:
+                return results
+
+    def close(self, timeout: float = None):
+        if self._process is None:
+            return []
+
+        self._jobs.put(None)
+        results = []
+        while self._process.is_alive() or not self._results.empty():
+            try:
+                results.append(_log_result(self._results.get(timeout=1.0)))
+            except queue.Empty:
+                if timeout is not None:
+                    timeout -= 1.0
+                    if timeout <= 0:
+                        self._process.terminate()
+                        break
+        self._process.join()
+        self._process = None
+
+        return results
+
+
+def _reconstruct(jobs, results, datasets, all_patches, ground_truth_patches, models, input_reconstructors,
+                 gt_reconstructors, segmentation_reconstructors, normalize_reconstructors, augmented_reconstructors,
+                 save_folder, device, num_threads, compression_level, noise_slice, noise_reference):
+    torch.set_num_threads(num_threads)
+    writer = NiftiWriter(compression_level)
+    slicer = ImageSlicer()
+    seg_slicer = SegmentationSlicer()
+
+    for model in models.values():
+        model.to(device)
+        model.eval()
+
+    def attach(reconstructors):
+        return [reconstructor.with_models(
+            [models[model_id] for model_id in model_ids] if model_ids is not None else None, device)
+            for reconstructor, model_ids in reconstructors]
+
+    input_reconstructors = attach(input_reconstructors)
+    gt_reconstructors = attach(gt_reconstructors)
+    segmentation_reconstructors = attach(segmentation_reconstructors)
+    normalize_reconstructors = attach(normalize_reconstructors) if normalize_reconstructors is not None else None
+    augmented_reconstructors = attach(augmented_reconstructors) if augmented_reconstructors is not None else None
+
+    # Inputs and ground truths do not depend on the weights.
+    img_input = rebuild_image(datasets, all_patches, input_reconstructors)
+    img_gt = rebuild_image(datasets, ground_truth_patches, gt_reconstructors)
+    img_augmented = rebuild_image(datasets, all_patches, augmented_reconstructors) \
+        if augmented_reconstructors is not None else None
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            writer.close()
+            break
+
+        epoch, state_dicts = job
+        start = time.time()
+
+        try:
+            for model_id, model in models.items():
+                model.load_state_dict(state_dicts[model_id])
+
+            with torch.no_grad():
+                img_seg = rebuild_image(datasets, all_patches, segmentation_reconstructors)
+                img_norm = rebuild_image(datasets, all_patches, normalize_reconstructors) \
+                    if normalize_reconstructors is not None else None
+
+            save_rebuilt_image(epoch, save_folder, datasets, img_input, "Input", writer=writer)
+            save_rebuilt_image(epoch, save_folder, datasets, img_gt, "Ground_Truth", writer=writer)
+            save_rebuilt_image(epoch, save_folder, datasets, img_seg, "Segmented", writer=writer)
+            if img_norm is not None:
+                save_rebuilt_image(epoch, save_folder, datasets, img_norm, "Normalized", writer=writer)
+
+            if img_augmented is not None and img_norm is not None:
+                if noise_reference == "augmented":
+                    augmented_minus_inputs = {dataset: img_augmented[dataset] - img_input[dataset] for dataset in
+                                              datasets}
+                    noise_after_normalization = {dataset: img_norm[dataset] - img_augmented[dataset] for dataset in
+                                                 datasets}
+                else:
+                    augmented_minus_inputs, noise_after_normalization = rebuild_augmented_images(
+                        img_augmented, img_input, img_gt, img_norm, img_seg)
+                save_augmented_rebuilt_images(epoch, save_folder, datasets, img_augmented, augmented_minus_inputs,
+                                              noise_after_normalization, writer=writer)
+
+            skipped_fraction = {dataset: reconstructor.skipped_fraction for dataset, reconstructor in
+                                zip(datasets, segmentation_reconstructors)}
+            time_saved = sum(reconstructor.time_saved for reconstructor in
+                             segmentation_reconstructors + (normalize_reconstructors or []))
+
+            custom_variables = {}
+            dice = {}
+            hausdorff = {}
+            for dataset in datasets:
+                custom_variables["Reconstructed Segmented {} Image".format(dataset)] = seg_slicer.get_colored_slice(
+                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_seg[dataset], 0), 0), 160).squeeze(0)
+                custom_variables["Reconstructed Ground Truth {} Image".format(dataset)] = seg_slicer.get_colored_slice(
+                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_gt[dataset], 0), 0), 160).squeeze(0)
+                custom_variables["Reconstructed Input {} Image".format(dataset)] = slicer.get_slice(
+                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_input[dataset], 0), 0), 160)
+
+                if img_norm is not None:
+                    custom_variables["Reconstructed Normalized {} Image".format(dataset)] = slicer.get_slice(
+                        SliceType.AXIAL, np.expand_dims(np.expand_dims(img_norm[dataset], 0), 0), 160)
+
+                if img_augmented is not None and img_norm is not None:
+                    custom_variables["Reconstructed Augmented Input {} Image".format(dataset)] = slicer.get_slice(
+                        SliceType.AXIAL, np.expand_dims(np.expand_dims(img_augmented[dataset], 0), 0), 160)
+                    custom_variables[
+                        "Reconstructed Initial Noise {} Image".format(dataset)] = seg_slicer.get_colored_slice(
+                        SliceType.AXIAL,
+                        np.expand_dims(np.expand_dims(augmented_minus_inputs[dataset], 0), 0),
+                        noise_slice).squeeze(0)
+                    custom_variables[
+                        "Reconstructed Noise {} After Normalization".format(dataset)] = seg_slicer.get_colored_slice(
+                        SliceType.AXIAL,
+                        np.expand_dims(np.expand_dims(noise_after_normalization[dataset], 0), 0),
+                        noise_slice).squeeze(0)
+                else:
+                    custom_variables["Reconstructed Augmented Input {} Image".format(dataset)] = np.zeros((224, 192))
+                    custom_variables["Reconstructed Initial Noise {} Image".format(dataset)] = np.zeros((224, 192))
+                    custom_variables["Reconstructed Noise {} After Normalization".format(dataset)] = np.zeros(
+                        (224, 192))
+
+                dice[dataset] = dice_coefficient(img_seg[dataset], img_gt[dataset], num_classes=4)[-3:]
+                hausdorff[dataset] = volume_hausdorff_distance(img_gt[dataset], img_seg[dataset], num_classes=4)[-3:]
+
+            if img_norm is not None:
+                if len(datasets) == 3:
+                    histograms = construct_triple_histrogram(img_norm["iSEG"], img_input["iSEG"],
+                                                             img_norm["MRBrainS"], img_input["MRBrainS"],
+                                                             img_norm["ABIDE"], img_input["ABIDE"])
+                elif len(datasets) == 2:
+                    histograms = construct_double_histrogram(img_norm["iSEG"], img_input["iSEG"],
+                                                             img_norm["MRBrainS"], img_input["MRBrainS"])
+                else:
+                    histograms = construct_single_histogram(img_norm[datasets[0]], img_input[datasets[0]])
+                custom_variables["Reconstructed Images Histograms"] = histograms
+
+            # Logging is not configured in this process, the latencies are logged by the trainer's process.
+            writer.flush()
+            results.put(ReconstructionResult(epoch, custom_variables, dice, hausdorff, time.time() - start,
+                                             writer.latencies(), skipped_fraction, time_saved))
+        except Exception:
+            LOGGER.exception("Reconstruction of epoch {} failed.".format(epoch))
+
+
+def _log_result(result: ReconstructionResult):
+    for path, write_time, total_time in result.write_latencies:
+        LOGGER.info("Wrote {} in {:.2f}s ({:.2f}s after submission).".format(path, write_time, total_time))
+    LOGGER.info("Reconstruction of epoch {} done in {:.1f}s, skipping background patches saved about {:.1f}s.".format(
+        result.epoch, result.elapsed, result.time_saved))
+    return result
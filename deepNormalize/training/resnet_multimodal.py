@@ -15,35 +15,39 @@
 # ==============================================================================
 import time
 from datetime import timedelta
+from functools import partial
 from typing import List
 
-import cv2
 import numpy as np
-import pynvml
 import torch
 from ignite.metrics.confusion_matrix import ConfusionMatrix
 from kerosene.configs.configs import RunConfiguration
-from kerosene.metrics.gauges import AverageGauge
 from kerosene.nn.functional import js_div
 from kerosene.training.trainers import ModelTrainer
 from kerosene.training.trainers import Trainer
 from kerosene.utils.tensors import to_onehot
-from samitorch.utils.tensors import flatten
 from torch.utils.data import DataLoader, Dataset
 
 from deepNormalize.inputs.datasets import SliceDataset
 from deepNormalize.inputs.images import SliceType
 from deepNormalize.inputs.pools import ImagePool
-from deepNormalize.metrics.metrics import mean_hausdorff_distance
+from deepNormalize.metrics.gauges import TensorAverageGauge, PerDatasetConfusionMatrix, IntensityHistogramGauge, \
+    update_segmenter_metrics
+from deepNormalize.metrics.metrics import per_example_surface_distances, batch_histogram
+from deepNormalize.training.discriminator import forward_real_fake
+from deepNormalize.training.precision import PrecisionPolicy
+from deepNormalize.training.reconstruction import ReconstructionWorker
 from deepNormalize.training.sampler import Sampler
+from deepNormalize.training.step_scheduler import StepScheduler
+from deepNormalize.training.step_timer import StepTimer
 from deepNormalize.utils.constants import GENERATOR, SEGMENTER, DISCRIMINATOR, IMAGE_TARGET, DATASET_ID, ABIDE_ID, \
     NON_AUGMENTED_INPUTS, AUGMENTED_INPUTS, NON_AUGMENTED_TARGETS, AUGMENTED_TARGETS
 from deepNormalize.utils.constants import ISEG_ID, MRBRAINS_ID
-from deepNormalize.utils.image_slicer import ImageSlicer, SegmentationSlicer, LabelMapper, FeatureMapSlicer
+from deepNormalize.utils.image_slicer import ImageSlicer, SegmentationSlicer, LabelMapper, FeatureMapSlicer, \
+    SlicePlotter
+from deepNormalize.utils.telemetry import TelemetrySampler
 from deepNormalize.utils.utils import to_html, to_html_per_dataset, to_html_JS, to_html_time, count, \
-    construct_triple_histrogram, construct_double_histrogram, construct_single_histogram, construct_class_histogram, \
-    get_all_patches, rebuild_augmented_images, save_augmented_rebuilt_images, \
-    rebuild_image, save_rebuilt_image
+    construct_class_histogram
 
 
 class ResNetMultimodalTrainer(Trainer):
@@ -58,6 +62,12 @@ class ResNetMultimodalTrainer(Trainer):
                                                       test_data_loader, model_trainers, run_config)
 
         self._training_config = training_config
+        self._precision = PrecisionPolicy.from_config(training_config, {
+            "generator": model_trainers[GENERATOR], "segmenter": model_trainers[SEGMENTER],
+            "discriminator": model_trainers[DISCRIMINATOR]})
+        self._step_scheduler = StepScheduler.from_config(
+            training_config, {"Generator": 1, "Discriminator": 1, "Segmenter": 1})
+        self._preserve_batch_norm_statistics = training_config.variables.get("preserve_batch_norm_statistics", True)
         self._run_config = run_config
         self._dataset_configs = dataset_config
         self._patience_segmentation = training_config.patience_segmentation
@@ -65,6 +75,7 @@ class ResNetMultimodalTrainer(Trainer):
         self._seg_slicer = SegmentationSlicer()
         self._fm_slicer = FeatureMapSlicer()
         self._label_mapper = LabelMapper()
+        self._slice_plotter = SlicePlotter()
         self._reconstruction_datasets = reconstruction_datasets
         self._normalize_reconstructors = normalize_reconstructors
         self._input_reconstructors = input_reconstructors
@@ -74,36 +85,35 @@ class ResNetMultimodalTrainer(Trainer):
         self._num_real_datasets = len(input_reconstructors)
         self._num_datasets = self._num_real_datasets + 1
         self._fake_class_id = self._num_datasets - 1
-        self._D_G_X_as_X_train_gauge = AverageGauge()
-        self._D_G_X_as_X_valid_gauge = AverageGauge()
-        self._D_G_X_as_X_test_gauge = AverageGauge()
-        self._total_loss_train_gauge = AverageGauge()
-        self._total_loss_valid_gauge = AverageGauge()
-        self._total_loss_test_gauge = AverageGauge()
-        self._class_hausdorff_distance_gauge = AverageGauge()
-        self._mean_hausdorff_distance_gauge = AverageGauge()
-        self._per_dataset_hausdorff_distance_gauge = AverageGauge()
-        self._iSEG_dice_gauge = AverageGauge()
-        self._MRBrainS_dice_gauge = AverageGauge()
-        self._ABIDE_dice_gauge = AverageGauge()
-        self._iSEG_hausdorff_gauge = AverageGauge()
-        self._MRBrainS_hausdorff_gauge = AverageGauge()
-        self._ABIDE_hausdorff_gauge = AverageGauge()
-        self._valid_dice_gauge = AverageGauge()
-        self._class_dice_gauge_on_patches = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_iseg_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_mrbrains_images = AverageGauge()
-        self._class_dice_gauge_on_reconstructed_abide_images = AverageGauge()
-        self._hausdorff_distance_gauge_on_reconstructed_iseg_images = AverageGauge()
-        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images = AverageGauge()
-        self._hausdorff_distance_gauge_on_reconstructed_abide_images = AverageGauge()
-        self._js_div_inputs_gauge = AverageGauge()
-        self._js_div_gen_gauge = AverageGauge()
-        self._general_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._iSEG_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._MRBrainS_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
-        self._ABIDE_confusion_matrix_gauge = ConfusionMatrix(num_classes=4)
+        self._D_G_X_as_X_train_gauge = TensorAverageGauge()
+        self._D_G_X_as_X_valid_gauge = TensorAverageGauge()
+        self._D_G_X_as_X_test_gauge = TensorAverageGauge()
+        self._total_loss_train_gauge = TensorAverageGauge()
+        self._total_loss_valid_gauge = TensorAverageGauge()
+        self._total_loss_test_gauge = TensorAverageGauge()
+        self._class_hausdorff_distance_gauge = TensorAverageGauge()
+        self._class_hausdorff_95_distance_gauge = TensorAverageGauge()
+        self._class_average_surface_distance_gauge = TensorAverageGauge()
+        self._mean_hausdorff_distance_gauge = TensorAverageGauge()
+        self._per_dataset_hausdorff_distance_gauge = TensorAverageGauge()
+        self._iSEG_hausdorff_gauge = TensorAverageGauge()
+        self._MRBrainS_hausdorff_gauge = TensorAverageGauge()
+        self._ABIDE_hausdorff_gauge = TensorAverageGauge()
+        self._valid_dice_gauge = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_iseg_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_mrbrains_images = TensorAverageGauge()
+        self._class_dice_gauge_on_reconstructed_abide_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images = TensorAverageGauge()
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images = TensorAverageGauge()
+        self._js_div_inputs_gauge = TensorAverageGauge()
+        self._js_div_gen_gauge = TensorAverageGauge()
+        self._train_confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._valid_confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._confusion_matrix_gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        self._input_histogram_gauge = IntensityHistogramGauge.from_config(training_config, 3, 4)
+        self._generated_histogram_gauge = IntensityHistogramGauge.from_config(training_config, 3, 4)
         self._discriminator_confusion_matrix_gauge = ConfusionMatrix(num_classes=self._num_datasets)
         self._discriminator_confusion_matrix_gauge_training = ConfusionMatrix(num_classes=self._num_datasets)
         self._previous_mean_dice = 0.0
@@ -111,29 +121,36 @@ class ResNetMultimodalTrainer(Trainer):
         self._start_time = time.time()
         self._save_folder = save_folder
         self._sampler = Sampler(0.33)
-        self._discriminator_loss_train_gauge = AverageGauge()
-        self._discriminator_loss_valid_gauge = AverageGauge()
-        self._discriminator_loss_test_gauge = AverageGauge()
+        self._discriminator_loss_train_gauge = TensorAverageGauge()
+        self._discriminator_loss_valid_gauge = TensorAverageGauge()
+        self._discriminator_loss_test_gauge = TensorAverageGauge()
         self._fake_T1_pool = ImagePool()
         self._real_T1_pool = ImagePool()
         self._n_critics = training_config.n_critics
         self._is_sliced = True if isinstance(self._reconstruction_datasets[0], SliceDataset) else False
+        self._reconstruction_worker = ReconstructionWorker(
+            self._dataset_configs.keys(), self._reconstruction_datasets, self._is_sliced, self._save_folder,
+            self._model_trainers, input_reconstructors, gt_reconstructors, segmentation_reconstructors,
+            normalize_reconstructors, augmented_reconstructors, training_config.build_augmented_images,
+            device=training_config.variables.get("reconstruction_device", "cpu"),
+            compression_level=training_config.variables.get("nifti_compression_level", 6))
         print("Total number of parameters: {}".format(
             sum(p.numel() for p in self._model_trainers[SEGMENTER].parameters()) +
             sum(p.numel() for p in self._model_trainers[GENERATOR].parameters()) +
             sum(p.numel() for p in self._model_trainers[DISCRIMINATOR].parameters())))
-        pynvml.nvmlInit()
+        self._telemetry = TelemetrySampler.from_config(training_config, run_config.local_rank,
+                                                       {"Training": train_data_loader})
+        self._step_timer = StepTimer.from_config(training_config, save_folder)
 
-    def _train_d(self, D: ModelTrainer, real, fake, target, loss_gauge: AverageGauge):
-        D.zero_grad()
+    def _train_d(self, D: ModelTrainer, real, fake, target, loss_gauge: TensorAverageGauge):
+        self._precision.zero_grad(D)
 
-        # Forward on real data.
-        pred_D_X, x_conv1, x_layer1, x_layer2, x_layer3 = D.forward(real)
+        # Forward on real and fake data.
+        pred_D_X, pred_D_G_X, (x_conv1, x_layer1, x_layer2, x_layer3) = forward_real_fake(
+            D, real, fake.detach(), self._preserve_batch_norm_statistics)
         loss_D_real = D.compute_and_update_train_loss("Pred Real", torch.nn.functional.log_softmax(pred_D_X, dim=1),
                                                       target)
 
-        # Forward on fake data.
-        pred_D_G_X, _, _, _, _ = D.forward(fake.detach())
         # Forge bad class (K+1) tensor.
         y_bad = torch.Tensor().new_full(size=(pred_D_G_X.size(0),), fill_value=self._fake_class_id,
                                         dtype=torch.long, device=target.device, requires_grad=False)
@@ -142,8 +159,8 @@ class ResNetMultimodalTrainer(Trainer):
 
         # Combined loss
         loss_D = (loss_D_fake + loss_D_real) / 2
-        loss_D.backward()
-        loss_gauge.update(loss_D.item())
+        self._precision.backward(loss_D)
+        loss_gauge.update(loss_D.detach())
 
         # Forge bad class (K+1) tensor.
         pred = torch.cat((pred_D_X, pred_D_G_X), dim=0)
@@ -152,18 +169,17 @@ class ResNetMultimodalTrainer(Trainer):
         metric = D.compute_metrics(pred, target)
         D.update_train_metrics(metric)
 
-        D.step()
+        self._precision.step(D)
 
         return loss_D, pred, target, x_conv1, x_layer1, x_layer2, x_layer3
 
-    def _valid_d(self, D: ModelTrainer, real, fake, target, loss_gauge: AverageGauge):
-        # Forward on real data.
-        pred_D_X, _, _, _, _ = D.forward(real)
+    def _valid_d(self, D: ModelTrainer, real, fake, target, loss_gauge: TensorAverageGauge):
+        # Forward on real and fake data.
+        pred_D_X, pred_D_G_X, _ = forward_real_fake(
+            D, real, fake.detach(), self._preserve_batch_norm_statistics)
         loss_D_real = D.compute_and_update_valid_loss("Pred Real", torch.nn.functional.log_softmax(pred_D_X, dim=1),
                                                       target)
 
-        # Forward on fake data.
-        pred_D_G_X, _, _, _, _ = D.forward(fake.detach())
         # Forge bad class (K+1) tensor.
         y_bad = torch.Tensor().new_full(size=(pred_D_G_X.size(0),), fill_value=self._fake_class_id,
                                         dtype=torch.long, device=target.device, requires_grad=False)
@@ -172,7 +188,7 @@ class ResNetMultimodalTrainer(Trainer):
 
         # Combined loss
         loss_D = (loss_D_fake + loss_D_real) / 2
-        loss_gauge.update(loss_D.item())
+        loss_gauge.update(loss_D.detach())
 
         pred = torch.cat((pred_D_X, pred_D_G_X), dim=0)
         target = torch.cat((target, y_bad), dim=0)
@@ -180,15 +196,16 @@ class ResNetMultimodalTrainer(Trainer):
         metric = D.compute_metrics(pred, target)
         D.update_valid_metrics(metric)
 
-    def _test_d(self, D: ModelTrainer, real, fake, target, loss_gauge: AverageGauge):
-        # Forward on real data.
-        pred_D_X, _, _, _, _ = D.forward(real)
+        return loss_D, pred, target
+
+    def _test_d(self, D: ModelTrainer, real, fake, target, loss_gauge: TensorAverageGauge):
+        # Forward on real and fake data.
+        pred_D_X, pred_D_G_X, _ = forward_real_fake(
+            D, real, fake.detach(), self._preserve_batch_norm_statistics)
 
         loss_D_real = D.compute_and_update_test_loss("Pred Real", torch.nn.functional.log_softmax(pred_D_X, dim=1),
                                                      target)
 
-        # Forward on fake data.
-        pred_D_G_X, _, _, _, _ = D.forward(fake.detach())
         # Forge bad class (K+1) tensor.
         y_bad = torch.Tensor().new_full(size=(pred_D_G_X.size(0),), fill_value=self._fake_class_id,
                                         dtype=torch.long, device=target.device, requires_grad=False)
@@ -197,7 +214,7 @@ class ResNetMultimodalTrainer(Trainer):
 
         # Combined loss
         loss_D = (loss_D_fake + loss_D_real) / 2
-        loss_gauge.update(loss_D.item())
+        loss_gauge.update(loss_D.detach())
 
         pred = torch.cat((pred_D_X, pred_D_G_X), dim=0)
         target = torch.cat((target, y_bad), dim=0)
@@ -208,98 +225,92 @@ class ResNetMultimodalTrainer(Trainer):
         return loss_D, pred, target
 
     def _train_g(self, G: ModelTrainer, real, backward=True):
-        G.zero_grad()
+        self._precision.zero_grad(G)
 
         gen_pred = torch.nn.functional.relu(G.forward(real))
 
         loss_G = G.compute_and_update_train_loss("MSELoss", gen_pred, real)
 
-        metric = G.compute_metric("MeanSquaredError", gen_pred, real)
-        G.update_train_metric("MeanSquaredError", metric / 32768)
+        # The per voxel MSE metric is the MSE loss, no need to compute it a second time.
+        G.update_train_metric("MeanSquaredError", loss_G.detach())
 
         if backward:
-            loss_G.backward()
-            G.step()
+            self._precision.backward(loss_G)
+            self._precision.step(G)
 
         return gen_pred
 
     def _valid_g(self, G: ModelTrainer, real):
         gen_pred = torch.nn.functional.relu(G.forward(real))
 
-        G.compute_and_update_valid_loss("MSELoss", gen_pred, real)
+        loss_G = G.compute_and_update_valid_loss("MSELoss", gen_pred, real)
 
-        metric = G.compute_metric("MeanSquaredError", gen_pred, real)
-        G.update_valid_metric("MeanSquaredError", metric / 32768)
+        # The per voxel MSE metric is the MSE loss, no need to compute it a second time.
+        G.update_valid_metric("MeanSquaredError", loss_G.detach())
 
         return gen_pred
 
     def _test_g(self, G: ModelTrainer, real):
         gen_pred = torch.nn.functional.relu(G.forward(real))
 
-        G.compute_and_update_test_loss("MSELoss", gen_pred, real)
+        loss_G = G.compute_and_update_test_loss("MSELoss", gen_pred, real)
 
-        metric = G.compute_metric("MeanSquaredError", gen_pred, real)
-        G.update_test_metric("MeanSquaredError", metric / 32768)
+        # The per voxel MSE metric is the MSE loss, no need to compute it a second time.
+        G.update_test_metric("MeanSquaredError", loss_G.detach())
 
         return gen_pred
 
     def _train_s(self, S: ModelTrainer, inputs, target, backward=True):
-        S.zero_grad()
+        self._precision.zero_grad(S)
 
-        target_ohe = to_onehot(torch.squeeze(target, dim=1).long(), num_classes=4)
-        target = torch.squeeze(target, dim=1).long()
+        target_ohe = to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4)
 
         seg_pred = torch.nn.functional.softmax(S.forward(inputs), dim=1)
 
         loss_S = S.compute_loss("DiceLoss", seg_pred, target_ohe)
         S.update_train_loss("DiceLoss", loss_S.mean())
 
-        metrics = S.compute_metrics(seg_pred, target)
-        metrics["Dice"] = metrics["Dice"].mean()
-        metrics["IoU"] = metrics["IoU"].mean()
-        S.update_train_metrics(metrics)
+        self._update_confusion_matrix(self._train_confusion_matrix_gauge, seg_pred, target)
 
         if backward:
-            loss_S.mean().backward()
-            S.step()
+            self._precision.backward(loss_S.mean())
+            self._precision.step(S)
 
         return seg_pred, loss_S
 
     def _valid_s(self, S: ModelTrainer, inputs, target):
-        target_ohe = to_onehot(torch.squeeze(target, dim=1).long(), num_classes=4)
-        target = torch.squeeze(target, dim=1).long()
+        target_ohe = to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4)
 
         seg_pred = torch.nn.functional.softmax(S.forward(inputs), dim=1)
 
         loss_S = S.compute_loss("DiceLoss", seg_pred, target_ohe)
         S.update_valid_loss("DiceLoss", loss_S.mean())
 
-        metrics = S.compute_metrics(seg_pred, target)
-        metrics["Dice"] = metrics["Dice"].mean()
-        metrics["IoU"] = metrics["IoU"].mean()
-        S.update_valid_metrics(metrics)
+        self._update_confusion_matrix(self._valid_confusion_matrix_gauge, seg_pred, target)
 
         return seg_pred, loss_S
 
-    def _test_s(self, S: ModelTrainer, inputs, target, metric_gauge: AverageGauge):
-        target_ohe = to_onehot(torch.squeeze(target, dim=1).long(), num_classes=4)
-        target = torch.squeeze(target, dim=1).long()
+    def _test_s(self, S: ModelTrainer, inputs, target):
+        target_ohe = to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4)
 
         seg_pred = torch.nn.functional.softmax(S.forward(inputs), dim=1)
 
         loss_S = S.compute_loss("DiceLoss", seg_pred, target_ohe)
         S.update_test_loss("DiceLoss", loss_S.mean())
 
-        metrics = S.compute_metrics(seg_pred, target)
-        metric_gauge.update(np.array(metrics["Dice"]))
-        metrics["Dice"] = metrics["Dice"].mean()
-        metrics["IoU"] = metrics["IoU"].mean()
-        S.update_test_metrics(metrics)
+        self._update_confusion_matrix(self._confusion_matrix_gauge, seg_pred, target)
 
         return seg_pred, loss_S
 
-    def _loss_D_G_X_as_X(self, D: ModelTrainer, inputs, target, loss_gauge: AverageGauge):
-        pred_D_G_X, x_conv1, x_layer1, x_layer2, x_layer3 = D.forward(inputs)
+    @staticmethod
+    def _update_confusion_matrix(confusion_matrix_gauge: PerDatasetConfusionMatrix, seg_pred, target):
+        return confusion_matrix_gauge.update(torch.argmax(seg_pred, dim=1),
+                                             torch.squeeze(target[IMAGE_TARGET], dim=1).long(), target[DATASET_ID])
+
+    def _loss_D_G_X_as_X(self, D: ModelTrainer, inputs, target, loss_gauge: TensorAverageGauge, pred_D_G_X=None):
+        # Reuse the fake logits of the discriminator pass when the caller already has them.
+        if pred_D_G_X is None:
+            pred_D_G_X, _, _, _, _ = D.forward(inputs)
         ones = torch.Tensor().new_ones(size=pred_D_G_X.size(), device=pred_D_G_X.device, dtype=pred_D_G_X.dtype,
                                        requires_grad=False)
         loss_D_G_X_as_X = self._model_trainers[DISCRIMINATOR].compute_loss("Pred Real",
@@ -308,288 +319,253 @@ class ResNetMultimodalTrainer(Trainer):
                                                                                    pred_D_G_X, dim=1),
                                                                                dim=1),
                                                                            target)
-        loss_gauge.update(loss_D_G_X_as_X.item())
+        loss_gauge.update(loss_D_G_X_as_X.detach())
 
         return loss_D_G_X_as_X
 
     def train_step(self, inputs, target):
-        inputs, target = self._sampler(inputs, target)
-
-        disc_pred = None
-        disc_target = None
-
-        if self._should_activate_autoencoder():
-            gen_pred = self._train_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
-
-            for iter_critic in range(self._n_critics):
-                real_images, real_targets = self._real_T1_pool.query(
-                    (inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS]))
-                fake_images, _ = self._fake_T1_pool.query((gen_pred, target[NON_AUGMENTED_TARGETS]))
-
-                disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_d(
-                    self._model_trainers[DISCRIMINATOR], real_images, fake_images, real_targets[DATASET_ID],
-                    self._discriminator_loss_train_gauge)
-
-            seg_pred, _ = self._train_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS],
-                                        target[NON_AUGMENTED_TARGETS][IMAGE_TARGET])
-
-            if self.current_train_step % 500 == 0:
-                self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS].cpu().detach(),
-                                         gen_pred.cpu().detach(),
-                                         seg_pred.cpu().detach(),
-                                         target[NON_AUGMENTED_TARGETS][IMAGE_TARGET].cpu().detach(),
-                                         target[NON_AUGMENTED_TARGETS][DATASET_ID].cpu().detach())
-
-                self._make_disc_pie_plots(disc_pred, disc_target)
-
-        if self._should_activate_segmentation():
-            gen_pred = self._train_g(self._model_trainers[GENERATOR], inputs[AUGMENTED_INPUTS], backward=False)
-
-            for iter_critic in range(self._n_critics):
-                real_images, real_targets = self._real_T1_pool.query(
-                    (inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS]))
-                fake_images, _ = self._fake_T1_pool.query((gen_pred, target[AUGMENTED_TARGETS]))
-
-                disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_d(
-                    self._model_trainers[DISCRIMINATOR], real_images, fake_images, real_targets[DATASET_ID],
-                    self._discriminator_loss_train_gauge)
-
-            seg_pred, loss_S = self._train_s(self._model_trainers[SEGMENTER], gen_pred,
-                                             target[AUGMENTED_TARGETS][IMAGE_TARGET], backward=False)
-
-            fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
-                                                  dtype=torch.long, device=inputs[AUGMENTED_INPUTS].device,
-                                                  requires_grad=False)
-            disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred, fake_target,
-                                                   self._D_G_X_as_X_train_gauge)
-
-            total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
-                         self._training_config.variables["disc_ratio"] * disc_loss_as_X
-            self._total_loss_train_gauge.update(total_loss.item())
-
-            total_loss.backward()
-
-            self._model_trainers[SEGMENTER].step()
-            self._model_trainers[GENERATOR].step()
-
+        self._step_timer.begin("Training", self.current_train_step)
+        with self._precision.autocast(), self._step_scheduler.measure(self.current_train_step):
+            inputs, target = self._sampler(inputs, target)
+            self._step_timer.lap("Sampler")
+
+            disc_pred = None
+            disc_target = None
+
+            if self._should_activate_autoencoder():
+                gen_pred = self._train_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
+                self._step_timer.lap("Generator")
+
+                for iter_critic in range(self._n_critics):
+                    real_images, real_targets = self._real_T1_pool.query(
+                        (inputs[NON_AUGMENTED_INPUTS], target[NON_AUGMENTED_TARGETS]))
+                    fake_images, _ = self._fake_T1_pool.query((gen_pred, target[NON_AUGMENTED_TARGETS]))
+
+                    disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_d(
+                        self._model_trainers[DISCRIMINATOR], real_images, fake_images, real_targets[DATASET_ID],
+                        self._discriminator_loss_train_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, _ = self._train_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS],
+                                            target[NON_AUGMENTED_TARGETS])
+                self._step_timer.lap("Segmenter")
+
+                if self.current_train_step % 500 == 0:
+                    self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS],
+                                             gen_pred,
+                                             seg_pred,
+                                             target[NON_AUGMENTED_TARGETS][IMAGE_TARGET],
+                                             target[NON_AUGMENTED_TARGETS][DATASET_ID])
+
+                    self._make_disc_pie_plots(disc_pred, disc_target)
+                self._step_timer.lap("Visualization")
+
+            if self._should_activate_segmentation():
+                gen_pred = self._train_g(self._model_trainers[GENERATOR], inputs[AUGMENTED_INPUTS], backward=False)
+                self._step_timer.lap("Generator")
+
+                for iter_critic in range(self._n_critics):
+                    real_images, real_targets = self._real_T1_pool.query(
+                        (inputs[AUGMENTED_INPUTS], target[AUGMENTED_TARGETS]))
+                    fake_images, _ = self._fake_T1_pool.query((gen_pred, target[AUGMENTED_TARGETS]))
+
+                    disc_loss, disc_pred, disc_target, x_conv1, x_layer1, x_layer2, x_layer3 = self._train_d(
+                        self._model_trainers[DISCRIMINATOR], real_images, fake_images, real_targets[DATASET_ID],
+                        self._discriminator_loss_train_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, loss_S = self._train_s(self._model_trainers[SEGMENTER], gen_pred,
+                                                 target[AUGMENTED_TARGETS], backward=False)
+                self._step_timer.lap("Segmenter")
+
+                fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
+                                                      dtype=torch.long, device=inputs[AUGMENTED_INPUTS].device,
+                                                      requires_grad=False)
+                # The discriminator is not stepped on this loss, only the generator needs its gradients.
+                with StepScheduler.frozen(self._model_trainers[DISCRIMINATOR]):
+                    disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred,
+                                                           fake_target, self._D_G_X_as_X_train_gauge)
+
+                total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
+                             self._training_config.variables["disc_ratio"] * disc_loss_as_X
+                self._total_loss_train_gauge.update(total_loss.detach())
+
+                self._precision.backward(total_loss)
+
+                self._precision.step(self._model_trainers[SEGMENTER])
+                self._precision.step(self._model_trainers[GENERATOR])
+
+                self._step_timer.lap("Adversarial Backward")
+                if self.current_train_step % 500 == 0:
+                    self._update_image_plots(self.phase, inputs[AUGMENTED_INPUTS],
+                                             gen_pred,
+                                             seg_pred,
+                                             target[AUGMENTED_TARGETS][IMAGE_TARGET],
+                                             target[AUGMENTED_TARGETS][DATASET_ID])
+
+                    self._make_disc_pie_plots(disc_pred, disc_target)
+                self._step_timer.lap("Visualization")
+
+            self._discriminator_confusion_matrix_gauge_training.update((
+                to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
+                          num_classes=self._num_datasets), disc_target))
+
+            self._step_timer.lap("Metrics")
             if self.current_train_step % 500 == 0:
-                self._update_image_plots(self.phase, inputs[AUGMENTED_INPUTS].cpu().detach(),
-                                         gen_pred.cpu().detach(),
-                                         seg_pred.cpu().detach(),
-                                         target[AUGMENTED_TARGETS][IMAGE_TARGET].cpu().detach(),
-                                         target[AUGMENTED_TARGETS][DATASET_ID].cpu().detach())
-
-                self._make_disc_pie_plots(disc_pred, disc_target)
-
-        self._discriminator_confusion_matrix_gauge_training.update((
-            to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
-                      num_classes=self._num_datasets), disc_target))
-
-        if self.current_train_step % 500 == 0:
-            self.custom_variables["Conv1 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_conv1.cpu().detach(), scale_factor=5, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer1 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer1.cpu().detach(), scale_factor=10, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer2 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer2.cpu().detach(), scale_factor=20, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
-            self.custom_variables["Layer3 FM"] = self._fm_slicer.get_colored_slice(SliceType.AXIAL, np.expand_dims(
-                torch.nn.functional.interpolate(x_layer3.cpu().detach(), scale_factor=20, mode="trilinear",
-                                                align_corners=True).numpy()[0], 0))
+                self._slice_plotter.plot(self.custom_variables, "Conv1 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_conv1[:1],
+                                         scale_factor=5)
+                self._slice_plotter.plot(self.custom_variables, "Layer1 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer1[:1],
+                                         scale_factor=10)
+                self._slice_plotter.plot(self.custom_variables, "Layer2 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer2[:1],
+                                         scale_factor=20)
+                self._slice_plotter.plot(self.custom_variables, "Layer3 FM",
+                                         partial(self._fm_slicer.get_colored_slice, SliceType.AXIAL), x_layer3[:1],
+                                         scale_factor=20)
+            self._step_timer.lap("Visualization")
+
+        self._precision.update()
+        self._step_timer.end()
 
     def validate_step(self, inputs, target):
-        if self._should_activate_autoencoder():
-            gen_pred = self._valid_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
-
-            self._valid_d(
-                self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS], gen_pred, target[DATASET_ID],
-                self._discriminator_loss_valid_gauge)
-
-            seg_pred, _ = self._valid_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS],
-                                        target[IMAGE_TARGET])
-
-        if self._should_activate_segmentation():
-            gen_pred = self._valid_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
-
-            self._valid_d(self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS], gen_pred,
-                          target[DATASET_ID], self._discriminator_loss_valid_gauge)
-
-            seg_pred, loss_S = self._valid_s(self._model_trainers[SEGMENTER], gen_pred, target[IMAGE_TARGET])
-
-            fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
-                                                  dtype=torch.long, device=inputs[NON_AUGMENTED_INPUTS].device,
-                                                  requires_grad=False)
-            disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred, fake_target,
-                                                   self._D_G_X_as_X_valid_gauge)
-
-            total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
-                         self._training_config.variables["disc_ratio"] * disc_loss_as_X
-            self._total_loss_valid_gauge.update(total_loss.item())
-
-        if self.current_valid_step % 100 == 0:
-            self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS].cpu().detach(),
-                                     gen_pred.cpu().detach(),
-                                     seg_pred.cpu().detach(),
-                                     target[IMAGE_TARGET].cpu().detach(),
-                                     target[DATASET_ID].cpu().detach())
+        self._step_timer.begin("Validation", self.current_valid_step)
+        with self._precision.autocast():
+            if self._should_activate_autoencoder():
+                gen_pred = self._valid_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
+                self._step_timer.lap("Generator")
+
+                self._valid_d(
+                    self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS], gen_pred, target[DATASET_ID],
+                    self._discriminator_loss_valid_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, _ = self._valid_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS],
+                                            target)
+                self._step_timer.lap("Segmenter")
+
+            if self._should_activate_segmentation():
+                gen_pred = self._valid_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
+                self._step_timer.lap("Generator")
+
+                _, disc_pred, _ = self._valid_d(self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS],
+                                                gen_pred, target[DATASET_ID], self._discriminator_loss_valid_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, loss_S = self._valid_s(self._model_trainers[SEGMENTER], gen_pred, target)
+                self._step_timer.lap("Segmenter")
+
+                fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
+                                                      dtype=torch.long, device=inputs[NON_AUGMENTED_INPUTS].device,
+                                                      requires_grad=False)
+                disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred, fake_target,
+                                                       self._D_G_X_as_X_valid_gauge, disc_pred[gen_pred.size(0):])
+
+                total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
+                             self._training_config.variables["disc_ratio"] * disc_loss_as_X
+                self._total_loss_valid_gauge.update(total_loss.detach())
+                self._step_timer.lap("Metrics")
+
+            if self.current_valid_step % 100 == 0:
+                self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS],
+                                         gen_pred,
+                                         seg_pred,
+                                         target[IMAGE_TARGET],
+                                         target[DATASET_ID])
+            self._step_timer.lap("Visualization")
+        self._step_timer.end()
 
     def test_step(self, inputs, target):
-        if self._should_activate_autoencoder():
-            gen_pred = self._test_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
-
-            _, disc_pred, disc_target, = self._test_d(
-                self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS], gen_pred, target[DATASET_ID],
-                self._discriminator_loss_test_gauge)
-
-            seg_pred, _ = self._test_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS],
-                                       target[IMAGE_TARGET], self._class_dice_gauge_on_patches)
-
-        if self._should_activate_segmentation():
-            gen_pred = self._test_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
-
-            _, disc_pred, disc_target = self._test_d(self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS],
-                                                     gen_pred, target[DATASET_ID], self._discriminator_loss_test_gauge)
-
-            seg_pred, loss_S = self._test_s(self._model_trainers[SEGMENTER], gen_pred, target[IMAGE_TARGET],
-                                            self._class_dice_gauge_on_patches)
-
-            fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
-                                                  dtype=torch.long, device=inputs[NON_AUGMENTED_INPUTS].device,
-                                                  requires_grad=False)
-            disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred, fake_target,
-                                                   self._D_G_X_as_X_test_gauge)
-
-            total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
-                         self._training_config.variables["disc_ratio"] * disc_loss_as_X
-            self._total_loss_test_gauge.update(total_loss.item())
-
-            if seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)].shape[0] != 0:
-                self._iSEG_dice_gauge.update(np.array(self._model_trainers[SEGMENTER].compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._iSEG_hausdorff_gauge.update(mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)], dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._iSEG_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ISEG_ID)], dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)].long(), dim=1)))
-
-            else:
-                self._iSEG_dice_gauge.update(np.zeros((3,)))
-                self._iSEG_hausdorff_gauge.update(np.zeros((3,)))
-
-            if seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)].shape[0] != 0:
-                self._MRBrainS_dice_gauge.update(np.array(self._model_trainers[SEGMENTER].compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._MRBrainS_hausdorff_gauge.update(mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                                        dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                      dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._MRBrainS_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)],
-                                                        dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)].long(), dim=1)))
-            else:
-                self._MRBrainS_dice_gauge.update(np.zeros((3,)))
-                self._MRBrainS_hausdorff_gauge.update(np.zeros((3,)))
-
-            if seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)].shape[0] != 0:
-                self._ABIDE_dice_gauge.update(np.array(self._model_trainers[SEGMENTER].compute_metrics(
-                    torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)],
-                                  dim=1).long())["Dice"].numpy()))
-
-                self._ABIDE_hausdorff_gauge.update(mean_hausdorff_distance(
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                            dim=1), num_classes=4),
-                    to_onehot(
-                        torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1).long(),
-                        num_classes=4))[-3:])
-
-                self._ABIDE_confusion_matrix_gauge.update((
-                    to_onehot(
-                        torch.argmax(
-                            torch.nn.functional.softmax(seg_pred[torch.where(target[DATASET_ID] == ABIDE_ID)], dim=1),
-                            dim=1, keepdim=False),
-                        num_classes=4),
-                    torch.squeeze(target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)].long(), dim=1)))
-            else:
-                self._ABIDE_dice_gauge.update(np.zeros((3,)))
-                self._ABIDE_hausdorff_gauge.update(np.zeros((3,)))
-
-            self._class_hausdorff_distance_gauge.update(
-                mean_hausdorff_distance(
-                    to_onehot(torch.argmax(torch.nn.functional.softmax(seg_pred, dim=1), dim=1), num_classes=4),
-                    to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4))[-3:])
-
-            self._general_confusion_matrix_gauge.update((
-                to_onehot(torch.argmax(torch.nn.functional.softmax(seg_pred, dim=1), dim=1, keepdim=False),
-                          num_classes=4),
-                torch.squeeze(target[IMAGE_TARGET].long(), dim=1)))
-
-            inputs_reshaped = inputs[AUGMENTED_INPUTS].reshape(inputs[NON_AUGMENTED_INPUTS].shape[0],
-                                                               inputs[NON_AUGMENTED_INPUTS].shape[1] *
-                                                               inputs[NON_AUGMENTED_INPUTS].shape[2] *
-                                                               inputs[NON_AUGMENTED_INPUTS].shape[3] *
-                                                               inputs[NON_AUGMENTED_INPUTS].shape[4])
-
-            gen_pred_reshaped = gen_pred.reshape(gen_pred.shape[0],
-                                                 gen_pred.shape[1] * gen_pred.shape[2] * gen_pred.shape[3] *
-                                                 gen_pred.shape[4])
-            inputs_ = torch.Tensor().new_zeros((inputs_reshaped.shape[0], 256))
-            gen_pred_ = torch.Tensor().new_zeros((gen_pred_reshaped.shape[0], 256))
-            for image in range(inputs_reshaped.shape[0]):
-                inputs_[image] = torch.nn.functional.softmax(torch.histc(inputs_reshaped[image], bins=256), dim=0)
-                gen_pred_[image] = torch.nn.functional.softmax(torch.histc(gen_pred_reshaped[image].float(), bins=256),
-                                                               dim=0)
-
-            self._js_div_inputs_gauge.update(js_div(inputs_).item())
-            self._js_div_gen_gauge.update(js_div(gen_pred_).item())
-
-        self._discriminator_confusion_matrix_gauge.update((
-            to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
-                      num_classes=self._num_datasets),
-            disc_target))
-
-        if self.current_test_step % 100 == 0:
-            self._update_histograms(inputs[NON_AUGMENTED_INPUTS][:, 0, ...].unsqueeze(1), target, gen_pred[:, 0, ...].unsqueeze(1))
-            self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS].cpu().detach(),
-                                     gen_pred.cpu().detach(),
-                                     seg_pred.cpu().detach(),
-                                     target[IMAGE_TARGET].cpu().detach(),
-                                     target[DATASET_ID].cpu().detach())
+        self._step_timer.begin("Test", self.current_test_step)
+        with self._precision.autocast():
+            if self._should_activate_autoencoder():
+                gen_pred = self._test_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
+                self._step_timer.lap("Generator")
+
+                _, disc_pred, disc_target, = self._test_d(
+                    self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS], gen_pred, target[DATASET_ID],
+                    self._discriminator_loss_test_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, _ = self._test_s(self._model_trainers[SEGMENTER], inputs[NON_AUGMENTED_INPUTS], target)
+                self._step_timer.lap("Segmenter")
+
+            if self._should_activate_segmentation():
+                gen_pred = self._test_g(self._model_trainers[GENERATOR], inputs[NON_AUGMENTED_INPUTS])
+                self._step_timer.lap("Generator")
+
+                _, disc_pred, disc_target = self._test_d(self._model_trainers[DISCRIMINATOR], inputs[NON_AUGMENTED_INPUTS],
+                                                         gen_pred, target[DATASET_ID], self._discriminator_loss_test_gauge)
+                self._step_timer.lap("Discriminator")
+
+                seg_pred, loss_S = self._test_s(self._model_trainers[SEGMENTER], gen_pred, target)
+                self._step_timer.lap("Segmenter")
+
+                fake_target = torch.Tensor().new_full(fill_value=self._fake_class_id, size=(gen_pred.size(0),),
+                                                      dtype=torch.long, device=inputs[NON_AUGMENTED_INPUTS].device,
+                                                      requires_grad=False)
+                disc_loss_as_X = self._loss_D_G_X_as_X(self._model_trainers[DISCRIMINATOR], gen_pred, fake_target,
+                                                       self._D_G_X_as_X_test_gauge, disc_pred[gen_pred.size(0):])
+
+                total_loss = self._training_config.variables["seg_ratio"] * loss_S.mean() + \
+                             self._training_config.variables["disc_ratio"] * disc_loss_as_X
+                self._total_loss_test_gauge.update(total_loss.detach())
+
+                seg_onehot = to_onehot(torch.argmax(seg_pred, dim=1), num_classes=4)
+                target_onehot = to_onehot(torch.squeeze(target[IMAGE_TARGET], dim=1).long(), num_classes=4)
+
+                # Surface distances of every example and brain class, computed once and averaged per dataset.
+                distances = per_example_surface_distances(seg_onehot[:, -3:], target_onehot[:, -3:])
+                dataset_ids = target[DATASET_ID].cpu().numpy()
+
+                per_dataset_gauges = [(ISEG_ID, self._iSEG_hausdorff_gauge),
+                                      (MRBRAINS_ID, self._MRBrainS_hausdorff_gauge),
+                                      (ABIDE_ID, self._ABIDE_hausdorff_gauge)]
+                for dataset_id, hausdorff_gauge in per_dataset_gauges:
+                    # A dataset absent from the batch counts as a zero Hausdorff distance.
+                    mask = dataset_ids == dataset_id
+                    hausdorff_gauge.update(distances[mask, :, 0].mean(axis=0) if mask.any() else np.zeros((3,)))
+
+                self._class_hausdorff_distance_gauge.update(distances[:, :, 0].mean(axis=0))
+                self._class_hausdorff_95_distance_gauge.update(distances[:, :, 1].mean(axis=0))
+                self._class_average_surface_distance_gauge.update(distances[:, :, 2].mean(axis=0))
+
+                inputs_reshaped = inputs[AUGMENTED_INPUTS].reshape(inputs[NON_AUGMENTED_INPUTS].shape[0],
+                                                                   inputs[NON_AUGMENTED_INPUTS].shape[1] *
+                                                                   inputs[NON_AUGMENTED_INPUTS].shape[2] *
+                                                                   inputs[NON_AUGMENTED_INPUTS].shape[3] *
+                                                                   inputs[NON_AUGMENTED_INPUTS].shape[4])
+
+                gen_pred_reshaped = gen_pred.reshape(gen_pred.shape[0],
+                                                     gen_pred.shape[1] * gen_pred.shape[2] * gen_pred.shape[3] *
+                                                     gen_pred.shape[4])
+                inputs_ = torch.nn.functional.softmax(batch_histogram(inputs_reshaped, bins=256), dim=1)
+                gen_pred_ = torch.nn.functional.softmax(batch_histogram(gen_pred_reshaped, bins=256), dim=1)
+
+                self._js_div_inputs_gauge.update(js_div(inputs_).detach())
+                self._js_div_gen_gauge.update(js_div(gen_pred_).detach())
+                self._step_timer.lap("Metrics")
+
+            self._discriminator_confusion_matrix_gauge.update((
+                to_onehot(torch.argmax(torch.nn.functional.softmax(disc_pred, dim=1), dim=1),
+                          num_classes=self._num_datasets),
+                disc_target))
+
+            self._accumulate_histograms(inputs[NON_AUGMENTED_INPUTS][:, 0, ...].unsqueeze(1), target, gen_pred[:, 0, ...].unsqueeze(1))
+            self._step_timer.lap("Metrics")
+            if self.current_test_step % 100 == 0:
+                self._update_histograms(inputs[NON_AUGMENTED_INPUTS][:, 0, ...].unsqueeze(1), target, gen_pred[:, 0, ...].unsqueeze(1))
+                self._update_image_plots(self.phase, inputs[NON_AUGMENTED_INPUTS],
+                                         gen_pred,
+                                         seg_pred,
+                                         target[IMAGE_TARGET],
+                                         target[DATASET_ID])
+            self._step_timer.lap("Visualization")
+        self._step_timer.end()
 
     def scheduler_step(self):
+        self._precision.flush()
         self._model_trainers[GENERATOR].scheduler_step()
         self._model_trainers[DISCRIMINATOR].scheduler_step()
         self._model_trainers[SEGMENTER].scheduler_step()
@@ -602,20 +578,19 @@ class ResNetMultimodalTrainer(Trainer):
         self._total_loss_valid_gauge.reset()
         self._total_loss_test_gauge.reset()
         self._class_hausdorff_distance_gauge.reset()
+        self._class_hausdorff_95_distance_gauge.reset()
+        self._class_average_surface_distance_gauge.reset()
         self._mean_hausdorff_distance_gauge.reset()
-        self._iSEG_dice_gauge.reset()
-        self._MRBrainS_dice_gauge.reset()
-        self._ABIDE_dice_gauge.reset()
         self._iSEG_hausdorff_gauge.reset()
         self._MRBrainS_hausdorff_gauge.reset()
         self._ABIDE_hausdorff_gauge.reset()
-        self._class_dice_gauge_on_patches.reset()
         self._js_div_inputs_gauge.reset()
         self._js_div_gen_gauge.reset()
-        self._general_confusion_matrix_gauge.reset()
-        self._iSEG_confusion_matrix_gauge.reset()
-        self._MRBrainS_confusion_matrix_gauge.reset()
-        self._ABIDE_confusion_matrix_gauge.reset()
+        self._train_confusion_matrix_gauge.reset()
+        self._valid_confusion_matrix_gauge.reset()
+        self._confusion_matrix_gauge.reset()
+        self._input_histogram_gauge.reset()
+        self._generated_histogram_gauge.reset()
         self._discriminator_confusion_matrix_gauge.reset()
         self._discriminator_confusion_matrix_gauge_training.reset()
         self._discriminator_loss_train_gauge.reset()
@@ -626,6 +601,11 @@ class ResNetMultimodalTrainer(Trainer):
             self._model_trainers[GENERATOR].optimizer_lr = 0.001
 
     def on_train_epoch_end(self):
+        self._step_scheduler.log_statistics(self._current_epoch)
+        update_segmenter_metrics(self._model_trainers[SEGMENTER].update_train_metric,
+                                 self._model_trainers[SEGMENTER]._train_metrics.keys(),
+                                 self._train_confusion_matrix_gauge)
+
         self.custom_variables["D(G(X)) | X"] = [self._D_G_X_as_X_train_gauge.compute()]
         self.custom_variables["Discriminator Loss"] = [self._discriminator_loss_train_gauge.compute()]
         self.custom_variables["Total Loss"] = [self._total_loss_train_gauge.compute()]
@@ -638,147 +618,32 @@ class ResNetMultimodalTrainer(Trainer):
                 (self._num_datasets, self._num_datasets))
 
     def on_valid_epoch_end(self):
+        metrics = update_segmenter_metrics(self._model_trainers[SEGMENTER].update_valid_metric,
+                                           self._model_trainers[SEGMENTER]._valid_metrics.keys(),
+                                           self._valid_confusion_matrix_gauge)
+        if metrics is not None:
+            self._valid_dice_gauge.update(metrics["Dice"])
+
         self.custom_variables["D(G(X)) | X"] = [self._D_G_X_as_X_valid_gauge.compute()]
         self.custom_variables["Discriminator Loss"] = [self._discriminator_loss_valid_gauge.compute()]
         self.custom_variables["Total Loss"] = [self._total_loss_valid_gauge.compute()]
 
     def on_test_epoch_end(self):
+        update_segmenter_metrics(self._model_trainers[SEGMENTER].update_test_metric,
+                                 self._model_trainers[SEGMENTER]._test_metrics.keys(),
+                                 self._confusion_matrix_gauge)
+
+        # Dice per class of the whole test epoch, overall and per dataset, derived from its confusion counts.
+        class_dice = PerDatasetConfusionMatrix.dice(self._confusion_matrix_gauge.compute())[-3:].cpu().numpy()
+        iseg_dice, mrbrains_dice, abide_dice = [
+            PerDatasetConfusionMatrix.dice(self._confusion_matrix_gauge.compute(dataset_id))[-3:].cpu().numpy()
+            for dataset_id in (ISEG_ID, MRBRAINS_ID, ABIDE_ID)]
+
         if self.epoch % 20 == 0:
-            self._per_dataset_hausdorff_distance_gauge.reset()
-            self._class_dice_gauge_on_reconstructed_iseg_images.reset()
-            self._class_dice_gauge_on_reconstructed_mrbrains_images.reset()
-            self._class_dice_gauge_on_reconstructed_abide_images.reset()
-            self._hausdorff_distance_gauge_on_reconstructed_iseg_images.reset()
-            self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.reset()
-            self._hausdorff_distance_gauge_on_reconstructed_abide_images.reset()
-
-            all_patches, ground_truth_patches = get_all_patches(self._reconstruction_datasets, self._is_sliced)
-
-            img_input = rebuild_image(self._dataset_configs.keys(), all_patches, self._input_reconstructors)
-            img_gt = rebuild_image(self._dataset_configs.keys(), ground_truth_patches, self._gt_reconstructors)
-            img_norm = rebuild_image(self._dataset_configs.keys(), all_patches, self._normalize_reconstructors)
-            img_seg = rebuild_image(self._dataset_configs.keys(), all_patches, self._segmentation_reconstructors)
-
-            save_rebuilt_image(self._current_epoch, self._save_folder, self._dataset_configs.keys(), img_input, "Input")
-            save_rebuilt_image(self._current_epoch, self._save_folder, self._dataset_configs.keys(), img_gt,
-                               "Ground_Truth")
-            save_rebuilt_image(self._current_epoch, self._save_folder, self._dataset_configs.keys(), img_norm,
-                               "Normalized")
-            save_rebuilt_image(self._current_epoch, self._save_folder, self._dataset_configs.keys(), img_seg,
-                               "Segmented")
-
-            if self._training_config.build_augmented_images:
-                img_augmented = rebuild_image(self._dataset_configs.keys(), all_patches, self._augmented_reconstructors)
-                augmented_minus_inputs, normalized_minus_inputs = rebuild_augmented_images(img_augmented, img_input,
-                                                                                           img_gt, img_norm, img_seg)
-
-                save_augmented_rebuilt_images(self._current_epoch, self._save_folder, self._dataset_configs.keys(),
-                                              img_augmented, augmented_minus_inputs, normalized_minus_inputs)
-
-            mean_mhd = []
-            for dataset in self._dataset_configs.keys():
-                self.custom_variables[
-                    "Reconstructed Normalized {} Image".format(dataset)] = self._slicer.get_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_norm[dataset], 0), 0), 160)
-                self.custom_variables[
-                    "Reconstructed Segmented {} Image".format(dataset)] = self._seg_slicer.get_colored_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_seg[dataset], 0), 0), 160).squeeze(0)
-                self.custom_variables[
-                    "Reconstructed Ground Truth {} Image".format(dataset)] = self._seg_slicer.get_colored_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_gt[dataset], 0), 0), 160).squeeze(0)
-                self.custom_variables[
-                    "Reconstructed Input {} Image".format(dataset)] = self._slicer.get_slice(
-                    SliceType.AXIAL, np.expand_dims(np.expand_dims(img_input[dataset], 0), 0), 160)
-
-                if self._training_config.build_augmented_images:
-                    self.custom_variables[
-                        "Reconstructed Augmented Input {} Image".format(dataset)] = self._slicer.get_slice(
-                        SliceType.AXIAL, np.expand_dims(np.expand_dims(img_augmented[dataset], 0), 0), 160)
-                    self.custom_variables[
-                        "Reconstructed Initial Noise {} Image".format(
-                            dataset)] = self._seg_slicer.get_colored_slice(
-                        SliceType.AXIAL,
-                        np.expand_dims(np.expand_dims(augmented_minus_inputs[dataset], 0), 0), 160).squeeze(0)
-                    self.custom_variables[
-                        "Reconstructed Noise {} After Normalization".format(
-                            dataset)] = self._seg_slicer.get_colored_slice(
-                        SliceType.AXIAL,
-                        np.expand_dims(np.expand_dims(normalized_minus_inputs[dataset], 0), 0), 160).squeeze(0)
-                else:
-                    self.custom_variables["Reconstructed Augmented Input {} Image".format(
-                        dataset)] = np.zeros((224, 192))
-                    self.custom_variables[
-                        "Reconstructed Initial Noise {} Image".format(
-                            dataset)] = np.zeros((224, 192))
-                    self.custom_variables[
-                        "Reconstructed Noise {} After Normalization".format(
-                            dataset)] = np.zeros((224, 192))
-
-                mean_mhd.append(mean_hausdorff_distance(
-                    to_onehot(torch.tensor(img_gt[dataset], dtype=torch.long), num_classes=4),
-                    to_onehot(torch.tensor(img_seg[dataset], dtype=torch.long), num_classes=4))[-3:].mean())
-
-                metric = self._model_trainers[SEGMENTER].compute_metrics(
-                    to_onehot(torch.tensor(img_seg[dataset]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt[dataset]).unsqueeze(0).long())
-
-                self._class_dice_gauge_on_reconstructed_images.update(np.array(metric["Dice"]))
-
-            self._per_dataset_hausdorff_distance_gauge.update(np.array(mean_mhd))
-
-            if "iSEG" in img_seg:
-                metric = self._model_trainers[SEGMENTER].compute_metrics(
-                    to_onehot(torch.tensor(img_seg["iSEG"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["iSEG"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_iseg_images.update(np.array(metric["Dice"]))
-                self._hausdorff_distance_gauge_on_reconstructed_iseg_images.update(mean_hausdorff_distance(
-                    to_onehot(torch.tensor(img_gt["iSEG"], dtype=torch.long), num_classes=4),
-                    to_onehot(torch.tensor(img_seg["iSEG"], dtype=torch.long), num_classes=4))[-3:])
-            else:
-                self._class_dice_gauge_on_reconstructed_iseg_images.update(np.array([0.0, 0.0, 0.0]))
-                self._hausdorff_distance_gauge_on_reconstructed_iseg_images.update(np.array([0.0, 0.0, 0.0]))
-            if "MRBrainS" in img_seg:
-                metric = self._model_trainers[SEGMENTER].compute_metrics(
-                    to_onehot(torch.tensor(img_seg["MRBrainS"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["MRBrainS"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_mrbrains_images.update(np.array(metric["Dice"]))
-                self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.update(mean_hausdorff_distance(
-                    to_onehot(torch.tensor(img_gt["MRBrainS"], dtype=torch.long), num_classes=4),
-                    to_onehot(torch.tensor(img_seg["MRBrainS"], dtype=torch.long), num_classes=4))[-3:])
-            else:
-                self._class_dice_gauge_on_reconstructed_mrbrains_images.update(np.array([0.0, 0.0, 0.0]))
-                self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.update(np.array([0.0, 0.0, 0.0]))
-            if "ABIDE" in img_seg:
-                metric = self._model_trainers[SEGMENTER].compute_metrics(
-                    to_onehot(torch.tensor(img_seg["ABIDE"]).unsqueeze(0).long(), num_classes=4),
-                    torch.tensor(img_gt["ABIDE"]).unsqueeze(0).long())
-                self._class_dice_gauge_on_reconstructed_abide_images.update(np.array(metric["Dice"]))
-                self._hausdorff_distance_gauge_on_reconstructed_abide_images.update(mean_hausdorff_distance(
-                    to_onehot(torch.tensor(img_gt["ABIDE"], dtype=torch.long), num_classes=4),
-                    to_onehot(torch.tensor(img_seg["ABIDE"], dtype=torch.long), num_classes=4))[-3:])
-            else:
-                self._class_dice_gauge_on_reconstructed_abide_images.update(np.array([0.0, 0.0, 0.0]))
-                self._hausdorff_distance_gauge_on_reconstructed_abide_images.update(np.array([0.0, 0.0, 0.0]))
-
-            if len(img_input) == 3:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    construct_triple_histrogram(img_norm["iSEG"],
-                                                img_input["iSEG"],
-                                                img_norm["MRBrainS"],
-                                                img_input["MRBrainS"],
-                                                img_norm["ABIDE"],
-                                                img_input["ABIDE"])).transpose((2, 0, 1))
-            elif len(img_input) == 2:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    construct_double_histrogram(img_norm["iSEG"],
-                                                img_input["iSEG"],
-                                                img_norm["MRBrainS"],
-                                                img_input["MRBrainS"])).transpose((2, 0, 1))
-            elif len(img_input) == 1:
-                self.custom_variables["Reconstructed Images Histograms"] = cv2.imread(
-                    construct_single_histogram(img_norm[list(self._dataset_configs.keys())[0]],
-                                               img_input[list(self._dataset_configs.keys())[0]],
-                                               )).transpose((2, 0, 1))
+            self._reconstruction_worker.submit(self._current_epoch)
+
+        for result in self._reconstruction_worker.poll():
+            self._update_reconstruction_metrics(result)
 
         if "ABIDE" not in self._dataset_configs.keys():
             self.custom_variables["Reconstructed Normalized ABIDE Image"] = np.zeros((224, 192))
@@ -804,29 +669,17 @@ class ResNetMultimodalTrainer(Trainer):
 
         self.custom_variables["Runtime"] = to_html_time(timedelta(seconds=time.time() - self._start_time))
 
-        if self._general_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["Confusion Matrix"] = np.array(
-                np.fliplr(self._general_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute().cpu().numpy())
 
-        if self._iSEG_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["iSEG Confusion Matrix"] = np.array(
-                np.fliplr(self._iSEG_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["iSEG Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["iSEG Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(ISEG_ID).cpu().numpy())
 
-        if self._MRBrainS_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["MRBrainS Confusion Matrix"] = np.array(
-                np.fliplr(self._MRBrainS_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["MRBrainS Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["MRBrainS Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(MRBRAINS_ID).cpu().numpy())
 
-        if self._ABIDE_confusion_matrix_gauge._num_examples != 0:
-            self.custom_variables["ABIDE Confusion Matrix"] = np.array(
-                np.fliplr(self._ABIDE_confusion_matrix_gauge.compute().cpu().detach().numpy()))
-        else:
-            self.custom_variables["ABIDE Confusion Matrix"] = np.zeros((4, 4))
+        self.custom_variables["ABIDE Confusion Matrix"] = np.fliplr(
+            self._confusion_matrix_gauge.compute(ABIDE_ID).cpu().numpy())
 
         if self._discriminator_confusion_matrix_gauge._num_examples != 0:
             self.custom_variables["Discriminator Confusion Matrix"] = np.array(
@@ -835,18 +688,15 @@ class ResNetMultimodalTrainer(Trainer):
             self.custom_variables["Discriminator Confusion Matrix"] = np.zeros(
                 (self._num_datasets, self._num_datasets))
 
+        # Surface distances of the whole test epoch, zero until a test step updated them.
+        epoch_distances = [gauge.compute() if gauge.has_been_updated() else np.zeros((3,)) for gauge in
+                           (self._class_hausdorff_distance_gauge, self._class_hausdorff_95_distance_gauge,
+                            self._class_average_surface_distance_gauge)]
         self.custom_variables["Metric Table"] = to_html(["CSF", "Grey Matter", "White Matter"],
-                                                        ["DSC", "HD"],
-                                                        [
-                                                            self._class_dice_gauge_on_patches.compute() if self._class_dice_gauge_on_patches.has_been_updated() else np.array(
-                                                                [0.0, 0.0, 0.0]),
-                                                            self._class_hausdorff_distance_gauge.compute() if self._class_hausdorff_distance_gauge.has_been_updated() else np.array(
-                                                                [0.0, 0.0, 0.0])
-                                                        ])
+                                                        ["DSC", "HD", "HD95", "ASD"], [class_dice] + epoch_distances)
 
         self.custom_variables[
-            "Dice score per class per epoch"] = self._class_dice_gauge_on_patches.compute() if self._class_dice_gauge_on_patches.has_been_updated() else np.array(
-            [0.0, 0.0, 0.0])
+            "Dice score per class per epoch"] = class_dice
         self.custom_variables[
             "Dice score per class per epoch on reconstructed image"] = self._class_dice_gauge_on_reconstructed_images.compute() if self._class_dice_gauge_on_reconstructed_images.has_been_updated() else np.array(
             [0.0, 0.0, 0.0])
@@ -875,18 +725,15 @@ class ResNetMultimodalTrainer(Trainer):
                 ["DSC", "HD"],
                 [
                     [
-                        self._iSEG_dice_gauge.compute() if self._iSEG_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        iseg_dice,
                         self._iSEG_hausdorff_gauge.compute() if self._iSEG_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])],
                     [
-                        self._MRBrainS_dice_gauge.compute() if self._MRBrainS_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        mrbrains_dice,
                         self._MRBrainS_hausdorff_gauge.compute() if self._MRBrainS_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])],
                     [
-                        self._ABIDE_dice_gauge.compute() if self._ABIDE_dice_gauge.has_been_updated() else np.array(
-                            [0.0, 0.0, 0.0]),
+                        abide_dice,
                         self._ABIDE_hausdorff_gauge.compute() if self._ABIDE_hausdorff_gauge.has_been_updated() else np.array(
                             [0.0, 0.0, 0.0])]],
                 ["iSEG", "MRBrainS", "ABIDE"])
@@ -915,45 +762,72 @@ class ResNetMultimodalTrainer(Trainer):
         self.custom_variables["Discriminator Loss"] = [self._discriminator_loss_test_gauge.compute()]
         self.custom_variables["Total Loss"] = [self._total_loss_test_gauge.compute()]
         self.custom_variables[
-            "Per Dataset Mean Hausdorff Distance"] = self._per_dataset_hausdorff_distance_gauge.compute()
+            "Per Dataset Mean Hausdorff Distance"] = self._per_dataset_hausdorff_distance_gauge.compute() if self._per_dataset_hausdorff_distance_gauge.has_been_updated() else np.zeros(
+            (len(self._dataset_configs),))
+
+    def on_train_batch_end(self):
+        self._telemetry.publish(self.custom_variables)
+        if self.current_train_step % 100 == 0:
+            self._step_timer.publish(self.custom_variables)
+
+    def close(self):
+        self._telemetry.close()
+        self._step_timer.close()
+
+        for result in self._reconstruction_worker.close():
+            self._update_reconstruction_metrics(result)
+
+    def _update_reconstruction_metrics(self, result):
+        self._per_dataset_hausdorff_distance_gauge.reset()
+        self._class_dice_gauge_on_reconstructed_iseg_images.reset()
+        self._class_dice_gauge_on_reconstructed_mrbrains_images.reset()
+        self._class_dice_gauge_on_reconstructed_abide_images.reset()
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images.reset()
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.reset()
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images.reset()
+
+        self.custom_variables.update(result.custom_variables)
+        self.custom_variables["Reconstruction Skipped Patches"] = [np.array(list(result.skipped_fraction.values()))]
+        self.custom_variables["Reconstruction Time Saved"] = [result.time_saved]
+
+        for dataset in result.dice.keys():
+            self._class_dice_gauge_on_reconstructed_images.update(result.dice[dataset])
+
+        self._per_dataset_hausdorff_distance_gauge.update(result.mean_hausdorff)
+        self._class_dice_gauge_on_reconstructed_iseg_images.update(
+            result.dice.get("iSEG", np.array([0.0, 0.0, 0.0])))
+        self._class_dice_gauge_on_reconstructed_mrbrains_images.update(
+            result.dice.get("MRBrainS", np.array([0.0, 0.0, 0.0])))
+        self._class_dice_gauge_on_reconstructed_abide_images.update(
+            result.dice.get("ABIDE", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_iseg_images.update(
+            result.hausdorff.get("iSEG", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_mrbrains_images.update(
+            result.hausdorff.get("MRBrainS", np.array([0.0, 0.0, 0.0])))
+        self._hausdorff_distance_gauge_on_reconstructed_abide_images.update(
+            result.hausdorff.get("ABIDE", np.array([0.0, 0.0, 0.0])))
 
     def _update_image_plots(self, phase, inputs, generator_predictions, segmenter_predictions, target, dataset_ids):
-        inputs = torch.nn.functional.interpolate(inputs, scale_factor=5, mode="trilinear",
-                                                 align_corners=True).numpy()
-        generator_predictions = torch.nn.functional.interpolate(generator_predictions, scale_factor=5, mode="trilinear",
-                                                                align_corners=True).numpy()
-        segmenter_predictions = torch.nn.functional.interpolate(
-            torch.argmax(torch.nn.functional.softmax(segmenter_predictions, dim=1), dim=1, keepdim=True).float(),
-            scale_factor=5, mode="nearest").numpy()
-
-        target = torch.nn.functional.interpolate(target.float(), scale_factor=5, mode="nearest").numpy()
-
-        self.custom_variables[
-            "{} Input Batch Process {} Channel 0".format(phase, self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, np.expand_dims(inputs[:, 0, ...], 1), inputs.shape[2] // 2)
-        self.custom_variables[
-            "{} Input Batch Process {} Channel 1".format(phase, self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, np.expand_dims(inputs[:, 1, ...], 1), inputs.shape[2] // 2)
-        self.custom_variables[
-            "{} Generated Batch Process {} Channel 0".format(phase,
-                                                             self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, np.expand_dims(generator_predictions[:, 0, ...], 1), generator_predictions.shape[2] // 2)
-        self.custom_variables[
-            "{} Generated Batch Process {} Channel 1".format(phase,
-                                                             self._run_config.local_rank)] = self._slicer.get_slice(
-            SliceType.AXIAL, np.expand_dims(generator_predictions[:, 1, ...], 1), generator_predictions.shape[2] // 2)
-        self.custom_variables[
-            "{} Segmented Batch Process {}".format(phase,
-                                                   self._run_config.local_rank)] = self._seg_slicer.get_colored_slice(
-            SliceType.AXIAL, segmenter_predictions, segmenter_predictions.shape[2] // 2)
-        self.custom_variables[
-            "{} Segmentation Ground Truth Batch Process {}".format(phase,
-                                                                   self._run_config.local_rank)] = self._seg_slicer.get_colored_slice(
-            SliceType.AXIAL, target, target.shape[2] // 2)
+        image_slice = partial(self._slicer.get_slice, SliceType.AXIAL, slice=0)
+        colored_slice = partial(self._seg_slicer.get_colored_slice, SliceType.AXIAL, slice=0)
+
+        self._slice_plotter.plot(self.custom_variables,
+                                 "{} Input Batch Process {}".format(phase, self._run_config.local_rank),
+                                 image_slice, inputs, scale_factor=5)
+        self._slice_plotter.plot(self.custom_variables,
+                                 "{} Generated Batch Process {}".format(phase, self._run_config.local_rank),
+                                 image_slice, generator_predictions, scale_factor=5)
+        self._slice_plotter.plot(self.custom_variables,
+                                 "{} Segmented Batch Process {}".format(phase, self._run_config.local_rank),
+                                 colored_slice, torch.argmax(segmenter_predictions, dim=1, keepdim=True),
+                                 scale_factor=5, mode="nearest")
+        self._slice_plotter.plot(self.custom_variables,
+                                 "{} Segmentation Ground Truth Batch Process {}".format(phase, self._run_config.local_rank),
+                                 colored_slice, target, scale_factor=5, mode="nearest")
         self.custom_variables[
             "{} Label Map Batch Process {}".format(phase,
                                                    self._run_config.local_rank)] = self._label_mapper.get_label_map(
-            dataset_ids)
+            dataset_ids.cpu())
 
     def _make_disc_pie_plots(self, disc_pred, target):
         count_ = count(torch.argmax(disc_pred.cpu().detach(), dim=1), self._num_datasets)
@@ -967,24 +841,16 @@ class ResNetMultimodalTrainer(Trainer):
     def _should_activate_segmentation(self):
         return self._current_epoch >= self._patience_segmentation
 
+    def _accumulate_histograms(self, inputs, target, gen_pred):
+        self._input_histogram_gauge.update(inputs, target[IMAGE_TARGET], target[DATASET_ID])
+        self._generated_histogram_gauge.update(gen_pred, target[IMAGE_TARGET], target[DATASET_ID])
+
     def _update_histograms(self, inputs, target, gen_pred):
-        self.custom_variables["Generated Intensity Histogram"] = flatten(gen_pred.cpu().detach())
-        self.custom_variables["Input Intensity Histogram"] = flatten(inputs.cpu().detach())
-        self.custom_variables["Per-Dataset Histograms"] = cv2.imread(
-            construct_class_histogram(inputs, target, gen_pred)).transpose((2, 0, 1))
-        self.custom_variables["Background Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 0)].cpu().detach()
-        self.custom_variables["CSF Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 1)].cpu().detach()
-        self.custom_variables["GM Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 2)].cpu().detach()
-        self.custom_variables["WM Generated Intensity Histogram"] = gen_pred[
-            torch.where(target[IMAGE_TARGET] == 3)].cpu().detach()
-        self.custom_variables["Background Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 0)].cpu().detach()
-        self.custom_variables["CSF Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 1)].cpu().detach()
-        self.custom_variables["GM Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 2)].cpu().detach()
-        self.custom_variables["WM Input Intensity Histogram"] = inputs[
-            torch.where(target[IMAGE_TARGET] == 3)].cpu().detach()
+        self.custom_variables["Generated Intensity Histogram"] = self._generated_histogram_gauge.histogram()
+        self.custom_variables["Input Intensity Histogram"] = self._input_histogram_gauge.histogram()
+        self.custom_variables["Per-Dataset Histograms"] = construct_class_histogram(inputs, target, gen_pred)
+        for class_id, class_name in enumerate(["Background", "CSF", "GM", "WM"]):
+            self.custom_variables["{} Generated Intensity Histogram".format(class_name)] = \
+                self._generated_histogram_gauge.histogram(class_id=class_id)
+            self.custom_variables["{} Input Intensity Histogram".format(class_name)] = \
+                self._input_histogram_gauge.histogram(class_id=class_id)
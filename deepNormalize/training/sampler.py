@@ -1,33 +1,58 @@
 import math
-import numpy as np
+
 import torch
 
 from deepNormalize.utils.constants import AUGMENTED_INPUTS, NON_AUGMENTED_INPUTS, IMAGE_TARGET, DATASET_ID
 
 
 class Sampler(object):
+    """
+    Mix augmented and non augmented patches of a batch.
+
+    A `keep_augmented_prob` fraction of the batch, drawn with `torch.randperm` on the batch's device, comes from the
+    augmented inputs and the rest from the non augmented ones. With a probability of 0 or 1 the corresponding inputs
+    are returned as is, otherwise the mixed batch is gathered into output buffers.
+
+    Two sets of output buffers are used in turn, so a mixed batch is only overwritten two calls later: it stays valid
+    while the next batch is sampled, e.g. for a graph kept until the next step or an image rendered in the background.
+    Consumers keeping a batch longer must copy it, as `SlicePlotter` and `ImagePool` do.
+    """
 
     def __init__(self, keep_augmented_prob: float):
         self._keep_augmented_prob = keep_augmented_prob
+        self._buffers = [[None, None, None], [None, None, None]]
+        self._current = 0
+
+    def _buffer(self, index: int, tensor: torch.Tensor):
+        buffers = self._buffers[self._current]
+        buffer = buffers[index]
+        if buffer is None or buffer.shape != tensor.shape or buffer.dtype != tensor.dtype or \
+                buffer.device != tensor.device:
+            buffer = buffers[index] = torch.empty_like(tensor)
+        return buffer
 
     def __call__(self, inputs, targets):
-        augmented_choices = np.random.choice(np.arange(0, len(inputs[AUGMENTED_INPUTS])),
-                                             math.ceil(len(inputs[AUGMENTED_INPUTS]) * self._keep_augmented_prob),
-                                             replace=False)
-        augmented_inputs = inputs[AUGMENTED_INPUTS][augmented_choices]
-        augmented_targets = targets[IMAGE_TARGET][augmented_choices]
-        augmented_target_ids = targets[DATASET_ID][augmented_choices]
-
-        non_augmented_choices = np.setdiff1d(np.arange(0, len(inputs[NON_AUGMENTED_INPUTS])), augmented_choices)
-        non_augmented_inputs = inputs[NON_AUGMENTED_INPUTS][non_augmented_choices]
-        non_augmented_targets = targets[IMAGE_TARGET][non_augmented_choices]
-        non_augmented_target_ids = targets[DATASET_ID][non_augmented_choices]
-
-        new_inputs_ = torch.cat((augmented_inputs, non_augmented_inputs))
-        new_image_targets = torch.cat((augmented_targets, non_augmented_targets))
-        new_target_ids = torch.cat((augmented_target_ids, non_augmented_target_ids))
-
-        new_targets_ = [new_image_targets, new_target_ids]
+        batch_size = len(inputs[AUGMENTED_INPUTS])
+        nb_augmented = math.ceil(batch_size * self._keep_augmented_prob)
+
+        if nb_augmented == 0 or nb_augmented == batch_size:
+            # The batch is already shuffled by the data loader, no need to permute it.
+            new_inputs_ = inputs[AUGMENTED_INPUTS] if nb_augmented == batch_size else inputs[NON_AUGMENTED_INPUTS]
+            new_targets_ = [targets[IMAGE_TARGET], targets[DATASET_ID]]
+
+        else:
+            choices = torch.randperm(batch_size, device=inputs[AUGMENTED_INPUTS].device)
+            self._current = 1 - self._current
+
+            new_inputs_ = self._buffer(0, inputs[AUGMENTED_INPUTS])
+            torch.index_select(inputs[AUGMENTED_INPUTS], 0, choices[:nb_augmented], out=new_inputs_[:nb_augmented])
+            torch.index_select(inputs[NON_AUGMENTED_INPUTS], 0, choices[nb_augmented:],
+                               out=new_inputs_[nb_augmented:])
+
+            new_targets_ = [torch.index_select(targets[IMAGE_TARGET], 0, choices.to(targets[IMAGE_TARGET].device),
+                                               out=self._buffer(1, targets[IMAGE_TARGET])),
+                            torch.index_select(targets[DATASET_ID], 0, choices.to(targets[DATASET_ID].device),
+                                               out=self._buffer(2, targets[DATASET_ID]))]
 
         new_inputs = [inputs[NON_AUGMENTED_INPUTS], new_inputs_]
         new_targets = [targets, new_targets_]
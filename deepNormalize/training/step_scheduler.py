@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import logging
+import time
+from contextlib import contextmanager
+
+import torch
+from kerosene.training.trainers import ModelTrainer
+
+LOGGER = logging.getLogger("StepScheduler")
+
+
+class StepScheduler(object):
+    """
+    Know which models are updated at a given training step.
+
+    Forward passes of models that are not stepped run under `torch.no_grad()` so their activations are freed as soon
+    as their outputs are consumed. When `profile` is set, the step time and the peak CUDA memory are accumulated per
+    schedule, i.e. per set of stepped models.
+    """
+
+    def __init__(self, every_n_steps: dict, profile: bool = False, name: str = "Training"):
+        self._every_n_steps = every_n_steps
+        self._name = name
+        self._profile = profile
+        self._statistics = {}
+
+    @classmethod
+    def from_config(cls, training_config, every_n_steps: dict, name: str = "Training"):
+        return cls(every_n_steps, training_config.variables.get("profile_step_schedules", False), name)
+
+    def is_stepped(self, name: str, step: int):
+        return step % self._every_n_steps.get(name, 1) == 0
+
+    def schedule(self, step: int):
+        return tuple(name for name in self._every_n_steps.keys() if self.is_stepped(name, step))
+
+    def forward(self, name: str, step: int):
+        return torch.enable_grad() if self.is_stepped(name, step) else torch.no_grad()
+
+    @staticmethod
+    @contextmanager
+    def frozen(model_trainer: ModelTrainer):
+        """
+        Let gradients flow through a model without computing the gradients of its own parameters.
+        """
+        parameters = [p for p in model_trainer.model.parameters() if p.requires_grad]
+        for p in parameters:
+            p.requires_grad_(False)
+        try:
+            yield
+        finally:
+            for p in parameters:
+                p.requires_grad_(True)
+
+    @contextmanager
+    def measure(self, step: int):
+        if not self._profile:
+            yield
+            return
+
+        cuda = torch.cuda.is_available()
+        if cuda:
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        start = time.time()
+
+        yield
+
+        if cuda:
+            torch.cuda.synchronize()
+        count, total_time, peak_memory = self._statistics.get(self.schedule(step), (0, 0.0, 0))
+        self._statistics[self.schedule(step)] = (count + 1, total_time + time.time() - start,
+                                                 max(peak_memory, torch.cuda.max_memory_allocated() if cuda else 0))
+
+    def statistics(self):
+        statistics, self._statistics = self._statistics, {}
+        return {schedule: (total_time / count, peak_memory) for schedule, (count, total_time, peak_memory) in
+                statistics.items()}
+
+    def log_statistics(self, epoch: int):
+        for schedule, (step_time, peak_memory) in self.statistics().items():
+            LOGGER.info("{} epoch {} steps updating [{}]: {:.1f} ms/step, peak memory {:.1f} MB.".format(
+                self._name, epoch, ", ".join(schedule), step_time * 1000, peak_memory / 1024 ** 2))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+LOGGER = logging.getLogger("StepTimer")
+
+
+class StepTimer(object):
+    """
+    Time the sections of the training, validation and test steps.
+
+    A step runs from `begin()` to `end()` and `lap(name)` charges the time elapsed since the previous lap to a section.
+    The time between two consecutive steps of a phase, spent waiting for the data loader and in the event handlers, is
+    charged to "Data Wait" and the rest of a step to "Other". Section times per step are kept over a rolling window of
+    steps and published as percentiles. CUDA kernels run asynchronously: with `synchronize`, every lap waits for them
+    so they are charged to the section that launched them.
+
+    When `trace_steps` is a (start, stop) range of training steps, every step from the beginning of training step
+    `start` to the beginning of training step `stop` is also recorded once as Chrome trace events, written to
+    `trace_path` to be opened in chrome://tracing or Perfetto.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, enabled: bool = True, window: int = 100, synchronize: bool = False, trace_steps: tuple = None,
+                 trace_path: str = None):
+        self._enabled = enabled
+        self._window = window
+        self._synchronize = synchronize and torch.cuda.is_available()
+        self._trace_steps = trace_steps
+        self._trace_path = trace_path
+        self._timings = {}
+        self._step_timings = {}
+        self._phase = None
+        self._step = None
+        self._start = None
+        self._last = None
+        self._end = None
+        self._tracing = False
+        self._traced = False
+        self._trace_events = []
+
+    @classmethod
+    def from_config(cls, training_config, save_folder: str):
+        trace_steps = training_config.variables.get("chrome_trace_steps", None)
+        trace_path = os.path.join(save_folder, "trace_steps_{}_{}.json".format(*trace_steps)) \
+            if trace_steps is not None else None
+
+        return cls(training_config.variables.get("step_timers", True),
+                   training_config.variables.get("step_timers_window", 100),
+                   training_config.variables.get("step_timers_synchronize", False), trace_steps, trace_path)
+
+    def _now(self):
+        if self._synchronize:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _add(self, section: str, start: float, end: float):
+        self._step_timings[section] = self._step_timings.get(section, 0.0) + end - start
+
+        if self._tracing:
+            self._trace_events.append({"name": section, "cat": self._phase, "ph": "X", "ts": start * 1e6,
+                                       "dur": (end - start) * 1e6, "pid": os.getpid(), "tid": threading.get_ident(),
+                                       "args": {"step": self._step}})
+
+    def begin(self, phase: str, step: int):
+        if not self._enabled:
+            return
+
+        now = self._now()
+
+        if self._trace_steps is not None and phase == "Training":
+            if self._trace_steps[0] <= step < self._trace_steps[1] and not self._traced:
+                self._tracing = True
+            elif self._tracing:
+                self.dump_trace(self._trace_path)
+
+        self._step_timings = {}
+        previous_phase, self._phase, self._step = self._phase, phase, step
+        if previous_phase == phase and self._end is not None:
+            self._add("Data Wait", self._end, now)
+
+        self._start, self._last = now, now
+
+    def lap(self, section: str):
+        if not self._enabled:
+            return
+
+        now = self._now()
+        self._add(section, self._last, now)
+        self._last = now
+
+    def end(self):
+        if not self._enabled:
+            return
+
+        now = self._now()
+        if now > self._last:
+            self._add("Other", self._last, now)
+        self._add("Step", self._start, now)
+
+        for section, elapsed in self._step_timings.items():
+            self._timings.setdefault((self._phase, section), deque(maxlen=self._window)).append(elapsed)
+
+        self._end = now
+
+    def percentiles(self):
+        """
+        Percentiles, in milliseconds, of the time per step of every section.
+        """
+        return {key: np.percentile(np.array(timings), self.PERCENTILES) * 1000 for key, timings in
+                self._timings.items()}
+
+    def publish(self, custom_variables: dict):
+        for (phase, section), percentiles in self.percentiles().items():
+            custom_variables["{} {} Time".format(phase, section)] = percentiles.tolist()
+
+    def dump_trace(self, path: str):
+        with open(path, "w") as trace:
+            json.dump({"traceEvents": self._trace_events, "displayTimeUnit": "ms"}, trace)
+
+        LOGGER.info("Chrome trace of {} events written to {}.".format(len(self._trace_events), path))
+        self._tracing = False
+        self._traced = True
+        self._trace_events = []
+
+    def close(self):
+        if self._trace_events:
+            self.dump_trace(self._trace_path)
@@ -13,8 +13,11 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ==============================================================================
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
-from typing import List, Union
+from typing import List, Union, Callable
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -27,6 +30,8 @@ from torchvision.transforms import Compose
 from deepNormalize.inputs.images import SliceType
 from deepNormalize.utils.constants import EPSILON, ISEG_ID, MRBRAINS_ID, ABIDE_ID
 
+LOGGER = logging.getLogger("ImageReconstructor")
+
 
 class LabelMapper(object):
     DEFAULT_COLOR_MAP = plt.get_cmap('jet')
@@ -59,11 +64,12 @@ class FeatureMapSlicer(object):
         self._colormap = colormap if colormap is not None else self.DEFAULT_COLOR_MAP
 
     @staticmethod
-    def _normalize(img):
-        return (img - np.min(img)) / (np.ptp(img) + EPSILON)
+    def _normalize(img, value_range=None):
+        minimum, maximum = value_range if value_range is not None else (np.min(img), np.max(img))
+        return (img - minimum) / (maximum - minimum + EPSILON)
 
-    def get_colored_slice(self, slice_type, feature_map):
-        feature_map = self._normalize(feature_map)
+    def get_colored_slice(self, slice_type, feature_map, value_range=None):
+        feature_map = self._normalize(feature_map, value_range)
 
         if slice_type == SliceType.SAGITAL:
             colored_slice = self._colormap(np.rot90(feature_map[:, :, :, :, int(feature_map.shape[4] / 2)]), 2)
@@ -84,11 +90,12 @@ class SegmentationSlicer(object):
         self._colormap = colormap if colormap is not None else self.DEFAULT_COLOR_MAP
 
     @staticmethod
-    def _normalize(img):
-        return (img - np.min(img)) / (np.ptp(img) + EPSILON)
+    def _normalize(img, value_range=None):
+        minimum, maximum = value_range if value_range is not None else (np.min(img), np.max(img))
+        return (img - minimum) / (maximum - minimum + EPSILON)
 
-    def get_colored_slice(self, slice_type, seg_map, slice):
-        seg_map = self._normalize(seg_map)
+    def get_colored_slice(self, slice_type, seg_map, slice, value_range=None):
+        seg_map = self._normalize(seg_map, value_range)
 
         if slice_type == SliceType.SAGITAL:
             colored_slice = self._colormap(np.rot90(seg_map[:, :, :, :, slice]), 2)
@@ -108,11 +115,12 @@ class ImageSlicer(object):
         pass
 
     @staticmethod
-    def _normalize(img):
-        return (img - np.min(img)) / (np.ptp(img) + EPSILON)
+    def _normalize(img, value_range=None):
+        minimum, maximum = value_range if value_range is not None else (np.min(img), np.max(img))
+        return (img - minimum) / (maximum - minimum + EPSILON)
 
-    def get_slice(self, slice_type, image, slice):
-        image = self._normalize(image)
+    def get_slice(self, slice_type, image, slice, value_range=None):
+        image = self._normalize(image, value_range)
 
         if slice_type == SliceType.SAGITAL:
             slice = image[:, :, :, :, slice]
@@ -126,65 +134,293 @@ class ImageSlicer(object):
         return slice
 
 
+def axial_plane(volume: torch.Tensor, scale_factor: int, mode: str = "trilinear"):
+    """
+    Plane (B, C, H, W) of a (B, C, D, H, W) volume lying at the middle axial slice of the volume upsampled by
+    `scale_factor`, interpolated along the depth only.
+    """
+    depth = volume.size(2)
+    index = depth * scale_factor // 2
+
+    if mode == "nearest":
+        return volume[:, :, index // scale_factor].float()
+
+    # Source position of the slice with align_corners=True.
+    position = index * (depth - 1) / (depth * scale_factor - 1)
+    lower = int(position)
+    upper = min(lower + 1, depth - 1)
+
+    return torch.lerp(volume[:, :, lower].float(), volume[:, :, upper].float(), position - lower)
+
+
+def upsample_plane(plane: torch.Tensor, scale_factor: int, mode: str = "trilinear"):
+    if mode == "nearest":
+        return torch.nn.functional.interpolate(plane, scale_factor=scale_factor, mode="nearest")
+
+    return torch.nn.functional.interpolate(plane, scale_factor=scale_factor, mode="bilinear", align_corners=True)
+
+
+class SlicePlotter(object):
+    """
+    Render the middle axial slice of upsampled 3D batches without upsampling the batches.
+
+    The slice is first interpolated along the depth on the calling thread, which only reads two planes of
+    the volume. The in-plane upsampling and the coloring run on a background thread, which then stores the image in
+    the custom variables. This gives the same image as slicing the upsampled volume, because trilinear interpolation
+    is separable. The image is also normalized with the range of the whole volume, which upsampling preserves.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _log_exception(future):
+        if future.exception() is not None:
+            LOGGER.warning("Could not render slice: {}".format(future.exception()))
+
+    def plot(self, custom_variables: dict, name: str, render: Callable, volume: torch.Tensor, scale_factor: int,
+             mode: str = "trilinear"):
+        """
+        Args:
+            custom_variables (dict): Where the rendered image is stored under `name`.
+            render (Callable): Called with the upsampled slice of shape (B, C, 1, H, W) and the value range of the
+                volume, e.g. a partial of `ImageSlicer.get_slice` on the axial slice 0.
+            volume (:obj:`torch.Tensor`): A (B, C, D, H, W) volume, on any device.
+        """
+        volume = volume.detach()
+        plane = axial_plane(volume, scale_factor, mode).cpu()
+        value_range = torch.stack((volume.min(), volume.max())).float().cpu()
+
+        def _render():
+            slice = upsample_plane(plane, scale_factor, mode).unsqueeze(2).numpy()
+            custom_variables[name] = render(slice, value_range=tuple(value_range.tolist()))
+
+        self._executor.submit(_render).add_done_callback(self._log_exception)
+
+
+_FUSION_WINDOWS = {}
+
+
+def fusion_window(fusion: str, patch_size: List[int]):
+    """Per-voxel weights given to a patch when fusing overlapping predictions, cached per patch size."""
+    key = (fusion, tuple(patch_size))
+
+    if key not in _FUSION_WINDOWS:
+        if fusion == "uniform":
+            window = np.ones(patch_size)
+        elif fusion == "gaussian":
+            axes = [np.exp(-0.5 * ((np.arange(size) - (size - 1) / 2.0) / (size / 8.0)) ** 2)
+                    for size in patch_size]
+            window = np.maximum(axes[0][:, None, None] * axes[1][None, :, None] * axes[2][None, None, :], 1e-3)
+        elif fusion == "cosine":
+            axes = [0.5 - 0.5 * np.cos(2.0 * np.pi * (np.arange(size) + 0.5) / size) for size in patch_size]
+            window = axes[0][:, None, None] * axes[1][None, :, None] * axes[2][None, None, :]
+        else:
+            raise NotImplementedError("The provided fusion type ({}) not found.".format(fusion))
+
+        window.setflags(write=False)
+        _FUSION_WINDOWS[key] = window
+
+    return _FUSION_WINDOWS[key]
+
+
 class ImageReconstructor(object):
 
     def __init__(self, image_size: List[int], patch_size: List[int], step: List[int],
                  models: List[torch.nn.Module] = None, normalize: bool = False,
-                 segment: bool = False, normalize_and_segment: bool = False, test_image: np.ndarray = None):
+                 segment: bool = False, normalize_and_segment: bool = False, test_image: np.ndarray = None,
+                 device: str = "cuda:0", skip_threshold: float = 0.0, batch_size: int = 8,
+                 inference_step: List[int] = None, fusion: str = "uniform"):
         self._patch_size = patch_size
         self._image_size = image_size
         self._step = step
+        self._inference_step = inference_step if inference_step is not None else step
+        self._fusion = fusion
+        self._window = fusion_window(fusion, patch_size[1:])
         self._models = models
         self._do_normalize = normalize
         self._do_segment = segment
         self._do_normalize_and_segment = normalize_and_segment
         self._transform = Compose([ToNumpyArray()])
         self._test_image = test_image
+        self._device = device
+        self._skip_threshold = skip_threshold
+        self._batch_size = batch_size
+        self._skipped_fraction = 0.0
+        self._time_saved = 0.0
 
     @staticmethod
     def _normalize(img):
         return (img - np.min(img)) / (np.ptp(img) + EPSILON)
 
-    def reconstruct_from_patches_3d(self, patches: Union[List[np.ndarray], List[slice]]):
+    @property
+    def models(self):
+        return self._models
+
+    @property
+    def skipped_fraction(self):
+        return self._skipped_fraction
+
+    @property
+    def time_saved(self):
+        return self._time_saved
+
+    def with_models(self, models: List[torch.nn.Module] = None, device: str = "cpu"):
+        return ImageReconstructor(self._image_size, self._patch_size, self._step, models, self._do_normalize,
+                                  self._do_segment, self._do_normalize_and_segment, self._test_image, device,
+                                  self._skip_threshold, self._batch_size, self._inference_step, self._fusion)
+
+    def _grid(self, step, border: bool = True):
+        """
+        Patch positions in row major order. With `border`, the last position of an axis is added when the step
+        does not reach it, so every voxel is covered. Stored patches follow the grid of the dataset, which has no
+        such position.
+        """
+        positions = []
+        for axis in range(3):
+            n = self._image_size[axis] - self._patch_size[axis + 1] + 1
+            axis_positions = list(range(0, n, step[axis + 1]))
+            if border and axis_positions[-1] != n - 1:
+                axis_positions.append(n - 1)
+            positions.append(axis_positions)
+
+        return list(product(*positions))
+
+    def _load_volume(self, patches):
+        """Assemble the full volume from per-patch files. Each file is read once, later calls reuse the volume."""
+        volume = None
+        for path, (z, y, x) in zip(patches, self._grid(self._step, border=False)):
+            p = self._transform(path)
+            if volume is None:
+                volume = np.zeros((p.shape[0], *self._image_size), dtype=p.dtype)
+            volume[:, z:z + self._patch_size[1], y:y + self._patch_size[2], x:x + self._patch_size[3]] = p
+
+        return volume
+
+    def _volume(self, patches):
+        if self._test_image is None and patches is not None and len(patches) > 0 and \
+                not isinstance(patches[0], (tuple, np.ndarray)):
+            self._test_image = self._load_volume(patches)
+
+        if self._test_image is None or any(
+                size < image_size for size, image_size in zip(self._test_image.shape[1:], self._image_size)):
+            return None
+
+        return self._test_image[:, :self._image_size[0], :self._image_size[1], :self._image_size[2]]
+
+    def _empty_patches(self, volume, grid):
+        """Find background patches on the maximum over the channels, computed once for the volume."""
+        if self._models is None or self._skip_threshold is None or volume is None:
+            return None
+
+        maximum = np.abs(volume).max(axis=0)
+        d, h, w = self._patch_size[1:]
+
+        return np.array([maximum[z:z + d, y:y + h, x:x + w].max() <= self._skip_threshold for z, y, x in grid])
+
+    def _load_patch(self, p):
+        if isinstance(p, tuple):
+            p = self._test_image[p]
+
+        elif not isinstance(p, np.ndarray):
+            p = self._transform(p)
+
+        elif p.ndim == 5:
+            p = p[0]
+
+        return p
+
+    @torch.no_grad()
+    def _infer(self, p):
+        p = torch.Tensor().new_tensor(p, device=self._device)
+        if len(p.size()) < 5:
+            p = torch.unsqueeze(p, 0)
+
+        if self._do_normalize:
+            p = torch.nn.functional.sigmoid(self._models[0].forward(p)).cpu().detach().numpy()
+        elif self._do_segment:
+            p = torch.argmax(torch.nn.functional.softmax(self._models[0].forward(p), dim=1), dim=1,
+                             keepdim=True).float().cpu().detach().numpy()
+        elif self._do_normalize_and_segment:
+            p = torch.nn.functional.sigmoid(self._models[0].forward(p))
+            p = torch.argmax(torch.nn.functional.softmax(self._models[1].forward(p), dim=1), dim=1,
+                             keepdim=True).float().cpu().detach().numpy()
+
+        return p
+
+    def _background(self, p):
+        if self._do_normalize:
+            # The generator output of an empty patch only depends on the weights, compute it once per volume.
+            return self._infer(np.zeros_like(p))[0][0]
+        return np.zeros(self._patch_size[1:])
+
+    def reconstruct_from_patches_3d(self, patches: Union[List[np.ndarray], List[slice], List[str]] = None):
         img = np.zeros(self._image_size)
         divisor = np.zeros(self._image_size)
 
-        n_d = self._image_size[0] - self._patch_size[1] + 1
-        n_h = self._image_size[1] - self._patch_size[2] + 1
-        n_w = self._image_size[2] - self._patch_size[3] + 1
-
-        for p, (z, y, x) in zip(patches, product(range(0, n_d, self._step[1]),
-                                                 range(0, n_h, self._step[2]),
-                                                 range(0, n_w, self._step[3]))):
-            if isinstance(p, tuple):
-                p = self._test_image[p]
-                p = np.expand_dims(p, 0)
-
-            elif not isinstance(p, np.ndarray):
-                p = self._transform(p)
-                p = np.expand_dims(p, 0)
-
-            if self._models is not None:
-                p = torch.Tensor().new_tensor(p, device="cuda:0")
-
-                if self._do_normalize:
-                    if len(p.size()) < 5:
-                        p = torch.unsqueeze(p, 0)
-                    p = torch.nn.functional.sigmoid(self._models[0].forward(p)).cpu().detach().numpy()
-                elif self._do_segment:
-                    if len(p.size()) < 5:
-                        p = torch.unsqueeze(p, 0)
-                    p = torch.argmax(torch.nn.functional.softmax(self._models[0].forward(p), dim=1), dim=1,
-                                     keepdim=True).float().cpu().detach().numpy()
-                elif self._do_normalize_and_segment:
-                    if len(p.size()) < 5:
-                        p = torch.unsqueeze(p, 0)
-                    p = torch.nn.functional.sigmoid(self._models[0].forward(p))
-                    p = torch.argmax(torch.nn.functional.softmax(self._models[1].forward(p), dim=1), dim=1,
-                                     keepdim=True).float().cpu().detach().numpy()
-
-            img[z:z + self._patch_size[1], y:y + self._patch_size[2], x:x + self._patch_size[3]] += p[0][0]
-            divisor[z:z + self._patch_size[1], y:y + self._patch_size[2], x:x + self._patch_size[3]] += 1
+        volume = self._volume(patches)
+
+        if volume is not None:
+            grid = self._grid(self._inference_step)
+            empty_patches = self._empty_patches(volume, grid)
+            num_patches = len(grid)
+
+            def patch_at(i):
+                # A view of the volume: no patch is copied until it is batched.
+                z, y, x = grid[i]
+                return volume[:, z:z + self._patch_size[1], y:y + self._patch_size[2], x:x + self._patch_size[3]]
+        else:
+            grid = self._grid(self._step, border=False)
+            empty_patches = None
+            num_patches = min(len(grid), len(patches))
+
+            def patch_at(i):
+                return self._load_patch(patches[i])
+
+        def accumulate(i, p):
+            z, y, x = grid[i]
+            region = (slice(z, z + self._patch_size[1]), slice(y, y + self._patch_size[2]),
+                      slice(x, x + self._patch_size[3]))
+            img[region] += self._window * p
+            divisor[region] += self._window
+
+        if self._models is None:
+            for i in range(num_patches):
+                accumulate(i, patch_at(i)[0])
+        else:
+            background = None
+            num_skipped, inference_time = 0, 0.0
+            batch = []
+
+            for i in range(num_patches + 1):
+                if i < num_patches:
+                    p = patch_at(i)
+                    if empty_patches is not None:
+                        is_empty = empty_patches[i]
+                    else:
+                        is_empty = self._skip_threshold is not None and np.abs(p).max() <= self._skip_threshold
+
+                    if is_empty:
+                        if background is None:
+                            background = self._background(p)
+                        accumulate(i, background)
+                        num_skipped += 1
+                    else:
+                        batch.append((i, p))
+
+                if len(batch) == self._batch_size or (i == num_patches and len(batch) > 0):
+                    start = time.time()
+                    predictions = self._infer(np.stack([p for _, p in batch]))
+                    inference_time += time.time() - start
+                    for (j, _), prediction in zip(batch, predictions):
+                        accumulate(j, prediction[0])
+                    batch = []
+
+            if num_patches > 0:
+                self._skipped_fraction = num_skipped / num_patches
+                self._time_saved = num_skipped * inference_time / max(num_patches - num_skipped, 1)
+                LOGGER.info("Skipped {:.1%} of {} patches, saving about {:.1f}s of inference.".format(
+                    self._skipped_fraction, num_patches, self._time_saved))
 
         if self._do_segment or self._do_normalize_and_segment:
             return np.clip(np.round(img / divisor), a_min=0, a_max=3)
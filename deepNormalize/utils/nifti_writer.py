@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#
+# Licensed under the MIT License;
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import atexit
+import logging
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import nibabel as nib
+import numpy as np
+import os
+
+LOGGER = logging.getLogger("NiftiWriter")
+
+_DEFAULT_WRITER = None
+_DEFAULT_WRITER_LOCK = threading.Lock()
+
+
+class NiftiWriter(object):
+    """
+    Write NIfTI volumes from a background thread.
+
+    A `compression_level` of None writes uncompressed `.nii` files, otherwise `.nii.gz` files are written with the
+    given gzip level. Volumes larger than `chunk_size` bytes are compressed in parallel as independent gzip members.
+    """
+
+    def __init__(self, compression_level: int = 6, max_pending: int = 4, compression_threads: int = 4,
+                 chunk_size: int = 16 * 1024 * 1024):
+        self._compression_level = compression_level
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._compressor = ThreadPoolExecutor(max_workers=compression_threads)
+        self._latencies = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="NiftiWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def extension(self):
+        return ".nii" if self._compression_level is None else ".nii.gz"
+
+    def path(self, path: str):
+        if path.endswith(".nii.gz"):
+            path = path[:-len(".nii.gz")]
+        elif path.endswith(".nii"):
+            path = path[:-len(".nii")]
+        return path + self.extension
+
+    def write(self, image: np.ndarray, path: str):
+        if self._closed:
+            raise RuntimeError("Cannot write {}: writer is closed.".format(path))
+
+        path = self.path(path)
+        # Blocks when max_pending volumes are already waiting, which bounds the memory held by the queue.
+        self._queue.put((np.array(image, copy=True), path, time.time()))
+        return path
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._compressor.shutdown(wait=True)
+
+    def latencies(self):
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+        return latencies
+
+    def _compress(self, data: bytes):
+        chunks = [data[i:i + self._chunk_size] for i in range(0, len(data), self._chunk_size)]
+        return b"".join(self._compressor.map(self._compress_chunk, chunks))
+
+    def _compress_chunk(self, chunk: bytes):
+        compressor = zlib.compressobj(self._compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(chunk) + compressor.flush()
+
+    def _write(self, image: np.ndarray, path: str):
+        data = nib.Nifti1Image(image, np.eye(4)).to_bytes()
+
+        if self._compression_level is not None:
+            data = self._compress(data)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+
+                image, path, submitted = job
+                start = time.time()
+                self._write(image, path)
+                with self._lock:
+                    self._latencies.append((path, time.time() - start, time.time() - submitted))
+                LOGGER.debug("Wrote {} in {:.2f}s.".format(path, time.time() - start))
+            except Exception:
+                LOGGER.exception("Failed to write {}.".format(job[1]))
+            finally:
+                self._queue.task_done()
+
+
+def default_nifti_writer():
+    global _DEFAULT_WRITER
+    with _DEFAULT_WRITER_LOCK:
+        if _DEFAULT_WRITER is None:
+            _DEFAULT_WRITER = NiftiWriter()
+    return _DEFAULT_WRITER
@@ -0,0 +1,129 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+
+MB = 1024 ** 2
+
+
+def gpu_memory(device_index: int):
+    """
+    Total, free and used memory of a GPU in MB, as seen by the driver, or None without CUDA.
+    """
+    if not torch.cuda.is_available():
+        return None
+
+    try:
+        free, total = torch.cuda.mem_get_info(device_index)
+    except (AttributeError, RuntimeError):
+        total = torch.cuda.get_device_properties(device_index).total_memory
+        free = total - torch.cuda.memory_reserved(device_index)
+
+    return np.array([total, free, total - free]) / MB
+
+
+def process_memory():
+    """
+    Resident set size of the current process in MB, or None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def queue_depth(data_loader):
+    """
+    Number of batches prefetched by the workers of a data loader, known only while its iterator is kept alive (i.e. with
+    `persistent_workers`).
+    """
+    queue = getattr(getattr(data_loader, "_iterator", None), "_data_queue", None)
+    try:
+        return queue.qsize() if queue is not None else None
+    except NotImplementedError:
+        return None
+
+
+class TelemetrySampler(object):
+    """
+    Sample GPU memory, process memory, CPU utilization and data loader queue depths from a background thread.
+
+    No driver or system query runs on the training thread: `publish()` only copies the latest samples into the
+    trainer's custom variables. GPU memory is left out when CUDA is not available, and so are the other samples when
+    the platform does not expose them. An `interval` of 0 disables sampling.
+    """
+
+    def __init__(self, device_index: int = 0, interval: float = 1.0, data_loaders: dict = None):
+        self._device_index = device_index
+        self._interval = interval
+        self._data_loaders = data_loaders if data_loaders is not None else {}
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if interval > 0:
+            self._thread = threading.Thread(target=self._run, name="TelemetrySampler", daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_config(cls, training_config, device_index: int, data_loaders: dict = None):
+        return cls(device_index, training_config.variables.get("telemetry_interval", 1.0), data_loaders)
+
+    def sample(self, cpu_times: tuple):
+        samples = {}
+
+        memory = gpu_memory(self._device_index)
+        if memory is not None:
+            samples["GPU {} Memory".format(self._device_index)] = [memory]
+
+        memory = process_memory()
+        if memory is not None:
+            samples["Process Memory"] = [memory]
+
+        wall_time, cpu_time = time.time(), sum(os.times()[:2])
+        if cpu_times is not None and wall_time > cpu_times[0]:
+            samples["CPU Utilization"] = [100.0 * (cpu_time - cpu_times[1]) / (wall_time - cpu_times[0])]
+
+        for name, data_loader in self._data_loaders.items():
+            depth = queue_depth(data_loader)
+            if depth is not None:
+                samples["{} Loader Queue Depth".format(name)] = [depth]
+
+        return samples, (wall_time, cpu_time)
+
+    def _run(self):
+        cpu_times = None
+        while True:
+            samples, cpu_times = self.sample(cpu_times)
+            with self._lock:
+                self._samples = samples
+            if self._stop.wait(self._interval):
+                return
+
+    def publish(self, custom_variables: dict):
+        with self._lock:
+            custom_variables.update(self._samples)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -13,17 +13,15 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ==============================================================================
-import uuid
-
-import matplotlib.pyplot as plt
 import numpy as np
 import os
 import re
 import torch
-from samitorch.inputs.transformers import ToNifti1Image, NiftiToDisk
-from torchvision.transforms import Compose
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 from deepNormalize.utils.constants import DATASET_ID, ABIDE_ID, ISEG_ID, MRBRAINS_ID, IMAGE_TARGET
+from deepNormalize.utils.nifti_writer import NiftiWriter, default_nifti_writer
 
 
 def natural_sort(l):
@@ -241,240 +239,124 @@ def to_html_time(time):
     return header + body
 
 
+def histogram(values, bins: int = 128, value_range=None):
+    """
+    Counts and bin edges of `values`, computed with `torch.histc` on the device of the values and binned like
+    `numpy.histogram`: over the range of the values unless `value_range` is given, values outside of it are dropped.
+    """
+    values = torch.as_tensor(values).detach().flatten().float()
+
+    if value_range is None:
+        if values.numel() == 0:
+            value_range = (0.0, 1.0)
+        else:
+            value_range = (values.min().item(), values.max().item())
+            if value_range[0] == value_range[1]:
+                value_range = (value_range[0] - 0.5, value_range[1] + 0.5)
+
+    counts = torch.histc(values, bins=bins, min=value_range[0], max=value_range[1]) if values.numel() > 0 else \
+        torch.zeros(bins)
+
+    return counts.cpu().numpy(), np.linspace(value_range[0], value_range[1], bins + 1)
+
+
+def figure_to_rgb(figure: Figure):
+    """
+    Render a figure with the Agg canvas into a (3, H, W) uint8 RGB array, without touching the disk.
+    """
+    canvas = FigureCanvasAgg(figure)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[:, :, :3].transpose((2, 0, 1)).copy()
+
+
+def _plot_histograms(ax, values: list, labels: list, title: str, value_range=None, alpha=None):
+    """
+    Plot the histograms of `values` on the same axis and return their range. Unless `value_range` is given, the first
+    values define the bins of all the others.
+    """
+    for i, (image_values, label) in enumerate(zip(values, labels)):
+        counts, edges = histogram(image_values, value_range=value_range)
+        value_range = (edges[0], edges[-1])
+        ax.hist(edges[:-1], bins=edges, weights=counts, alpha=alpha if i > 0 else None, density=False, label=label)
+    ax.set_xlabel("Intensity")
+    ax.set_ylabel("Frequency")
+    ax.set_title(title)
+    ax.legend()
+
+    return value_range
+
+
+def _positive(image):
+    return image[image > 0]
+
+
 def construct_triple_histrogram(gen_pred_iseg, input_iseg, gen_pred_mrbrains, input_mrbrains, gen_pred_abide,
                                 input_abide):
-    fig1, ((ax1, ax4), (ax2, ax5), (ax3, ax6)) = plt.subplots(nrows=3, ncols=2,
-                                                              figsize=(12, 10))
-
-    _, bins, _ = ax1.hist(gen_pred_iseg[gen_pred_iseg > 0].flatten(), bins=128,
-                          density=False, label="iSEG")
-    ax1.set_xlabel("Intensity")
-    ax1.set_ylabel("Frequency")
-    ax1.set_title("Generated iSEG Histogram")
-    ax1.legend()
-
-    _ = ax2.hist(gen_pred_mrbrains[gen_pred_mrbrains > 0].flatten(), bins=bins,
-                 density=False, label="MRBrainS")
-    ax2.set_xlabel("Intensity")
-    ax2.set_ylabel("Frequency")
-    ax2.set_title("Generated MRBrainS Histogram")
-    ax2.legend()
-
-    _ = ax3.hist(gen_pred_abide[gen_pred_abide > 0].flatten(), bins=bins,
-                 density=False, label="ABIDE")
-    ax3.set_xlabel("Intensity")
-    ax3.set_ylabel("Frequency")
-    ax3.set_title("Generated ABIDE Histogram")
-    ax3.legend()
-
-    _, bins, _ = ax4.hist(input_iseg[input_iseg > 0].flatten(), bins=128,
-                          density=False, label="iSEG")
-    ax4.set_xlabel("Intensity")
-    ax4.set_ylabel("Frequency")
-    ax4.set_title("Input iSEG Histogram")
-    ax4.legend()
-    _ = ax5.hist(input_mrbrains[input_mrbrains > 0].flatten(), bins=bins,
-                 density=False, label="MRBrainS")
-    ax5.set_xlabel("Intensity")
-    ax5.set_ylabel("Frequency")
-    ax5.set_title("Input MRBrainS Histogram")
-    ax5.legend()
-
-    _ = ax6.hist(input_abide[input_abide > 0].flatten(), bins=bins,
-                 density=False, label="ABIDE")
-    ax6.set_xlabel("Intensity")
-    ax6.set_ylabel("Frequency")
-    ax6.set_title("Input ABIDE Histogram")
-    ax6.legend()
-
-    fig1.tight_layout()
-    id = str(uuid.uuid4())
-    fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-    fig1.clf()
-    plt.close(fig1)
-
-    return "/tmp/histograms-{}.png".format(str(id))
+    figure = Figure(figsize=(12, 10))
+    axes = figure.subplots(nrows=3, ncols=2)
+
+    for column, (images, prefix) in enumerate([((gen_pred_iseg, gen_pred_mrbrains, gen_pred_abide), "Generated"),
+                                               ((input_iseg, input_mrbrains, input_abide), "Input")]):
+        # The iSEG histogram defines the bins of the other datasets.
+        value_range = None
+        for row, (image, label) in enumerate(zip(images, ["iSEG", "MRBrainS", "ABIDE"])):
+            value_range = _plot_histograms(axes[row][column], [_positive(image)], [label],
+                                           "{} {} Histogram".format(prefix, label), value_range)
+
+    figure.tight_layout()
+
+    return figure_to_rgb(figure)
 
 
 def construct_double_histrogram(gen_pred_iseg, input_iseg, gen_pred_mrbrains, input_mrbrains):
-    fig1, ((ax1, ax3), (ax2, ax4)) = plt.subplots(nrows=2, ncols=2,
-                                                  figsize=(12, 10))
-
-    _, bins, _ = ax1.hist(input_iseg[input_iseg > 0].flatten(), bins=128,
-                          density=False, label="iSEG")
-    ax1.set_xlabel("Intensity")
-    ax1.set_ylabel("Frequency")
-    ax1.set_title("Input iSEG Histogram")
-    ax1.legend()
-
-    _ = ax3.hist(gen_pred_iseg[gen_pred_iseg > 0].flatten(), bins=bins,
-                 density=False, label="iSEG")
-    ax3.set_xlabel("Intensity")
-    ax3.set_ylabel("Frequency")
-    ax3.set_title("Generated iSEG Histogram")
-    ax3.legend()
-
-    _, bins, _ = ax2.hist(input_mrbrains[input_mrbrains > 0].flatten(), bins=128,
-                          density=False, label="MRBrainS")
-    ax2.set_xlabel("Intensity")
-    ax2.set_ylabel("Frequency")
-    ax2.set_title("Input MRBrainS Histogram")
-    ax2.legend()
-
-    _ = ax4.hist(gen_pred_mrbrains[gen_pred_mrbrains > 0].flatten(), bins=bins,
-                 density=False, label="MRBrainS")
-    ax4.set_xlabel("Intensity")
-    ax4.set_ylabel("Frequency")
-    ax4.set_title("Generated MRBrainS Histogram")
-    ax4.legend()
-
-    fig1.tight_layout()
-    id = str(uuid.uuid4())
-    fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-    fig1.clf()
-    plt.close(fig1)
-
-    return "/tmp/histograms-{}.png".format(str(id))
+    figure = Figure(figsize=(12, 10))
+    axes = figure.subplots(nrows=2, ncols=2)
 
+    for row, (input, gen_pred, label) in enumerate([(input_iseg, gen_pred_iseg, "iSEG"),
+                                                     (input_mrbrains, gen_pred_mrbrains, "MRBrainS")]):
+        value_range = _plot_histograms(axes[row][0], [_positive(input)], [label], "Input {} Histogram".format(label))
+        _plot_histograms(axes[row][1], [_positive(gen_pred)], [label], "Generated {} Histogram".format(label),
+                         value_range)
 
-def construct_single_histogram(gen_pred, input):
-    fig1, (ax1, ax2) = plt.subplots(nrows=1, ncols=2,
-                                    figsize=(12, 10))
+    figure.tight_layout()
 
-    _, bins, _ = ax1.hist(input[input > 0].flatten(), bins=128,
-                          density=False, label="Input")
-    ax1.set_xlabel("Intensity")
-    ax1.set_ylabel("Frequency")
-    ax1.set_title("Input Histogram")
-    ax1.legend()
+    return figure_to_rgb(figure)
 
-    _ = ax2.hist(gen_pred[gen_pred > 0].flatten(), bins=bins,
-                 density=False, label="iSEG")
-    ax2.set_xlabel("Intensity")
-    ax2.set_ylabel("Frequency")
-    ax2.set_title("Generated Histogram")
-    ax2.legend()
 
-    fig1.tight_layout()
-    id = str(uuid.uuid4())
-    fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
+def construct_single_histogram(gen_pred, input):
+    figure = Figure(figsize=(12, 10))
+    ax1, ax2 = figure.subplots(nrows=1, ncols=2)
 
-    fig1.clf()
-    plt.close(fig1)
+    value_range = _plot_histograms(ax1, [_positive(input)], ["Input"], "Input Histogram")
+    _plot_histograms(ax2, [_positive(gen_pred)], ["iSEG"], "Generated Histogram", value_range)
 
-    return "/tmp/histograms-{}.png".format(str(id))
+    figure.tight_layout()
+
+    return figure_to_rgb(figure)
 
 
 def construct_class_histogram(inputs, target, gen_pred):
-    iseg_inputs = inputs[torch.where(target[DATASET_ID] == ISEG_ID)]
-    iseg_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ISEG_ID)]
-    iseg_gen_pred = gen_pred[torch.where(target[DATASET_ID] == ISEG_ID)]
-    mrbrains_inputs = inputs[torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-    mrbrains_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-    mrbrains_gen_pred = gen_pred[torch.where(target[DATASET_ID] == MRBRAINS_ID)]
-    abide_inputs = inputs[torch.where(target[DATASET_ID] == ABIDE_ID)]
-    abide_targets = target[IMAGE_TARGET][torch.where(target[DATASET_ID] == ABIDE_ID)]
-    abide_gen_pred = gen_pred[torch.where(target[DATASET_ID] == ABIDE_ID)]
-
-    fig1, ((ax1, ax5), (ax2, ax6), (ax3, ax7), (ax4, ax8)) = plt.subplots(nrows=4, ncols=2,
-                                                                          figsize=(12, 10))
-
-    _, bins, _ = ax1.hist(iseg_gen_pred[torch.where(iseg_targets == 0)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax1.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 0)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax1.hist(abide_gen_pred[torch.where(abide_targets == 0)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax1.set_xlabel("Intensity")
-    ax1.set_ylabel("Frequency")
-    ax1.set_title("Generated Background Histogram")
-    ax1.legend()
-
-    _, bins, _ = ax2.hist(iseg_gen_pred[torch.where(iseg_targets == 1)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax2.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 1)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax2.hist(abide_gen_pred[torch.where(abide_targets == 1)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax2.set_xlabel("Intensity")
-    ax2.set_ylabel("Frequency")
-    ax2.set_title("Generated CSF Histogram")
-    ax2.legend()
-
-    _, bins, _ = ax3.hist(iseg_gen_pred[torch.where(iseg_targets == 2)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax3.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 2)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax3.hist(abide_gen_pred[torch.where(abide_targets == 2)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax3.set_xlabel("Intensity")
-    ax3.set_ylabel("Frequency")
-    ax3.set_title("Generated Gray Matter Histogram")
-    ax3.legend()
-
-    _, bins, _ = ax4.hist(iseg_gen_pred[torch.where(iseg_targets == 3)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax4.hist(mrbrains_gen_pred[torch.where(mrbrains_targets == 3)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax4.hist(abide_gen_pred[torch.where(abide_targets == 3)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax4.set_xlabel("Intensity")
-    ax4.set_ylabel("Frequency")
-    ax4.set_title("Generated White Matter Histogram")
-    ax4.legend()
-
-    _, bins, _ = ax5.hist(iseg_inputs[torch.where(iseg_targets == 0)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax5.hist(mrbrains_inputs[torch.where(mrbrains_targets == 0)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax5.hist(abide_inputs[torch.where(abide_targets == 0)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax5.set_xlabel("Intensity")
-    ax5.set_ylabel("Frequency")
-    ax5.set_title("Input Background Histogram")
-    ax5.legend()
-
-    _, bins, _ = ax6.hist(iseg_inputs[torch.where(iseg_targets == 1)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax6.hist(mrbrains_inputs[torch.where(mrbrains_targets == 1)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax6.hist(abide_inputs[torch.where(abide_targets == 1)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax6.set_xlabel("Intensity")
-    ax6.set_ylabel("Frequency")
-    ax6.set_title("Input CSF Histogram")
-    ax6.legend()
-
-    _, bins, _ = ax7.hist(iseg_inputs[torch.where(iseg_targets == 2)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax7.hist(mrbrains_inputs[torch.where(mrbrains_targets == 2)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax7.hist(abide_inputs[torch.where(abide_targets == 2)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax7.set_xlabel("Intensity")
-    ax7.set_ylabel("Frequency")
-    ax7.set_title("Input Gray Matter Histogram")
-    ax7.legend()
-
-    _, bins, _ = ax8.hist(iseg_inputs[torch.where(iseg_targets == 3)].cpu().detach().numpy(), bins=128,
-                          density=False, label="iSEG")
-    _ = ax8.hist(mrbrains_inputs[torch.where(mrbrains_targets == 3)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="MRBrainS")
-    _ = ax8.hist(abide_inputs[torch.where(abide_targets == 3)].cpu().detach().numpy(), bins=bins,
-                 alpha=0.75, density=False, label="ABIDE")
-    ax8.set_xlabel("Intensity")
-    ax8.set_ylabel("Frequency")
-    ax8.set_title("Input White Matter Histogram")
-    ax8.legend()
-    fig1.tight_layout()
-    id = str(uuid.uuid4())
-    fig1.savefig("/tmp/histograms-{}.png".format(str(id)))
-
-    fig1.clf()
-    plt.close(fig1)
-    return "/tmp/histograms-{}.png".format(str(id))
+    """
+    Per class intensity histograms of the generated and input images of every dataset, computed on the device of the
+    images and rendered to a (3, H, W) RGB array.
+    """
+    figure = Figure(figsize=(12, 10))
+    axes = figure.subplots(nrows=4, ncols=2)
+
+    for column, (images, prefix) in enumerate([(gen_pred, "Generated"), (inputs, "Input")]):
+        per_dataset = [images[target[DATASET_ID] == dataset_id] for dataset_id in [ISEG_ID, MRBRAINS_ID, ABIDE_ID]]
+        per_dataset_targets = [target[IMAGE_TARGET][target[DATASET_ID] == dataset_id] for dataset_id in
+                               [ISEG_ID, MRBRAINS_ID, ABIDE_ID]]
+
+        for row, class_name in enumerate(["Background", "CSF", "Gray Matter", "White Matter"]):
+            _plot_histograms(axes[row][column],
+                             [dataset_images[dataset_targets == row] for dataset_images, dataset_targets in
+                              zip(per_dataset, per_dataset_targets)],
+                             ["iSEG", "MRBrainS", "ABIDE"], "{} {} Histogram".format(prefix, class_name), alpha=0.75)
+
+    figure.tight_layout()
+
+    return figure_to_rgb(figure)
 
 
 def count(tensor, n_classes):
@@ -552,66 +434,46 @@ def rebuild_augmented_images(img_augmented, img_input, img_gt, img_norm, img_seg
     return augmented_minus_inputs, normalized_minus_inputs
 
 
-def save_rebuilt_image(current_epoch, save_folder, datasets, image, image_type):
-    if not os.path.exists(os.path.join(save_folder, "reconstructed_images")):
-        os.makedirs(os.path.join(save_folder, "reconstructed_images"))
+def save_rebuilt_image(current_epoch, save_folder, datasets, image, image_type, writer: NiftiWriter = None):
+    writer = writer if writer is not None else default_nifti_writer()
 
     for dataset in datasets:
-        transform_img = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_{}_{}_Image_{}.nii.gz".format(image_type, dataset,
-                                                                                                    str(
-                                                                                                        current_epoch))))])
-        transform_img(image[dataset])
+        writer.write(image[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                  "Reconstructed_{}_{}_Image_{}.nii.gz".format(image_type, dataset,
+                                                                                               str(current_epoch))))
 
 
-def save_rebuilt_images(current_epoch, save_folder, datasets, img_input, img_norm, img_seg, img_gt):
-    if not os.path.exists(os.path.join(save_folder, "reconstructed_images")):
-        os.makedirs(os.path.join(save_folder, "reconstructed_images"))
+def save_rebuilt_images(current_epoch, save_folder, datasets, img_input, img_norm, img_seg, img_gt,
+                        writer: NiftiWriter = None):
+    writer = writer if writer is not None else default_nifti_writer()
 
     for dataset in datasets:
-        transform_img_norm = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Normalized_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-        transform_img_seg = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Segmented_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-        transform_img_gt = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Ground_Truth_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-        transform_img_input = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Input_{}_Image.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-
-        transform_img_norm(img_norm[dataset])
-        transform_img_seg(img_seg[dataset])
-        transform_img_gt(img_gt[dataset])
-        transform_img_input(img_input[dataset])
+        writer.write(img_norm[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                     "Reconstructed_Normalized_{}_Image_{}.nii.gz".format(
+                                                         dataset, str(current_epoch))))
+        writer.write(img_seg[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                    "Reconstructed_Segmented_{}_Image_{}.nii.gz".format(
+                                                        dataset, str(current_epoch))))
+        writer.write(img_gt[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                   "Reconstructed_Ground_Truth_{}_Image_{}.nii.gz".format(
+                                                       dataset, str(current_epoch))))
+        writer.write(img_input[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                      "Reconstructed_Input_{}_Image.nii.gz".format(dataset)))
 
 
 def save_augmented_rebuilt_images(current_epoch, save_folder, datasets, img_augmented, augmented_minus_inputs,
-                                  norm_minus_augmented):
-    if not os.path.exists(os.path.join(save_folder, "reconstructed_images")):
-        os.makedirs(os.path.join(save_folder, "reconstructed_images"))
+                                  norm_minus_augmented, writer: NiftiWriter = None):
+    writer = writer if writer is not None else default_nifti_writer()
 
     for dataset in datasets:
-        transform_img_augmented = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Augmented_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-        transform_img_augmented_minus_inputs = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Augmented_minus_Inputs_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-        transform_img_normalized_minus_augmented = Compose(
-            [ToNifti1Image(), NiftiToDisk(os.path.join(save_folder, "reconstructed_images",
-                                                       "Reconstructed_Normalized_minus_Augmented_{}_Image_{}.nii.gz".format(
-                                                           dataset, str(current_epoch))))])
-
-        transform_img_augmented(img_augmented[dataset])
-        transform_img_augmented_minus_inputs(augmented_minus_inputs[dataset])
-        transform_img_normalized_minus_augmented(norm_minus_augmented[dataset])
+        writer.write(img_augmented[dataset], os.path.join(save_folder, "reconstructed_images",
+                                                          "Reconstructed_Augmented_{}_Image_{}.nii.gz".format(
+                                                              dataset, str(current_epoch))))
+        writer.write(augmented_minus_inputs[dataset],
+                     os.path.join(save_folder, "reconstructed_images",
+                                  "Reconstructed_Augmented_minus_Inputs_{}_Image_{}.nii.gz".format(
+                                      dataset, str(current_epoch))))
+        writer.write(norm_minus_augmented[dataset],
+                     os.path.join(save_folder, "reconstructed_images",
+                                  "Reconstructed_Normalized_minus_Augmented_{}_Image_{}.nii.gz".format(
+                                      dataset, str(current_epoch))))
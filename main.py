@@ -37,15 +37,17 @@ from kerosene.utils.devices import on_multiple_gpus
 from samitorch.inputs.augmentation.strategies import AugmentInput
 from samitorch.inputs.augmentation.transformers import AddNoise, AddBiasField, ShiftHistogram
 from samitorch.inputs.utils import augmented_sample_collate
-from torch.utils.data import DataLoader
-from torch.utils.data.dataloader import DataLoader
 from torchvision.transforms import Compose
 
 from deepNormalize.config.parsers import ArgsParserFactory, ArgsParserType
-from deepNormalize.events.handlers.handlers import PlotGPUMemory, PlotCustomLinePlotWithLegend, PlotCustomLoss
+from deepNormalize.events.handlers.handlers import PlotGPUMemory, PlotCustomLinePlotWithLegend, PlotCustomLoss, \
+    PlotCustomLinePlot, PlotCustomHistogram, PlotStepTimes, StoreMetrics, ProfileSteps, ReportLoaderStages
 from deepNormalize.factories.customCriterionFactory import CustomCriterionFactory
 from deepNormalize.factories.customModelFactory import CustomModelFactory
 from deepNormalize.inputs.datasets import iSEGSegmentationFactory, MRBrainSSegmentationFactory, ABIDESegmentationFactory
+from deepNormalize.inputs.instrumentation import LoaderCounters, InstrumentedDataLoader
+from deepNormalize.loggers.metrics import MetricsStore
+from deepNormalize.loggers.visdom import AsyncVisdomLogger
 from deepNormalize.training.gan import DeepNormalizeTrainer
 from deepNormalize.utils.constants import *
 from deepNormalize.utils.image_slicer import ImageReconstructor
@@ -68,6 +70,10 @@ if __name__ == '__main__':
     model_trainer_configs, training_config = YamlConfigurationParser.parse(args.config_file)
     dataset_configs = YamlConfigurationParser.parse_section(args.config_file, "dataset")
     dataset_configs = {k: DatasetConfiguration(v) for k, v, in dataset_configs.items()}
+    # Sliding window of the reconstructions run with the models, set in the "variables" of the "training" section.
+    reconstruction_options = {"inference_step": training_config.variables.get("inference_step", None),
+                              "fusion": training_config.variables.get("fusion", "uniform"),
+                              "skip_threshold": training_config.variables.get("skip_threshold", 0.0)}
     config_html = [training_config.to_html(), list(map(lambda config: config.to_html(), dataset_configs.values())),
                    list(map(lambda config: config.to_html(), model_trainer_configs))]
 
@@ -123,14 +129,14 @@ if __name__ == '__main__':
                                                             dataset_configs['iSEG'].patch_size,
                                                             dataset_configs["iSEG"].step,
                                                             [model_trainers[GENERATOR]],
-                                                            normalize=True))
+                                                            normalize=True, **reconstruction_options))
         segmentation_reconstructors.append(
             ImageReconstructor(dataset_configs["iSEG"].reconstruction_size,
                                dataset_configs['iSEG'].patch_size,
                                dataset_configs["iSEG"].step,
                                [model_trainers[GENERATOR],
                                 model_trainers[SEGMENTER]],
-                               segment=True))
+                               segment=True, **reconstruction_options))
         input_reconstructors.append(ImageReconstructor(dataset_configs["iSEG"].reconstruction_size,
                                                        dataset_configs['iSEG'].patch_size,
                                                        dataset_configs["iSEG"].step))
@@ -169,13 +175,13 @@ if __name__ == '__main__':
             ImageReconstructor(dataset_configs["MRBrainS"].reconstruction_size,
                                dataset_configs['MRBrainS'].patch_size,
                                dataset_configs["MRBrainS"].step,
-                               [model_trainers[GENERATOR]], normalize=True))
+                               [model_trainers[GENERATOR]], normalize=True, **reconstruction_options))
         segmentation_reconstructors.append(
             ImageReconstructor(dataset_configs["MRBrainS"].reconstruction_size,
                                dataset_configs['MRBrainS'].patch_size,
                                dataset_configs["MRBrainS"].step,
                                [model_trainers[GENERATOR],
-                                model_trainers[SEGMENTER]], segment=True))
+                                model_trainers[SEGMENTER]], segment=True, **reconstruction_options))
         input_reconstructors.append(ImageReconstructor(dataset_configs["MRBrainS"].reconstruction_size,
                                                        dataset_configs['MRBrainS'].patch_size,
                                                        dataset_configs["MRBrainS"].step))
@@ -213,13 +219,14 @@ if __name__ == '__main__':
         normalized_reconstructors.append(ImageReconstructor(dataset_configs["ABIDE"].reconstruction_size,
                                                             dataset_configs['ABIDE'].patch_size,
                                                             dataset_configs["ABIDE"].step,
-                                                            [model_trainers[GENERATOR]], normalize=True))
+                                                            [model_trainers[GENERATOR]], normalize=True,
+                                                            **reconstruction_options))
         segmentation_reconstructors.append(
             ImageReconstructor(dataset_configs["ABIDE"].reconstruction_size,
                                dataset_configs['ABIDE'].patch_size,
                                dataset_configs["ABIDE"].step,
                                [model_trainers[GENERATOR],
-                                model_trainers[SEGMENTER]], segment=True))
+                                model_trainers[SEGMENTER]], segment=True, **reconstruction_options))
         input_reconstructors.append(ImageReconstructor(dataset_configs["ABIDE"].reconstruction_size,
                                                        dataset_configs['ABIDE'].patch_size,
                                                        dataset_configs["ABIDE"].step))
@@ -248,21 +255,20 @@ if __name__ == '__main__':
     else:
         train_sampler, valid_sampler, test_sampler = None, None, None
 
-    # Create loaders.
-    dataloaders = list(map(lambda dataset, sampler: DataLoader(dataset,
-                                                               training_config.batch_size,
-                                                               sampler=sampler,
-                                                               shuffle=False if sampler is not None else True,
-                                                               num_workers=args.num_workers,
-                                                               collate_fn=augmented_sample_collate,
-                                                               drop_last=True,
-                                                               pin_memory=True),
+    # Create loaders, counting the time and bytes of their loading stages when asked to.
+    loader_counters = [LoaderCounters() if training_config.variables.get("loader_instrumentation", False) else None
+                       for _ in range(3)]
+    dataloaders = list(map(lambda dataset, sampler, counters: InstrumentedDataLoader(
+        dataset, training_config.batch_size, sampler=sampler, shuffle=False if sampler is not None else True,
+        num_workers=args.num_workers, persistent_workers=args.num_workers > 0, collate_fn=augmented_sample_collate,
+        drop_last=True, pin_memory=True, counters=counters),
                            [train_dataset, valid_dataset, test_dataset],
-                           [train_sampler, valid_sampler, test_sampler]))
+                           [train_sampler, valid_sampler, test_sampler],
+                           loader_counters))
 
     # Initialize the loggers.
     visdom_config = VisdomConfiguration.from_yml(args.config_file, "visdom")
-    visdom_logger = VisdomLogger(visdom_config)
+    visdom_logger = AsyncVisdomLogger(VisdomLogger(visdom_config))
 
     visdom_logger(VisdomData("Experiment", "Experiment Config", PlotType.TEXT_PLOT, PlotFrequency.EVERY_EPOCH, None,
                              config_html))
@@ -276,6 +282,11 @@ if __name__ == '__main__':
     [os.makedirs("{}/{}".format(save_folder, model), exist_ok=True)
      for model in
      ["Discriminator", "Generator", "Segmenter"]]
+    metrics_store = MetricsStore(os.path.join(save_folder, "metrics.sqlite"),
+                                 run=os.path.basename(os.path.normpath(visdom_config.env)))
+    store_metrics = StoreMetrics(metrics_store)
+    profile_steps = ProfileSteps.from_config(training_config, save_folder, args.config_file)
+    report_loader_stages = ReportLoaderStages(dict(zip(["Training", "Validation", "Test"], loader_counters)))
 
     trainer = DeepNormalizeTrainer(training_config, model_trainers, dataloaders[0], dataloaders[1], dataloaders[2],
                                    reconstruction_datasets, normalized_reconstructors, input_reconstructors,
@@ -326,56 +337,45 @@ if __name__ == '__main__':
                                                  run_config.local_rank)}},
                             every=500), Event.ON_TRAIN_BATCH_END) \
         .with_event_handler(
-        PlotCustomVariables(visdom_logger, "Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "Generated Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "Background Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "Background Generated Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "CSF Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "CSF Generated Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "GM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "GM Generated Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "WM Generated Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "WM Generated Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={
-                                "opts": {"title": "Inputs Intensity Histogram",
-                                         "store_history": True,
-                                         "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "Background Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "Background Input Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "CSF Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "CSF Input Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "GM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "GM Input Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
-        .with_event_handler(
-        PlotCustomVariables(visdom_logger, "WM Input Intensity Histogram", PlotType.HISTOGRAM_PLOT,
-                            params={"opts": {"title": "WM Input Intensity Histogram",
-                                             "store_history": True,
-                                             "numbins": 128}}, every=100), Event.ON_TRAIN_BATCH_END) \
+        PlotCustomHistogram(visdom_logger, "Generated Intensity Histogram",
+                            params={"opts": {"title": "Generated Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "Background Generated Intensity Histogram",
+                            params={"opts": {"title": "Background Generated Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "CSF Generated Intensity Histogram",
+                            params={"opts": {"title": "CSF Generated Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "GM Generated Intensity Histogram",
+                            params={"opts": {"title": "GM Generated Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "WM Generated Intensity Histogram",
+                            params={"opts": {"title": "WM Generated Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "Input Intensity Histogram",
+                            params={"opts": {"title": "Inputs Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "Background Input Intensity Histogram",
+                            params={"opts": {"title": "Background Input Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "CSF Input Intensity Histogram",
+                            params={"opts": {"title": "CSF Input Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "GM Input Intensity Histogram",
+                            params={"opts": {"title": "GM Input Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomHistogram(visdom_logger, "WM Input Intensity Histogram",
+                            params={"opts": {"title": "WM Input Intensity Histogram"}},
+                            every=100), Event.ON_TRAIN_BATCH_END) \
         .with_event_handler(PlotCustomVariables(visdom_logger, "Pie Plot", PlotType.PIE_PLOT,
                                                 params={"opts": {"title": "Classification hit per classes",
                                                                  "legend": list(map(lambda key: key,
@@ -465,6 +465,24 @@ if __name__ == '__main__':
                                      params={"title": "Dice score per class per epoch on reconstructed ABIDE image",
                                              "legend": ["CSF", "GM", "WM"]}), Event.ON_TEST_EPOCH_END) \
         .with_event_handler(
+        PlotCustomLinePlotWithLegend(visdom_logger,
+                                     "Hausdorff Distance per class per epoch on reconstructed iSEG image", every=1,
+                                     params={
+                                         "title": "Hausdorff Distance per class per epoch on reconstructed iSEG image",
+                                         "legend": ["CSF", "GM", "WM"]}), Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlotWithLegend(visdom_logger,
+                                     "Hausdorff Distance per class per epoch on reconstructed MRBrainS image", every=1,
+                                     params={
+                                         "title": "Hausdorff Distance per class per epoch on reconstructed MRBrainS image",
+                                         "legend": ["CSF", "GM", "WM"]}), Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlotWithLegend(visdom_logger,
+                                     "Hausdorff Distance per class per epoch on reconstructed ABIDE image", every=1,
+                                     params={
+                                         "title": "Hausdorff Distance per class per epoch on reconstructed ABIDE image",
+                                         "legend": ["CSF", "GM", "WM"]}), Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(
         PlotCustomVariables(visdom_logger, "Reconstructed Input iSEG Image", PlotType.IMAGE_PLOT,
                             params={"opts": {"store_history": True,
                                              "title": "Reconstructed Input iSEG Image"}},
@@ -574,7 +592,43 @@ if __name__ == '__main__':
                                           {"local_rank": run_config.local_rank}, every=50),
                             Event.ON_TRAIN_BATCH_END) \
         .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Process Memory", every=50,
+                           params={"ylabel": "Memory Consumption (MB)",
+                                   "title": "Process {} Memory".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "CPU Utilization", every=50,
+                           params={"ylabel": "CPU Utilization (%)",
+                                   "title": "Process {} CPU Utilization".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Training Loader Queue Depth", every=50,
+                           params={"ylabel": "Prefetched Batches",
+                                   "title": "Training Loader Queue Depth Process {}".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(PlotStepTimes(visdom_logger, every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
         Checkpoint(save_folder, monitor_fn=lambda model_trainer: model_trainer.valid_loss, delta=0.01,
                    mode=MonitorMode.MIN), Event.ON_EPOCH_END) \
         .with_event_handler(PlotAvgGradientPerLayer(visdom_logger, every=25), Event.ON_TRAIN_BATCH_END) \
-        .train(training_config.nb_epochs)
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Reconstruction Skipped Patches", every=1,
+                           params={"title": "Background patches skipped per reconstruction",
+                                   "legend": list(dataset_configs.keys())}), Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Reconstruction Time Saved", every=1,
+                           params={"ylabel": "Time (s)", "title": "Inference time saved per reconstruction"}),
+        Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(report_loader_stages, Event.ON_EPOCH_END) \
+        .with_event_handler(store_metrics, Event.ON_BATCH_END) \
+        .with_event_handler(store_metrics, Event.ON_EPOCH_END) \
+        .with_event_handler(profile_steps, Event.ON_TRAIN_BATCH_END)
+
+    try:
+        trainer.train(training_config.nb_epochs)
+    finally:
+        # Also flush the samples and stop the reconstruction process when training fails.
+        trainer.close()
+        profile_steps.close()
+        visdom_logger.close()
+        metrics_store.close()
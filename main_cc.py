@@ -27,19 +27,23 @@ from kerosene.configs.parsers import YamlConfigurationParser
 from kerosene.loggers.visdom import PlotType, PlotFrequency
 from kerosene.loggers.visdom.config import VisdomConfiguration
 from kerosene.loggers.visdom.visdom import VisdomLogger, VisdomData
+from kerosene.training.events import Event
 from kerosene.training.trainers import ModelTrainerFactory
 from kerosene.utils.devices import on_multiple_gpus
 from samitorch.inputs.augmentation.strategies import AugmentInput
 from samitorch.inputs.augmentation.transformers import ShiftHistogram
 from samitorch.inputs.utils import augmented_sample_collate
-from torch.utils.data import DataLoader
-from torch.utils.data.dataloader import DataLoader
 from torchvision.transforms import Compose
 
 from deepNormalize.config.parsers import ArgsParserFactory, ArgsParserType
+from deepNormalize.events.handlers.handlers import StoreMetrics, ProfileSteps, ReportLoaderStages, \
+    PlotCustomLinePlot, PlotGPUMemory, PlotStepTimes
 from deepNormalize.factories.customModelFactory import CustomModelFactory
 from deepNormalize.factories.customTrainerFactory import TrainerFactory
 from deepNormalize.inputs.datasets import iSEGSliceDatasetFactory, MRBrainSSliceDatasetFactory, ABIDESliceDatasetFactory
+from deepNormalize.inputs.instrumentation import LoaderCounters, InstrumentedDataLoader
+from deepNormalize.loggers.metrics import MetricsStore
+from deepNormalize.loggers.visdom import AsyncVisdomLogger
 from deepNormalize.nn.criterions import CustomCriterionFactory
 from deepNormalize.utils.constants import *
 from deepNormalize.utils.image_slicer import ImageReconstructor
@@ -62,6 +66,10 @@ if __name__ == '__main__':
     model_trainer_configs, training_config = YamlConfigurationParser.parse(args.config_file)
     dataset_configs = YamlConfigurationParser.parse_section(args.config_file, "dataset")
     dataset_configs = {k: DatasetConfiguration(v) for k, v, in dataset_configs.items()}
+    # Sliding window of the reconstructions run with the models, set in the "variables" of the "training" section.
+    reconstruction_options = {"inference_step": training_config.variables.get("inference_step", None),
+                              "fusion": training_config.variables.get("fusion", "uniform"),
+                              "skip_threshold": training_config.variables.get("skip_threshold", 0.0)}
     config_html = [training_config.to_html(), list(map(lambda config: config.to_html(), dataset_configs.values())),
                    list(map(lambda config: config.to_html(), model_trainer_configs))]
 
@@ -121,7 +129,7 @@ if __name__ == '__main__':
                                                             dataset_configs['iSEG'].test_patch_size,
                                                             dataset_configs["iSEG"].test_step,
                                                             [model_trainers[GENERATOR]],
-                                                            normalize=True,
+                                                            normalize=True, **reconstruction_options,
                                                             test_image=iSEG_reconstruction._augmented_images[
                                                                 0] if iSEG_reconstruction._augmented_images is not None else
                                                             iSEG_reconstruction._source_images[0]))
@@ -131,7 +139,7 @@ if __name__ == '__main__':
                                dataset_configs["iSEG"].test_step,
                                [model_trainers[GENERATOR],
                                 model_trainers[SEGMENTER]],
-                               normalize_and_segment=True,
+                               normalize_and_segment=True, **reconstruction_options,
                                test_image=iSEG_reconstruction._augmented_images[
                                    0] if iSEG_reconstruction._augmented_images is not None else
                                iSEG_reconstruction._source_images[0]))
@@ -178,7 +186,7 @@ if __name__ == '__main__':
                                                             dataset_configs['MRBrainS'].test_patch_size,
                                                             dataset_configs["MRBrainS"].test_step,
                                                             [model_trainers[GENERATOR]],
-                                                            normalize=True,
+                                                            normalize=True, **reconstruction_options,
                                                             test_image=MRBrainS_reconstruction._augmented_images[
                                                                 0] if MRBrainS_reconstruction._augmented_images is not None else
                                                             MRBrainS_reconstruction._source_images[0]))
@@ -188,7 +196,7 @@ if __name__ == '__main__':
                                dataset_configs["MRBrainS"].test_step,
                                [model_trainers[GENERATOR],
                                 model_trainers[SEGMENTER]],
-                               normalize_and_segment=True,
+                               normalize_and_segment=True, **reconstruction_options,
                                test_image=MRBrainS_reconstruction._augmented_images[
                                    0] if MRBrainS_reconstruction._augmented_images is not None else
                                MRBrainS_reconstruction._source_images[0]))
@@ -235,7 +243,7 @@ if __name__ == '__main__':
                                                             dataset_configs['ABIDE'].test_patch_size,
                                                             dataset_configs["ABIDE"].test_step,
                                                             [model_trainers[GENERATOR]],
-                                                            normalize=True,
+                                                            normalize=True, **reconstruction_options,
                                                             test_image=ABIDE_reconstruction._augmented_images[
                                                                 0] if ABIDE_reconstruction._augmented_images is not None else
                                                             ABIDE_reconstruction._source_images[0]))
@@ -245,7 +253,7 @@ if __name__ == '__main__':
                                dataset_configs["ABIDE"].test_step,
                                [model_trainers[GENERATOR],
                                 model_trainers[SEGMENTER]],
-                               normalize_and_segment=True,
+                               normalize_and_segment=True, **reconstruction_options,
                                test_image=ABIDE_reconstruction._augmented_images[
                                    0] if ABIDE_reconstruction._augmented_images is not None else
                                ABIDE_reconstruction._source_images[0]))
@@ -280,21 +288,20 @@ if __name__ == '__main__':
     else:
         train_sampler, valid_sampler, test_sampler = None, None, None
 
-    # Create loaders.
-    dataloaders = list(map(lambda dataset, sampler: DataLoader(dataset,
-                                                               training_config.batch_size,
-                                                               sampler=sampler,
-                                                               shuffle=False if sampler is not None else True,
-                                                               num_workers=args.num_workers,
-                                                               collate_fn=augmented_sample_collate,
-                                                               drop_last=True,
-                                                               pin_memory=True),
+    # Create loaders, counting the time and bytes of their loading stages when asked to.
+    loader_counters = [LoaderCounters() if training_config.variables.get("loader_instrumentation", False) else None
+                       for _ in range(3)]
+    dataloaders = list(map(lambda dataset, sampler, counters: InstrumentedDataLoader(
+        dataset, training_config.batch_size, sampler=sampler, shuffle=False if sampler is not None else True,
+        num_workers=args.num_workers, persistent_workers=args.num_workers > 0, collate_fn=augmented_sample_collate,
+        drop_last=True, pin_memory=True, counters=counters),
                            [train_dataset, valid_dataset, test_dataset],
-                           [train_sampler, valid_sampler, test_sampler]))
+                           [train_sampler, valid_sampler, test_sampler],
+                           loader_counters))
 
     # Initialize the loggers.
     visdom_config = VisdomConfiguration.from_yml(args.config_file, "visdom")
-    visdom_logger = VisdomLogger(visdom_config)
+    visdom_logger = AsyncVisdomLogger(VisdomLogger(visdom_config))
 
     visdom_logger(VisdomData("Experiment", "Experiment Config", PlotType.TEXT_PLOT, PlotFrequency.EVERY_EPOCH, None,
                              config_html))
@@ -308,6 +315,11 @@ if __name__ == '__main__':
     [os.makedirs("{}/{}".format(save_folder, model), exist_ok=True)
      for model in
      ["Discriminator", "Generator", "Segmenter"]]
+    metrics_store = MetricsStore(os.path.join(save_folder, "metrics.sqlite"),
+                                 run=os.path.basename(os.path.normpath(visdom_config.env)))
+    store_metrics = StoreMetrics(metrics_store)
+    profile_steps = ProfileSteps.from_config(training_config, save_folder, args.config_file)
+    report_loader_stages = ReportLoaderStages(dict(zip(["Training", "Validation", "Test"], loader_counters)))
 
     trainer = TrainerFactory(training_config.trainer).create(training_config, model_trainers, dataloaders,
                                                              reconstruction_datasets, normalized_reconstructors,
@@ -317,4 +329,42 @@ if __name__ == '__main__':
                                                              run_config, dataset_configs, save_folder,
                                                              visdom_logger)
 
-    trainer.train(training_config.nb_epochs)
+    trainer.with_event_handler(report_loader_stages, Event.ON_EPOCH_END) \
+        .with_event_handler(PlotGPUMemory(visdom_logger, "GPU {} Memory".format(run_config.local_rank),
+                                          {"local_rank": run_config.local_rank}, every=50),
+                            Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Process Memory", every=50,
+                           params={"ylabel": "Memory Consumption (MB)",
+                                   "title": "Process {} Memory".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "CPU Utilization", every=50,
+                           params={"ylabel": "CPU Utilization (%)",
+                                   "title": "Process {} CPU Utilization".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Training Loader Queue Depth", every=50,
+                           params={"ylabel": "Prefetched Batches",
+                                   "title": "Training Loader Queue Depth Process {}".format(run_config.local_rank)}),
+        Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(PlotStepTimes(visdom_logger, every=100), Event.ON_TRAIN_BATCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Reconstruction Skipped Patches", every=1,
+                           params={"title": "Background patches skipped per reconstruction",
+                                   "legend": list(dataset_configs.keys())}), Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(
+        PlotCustomLinePlot(visdom_logger, "Reconstruction Time Saved", every=1,
+                           params={"ylabel": "Time (s)", "title": "Inference time saved per reconstruction"}),
+        Event.ON_TEST_EPOCH_END) \
+        .with_event_handler(store_metrics, Event.ON_BATCH_END) \
+        .with_event_handler(store_metrics, Event.ON_EPOCH_END) \
+        .with_event_handler(profile_steps, Event.ON_TRAIN_BATCH_END)
+    try:
+        trainer.train(training_config.nb_epochs)
+    finally:
+        # Also flush the samples and stop the reconstruction process when training fails.
+        trainer.close()
+        profile_steps.close()
+        visdom_logger.close()
+        metrics_store.close()
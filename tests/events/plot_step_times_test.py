@@ -0,0 +1,53 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import unittest
+from types import SimpleNamespace
+
+from kerosene.events import Frequency
+
+from deepNormalize.events.handlers.handlers import PlotStepTimes
+from deepNormalize.training.step_timer import StepTimer
+
+
+class PlotStepTimesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._plot_step_times = PlotStepTimes(visdom_logger=None, every=100)
+        self._event = SimpleNamespace(frequency=Frequency.STEP, iteration=100)
+
+    def test_should_plot_the_percentiles_of_every_step_section(self):
+        step_timer = StepTimer()
+        for step in range(3):
+            step_timer.begin("Training", step)
+            step_timer.lap("Generator")
+            step_timer.end()
+        trainer = SimpleNamespace(name="Trainer", custom_variables={"Training Loader Wait Time": 1.0})
+        step_timer.publish(trainer.custom_variables)
+
+        plots = self._plot_step_times.create_visdom_data(self._event, trainer)
+
+        self.assertEqual([data.variable_name for data in plots],
+                         ["Training Data Wait Time", "Training Generator Time", "Training Other Time",
+                          "Training Step Time"])
+        self.assertEqual(plots[0].y, [trainer.custom_variables["Training Data Wait Time"]])
+        self.assertEqual(plots[0].params["opts"]["legend"], ["p50", "p90", "p99"])
+
+    def test_should_not_plot_before_any_step_is_timed(self):
+        trainer = SimpleNamespace(name="Trainer", custom_variables={})
+
+        self.assertEqual(self._plot_step_times.create_visdom_data(self._event, trainer), [])
@@ -0,0 +1,72 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import json
+import os
+import tempfile
+import unittest
+import warnings
+from types import SimpleNamespace
+
+import torch
+
+from deepNormalize.events.handlers.handlers import ProfileSteps
+
+
+class ProfileStepsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._generator = SimpleNamespace(name="Generator", model=torch.nn.Linear(8, 8))
+        self._segmenter = SimpleNamespace(name="Segmenter", model=torch.nn.Conv1d(1, 4, 3))
+        self._trainer = SimpleNamespace(model_trainers=[self._generator, self._segmenter], current_train_step=0)
+
+    def test_should_write_a_trace_and_a_summary_per_model(self):
+        with tempfile.TemporaryDirectory() as save_folder:
+            profile_steps = ProfileSteps(save_folder, signum=None)
+            profile_steps._start(self._trainer, 1, 3)
+            for _ in range(2):
+                self._segmenter.model(self._generator.model(torch.rand(2, 1, 8)))
+            profile_steps.close()
+
+            with open(os.path.join(save_folder, "profile_steps_1_3.json")) as trace:
+                self.assertGreater(len(json.load(trace)["traceEvents"]), 0)
+            with open(os.path.join(save_folder, "profile_steps_1_3.txt")) as summary:
+                summary = summary.read()
+
+        self.assertFalse(profile_steps.is_profiling)
+        self.assertIn("Generator", summary)
+        self.assertIn("aten::linear", summary.split("Segmenter")[0])
+        self.assertIn("aten::conv1d", summary.split("Segmenter")[1])
+
+    def test_should_not_read_deprecated_profiler_attributes(self):
+        with tempfile.TemporaryDirectory() as save_folder:
+            profile_steps = ProfileSteps(save_folder, signum=None)
+            profile_steps._start(self._trainer, 1, 2)
+            self._segmenter.model(self._generator.model(torch.rand(2, 1, 8)))
+
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", FutureWarning)
+                profile_steps.close()
+
+    def test_should_remove_the_forward_hooks_once_closed(self):
+        with tempfile.TemporaryDirectory() as save_folder:
+            profile_steps = ProfileSteps(save_folder, signum=None)
+            profile_steps._start(self._trainer, 1, 2)
+            profile_steps.close()
+
+        self.assertEqual(len(self._generator.model._forward_pre_hooks), 0)
+        self.assertEqual(len(self._generator.model._forward_hooks), 0)
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import torch
+from torch.utils.data.dataset import Dataset
+from torchvision.transforms import Compose
+
+from deepNormalize.inputs.instrumentation import LoaderCounters, InstrumentedDataLoader
+
+
+class ToNumpyArray(object):
+
+    def __call__(self, index):
+        return np.full((4, 4), index, dtype=np.float32)
+
+
+class AddOne(object):
+
+    def __call__(self, tensor):
+        return tensor + 1.0
+
+
+class ArrayDataset(Dataset):
+
+    def __init__(self, size):
+        self._size = size
+        self._transform = Compose([ToNumpyArray(), torch.from_numpy])
+        self._augment = AddOne()
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return self._augment(self._transform(index))
+
+
+class LoaderCountersTest(unittest.TestCase):
+
+    def test_should_count_every_stage_in_the_main_process(self):
+        counters = LoaderCounters()
+        batches = list(InstrumentedDataLoader(ArrayDataset(8), 4, counters=counters))
+        summary = counters.summary()
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(summary["Decode"][0], 8)
+        self.assertEqual(summary["Decode"][2] * 1024 ** 2, 8 * 16 * 4)
+        self.assertEqual(summary["Augment"][0], 8)
+        self.assertEqual(summary["Collate"][0], 2)
+        self.assertEqual(summary["Wait"][0], 2)
+
+    def test_should_aggregate_the_counters_of_the_workers(self):
+        counters = LoaderCounters()
+        list(InstrumentedDataLoader(ArrayDataset(8), 2, num_workers=2, counters=counters))
+        snapshot = counters.snapshot()
+        decode = counters.stages.index("Decode")
+
+        self.assertEqual(snapshot[0, decode, 0], 0)
+        self.assertEqual(snapshot[1:3, decode, 0].sum(), 8)
+        self.assertEqual(counters.summary()["Wait"][0], 4)
+
+    def test_should_reset_the_counters(self):
+        counters = LoaderCounters()
+        list(InstrumentedDataLoader(ArrayDataset(4), 2, counters=counters))
+        counters.reset()
+
+        self.assertEqual(counters.summary(), {})
@@ -0,0 +1,50 @@
+import unittest
+
+import torch
+
+from deepNormalize.inputs.pools import ImagePool
+
+
+class ImagePoolTest(unittest.TestCase):
+
+    @staticmethod
+    def _batch(first_id: int, batch_size: int):
+        # Every image, target and dataset id carries the same identifier to check they stay together.
+        ids = torch.arange(first_id, first_id + batch_size)
+        xs = ids.float().view(-1, 1, 1, 1, 1).expand(-1, 1, 4, 4, 4).contiguous()
+        ys = ids.view(-1, 1, 1, 1, 1).expand(-1, 1, 4, 4, 4).contiguous()
+        return xs, [ys, ids]
+
+    def test_should_return_images_unchanged_until_full(self):
+        pool = ImagePool(size=8)
+        xs, (ys, ids) = self._batch(0, 8)
+
+        pooled_xs, (pooled_ys, pooled_ids) = pool.query((xs, [ys, ids]))
+
+        torch.testing.assert_close(pooled_xs, xs)
+        torch.testing.assert_close(pooled_ids, ids)
+        self.assertTrue(pool.is_full)
+
+    def test_should_swap_images_with_their_targets_once_full(self):
+        torch.manual_seed(0)
+        pool = ImagePool(size=8)
+        pool.query(self._batch(0, 8))
+
+        for first_id in range(8, 200, 8):
+            xs, (ys, ids) = self._batch(first_id, 8)
+            pooled_xs, (pooled_ys, pooled_ids) = pool.query((xs, [ys, ids]))
+
+            torch.testing.assert_close(pooled_xs[:, 0, 0, 0, 0], pooled_ids.float())
+            torch.testing.assert_close(pooled_ys[:, 0, 0, 0, 0], pooled_ids)
+            self.assertEqual(len(set(pooled_ids.tolist())), 8)
+
+        # About half of the queried images come from the pool.
+        self.assertLess(len(set(pool._dataset_ids.tolist()) & set(range(8))), 8)
+
+    def test_should_not_pool_with_zero_size(self):
+        pool = ImagePool(size=0)
+        xs, (ys, ids) = self._batch(0, 4)
+
+        pooled_xs, _ = pool.query((xs, [ys, ids]))
+
+        torch.testing.assert_close(pooled_xs, xs)
@@ -0,0 +1,82 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from kerosene.loggers.visdom import PlotType
+
+from deepNormalize.loggers.metrics import MetricsStore
+
+
+class MetricsStoreTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "metrics.sqlite")
+        self._store = MetricsStore(self._path, run="run_1", batch_size=4)
+
+    def tearDown(self) -> None:
+        self._store.close()
+        self._directory.cleanup()
+
+    def test_should_compare_a_scalar_across_runs(self):
+        for epoch in range(3):
+            self._store.log_scalar(epoch, epoch * 10, "Phase.TRAINING", "Total Loss", 1.0 / (epoch + 1))
+        self._store.flush()
+        other_store = MetricsStore(self._path, run="run_2")
+        for epoch in range(2):
+            other_store.log_scalar(epoch, epoch * 10, "Phase.TRAINING", "Total Loss", 2.0 * (epoch + 1))
+        other_store.close()
+
+        comparison = self._store.compare("Total Loss")
+
+        self.assertEqual(self._store.runs(), ["run_1", "run_2"])
+        self.assertEqual(list(comparison.columns), ["run_1", "run_2"])
+        np.testing.assert_allclose(comparison["run_1"].values, [1.0, 0.5, 1.0 / 3])
+        np.testing.assert_allclose(comparison["run_2"].values[:2], [2.0, 4.0])
+        self.assertTrue(np.isnan(comparison["run_2"].values[2]))
+
+    def test_should_read_back_histograms_and_confusion_matrices(self):
+        counts, bin_edges = np.histogram(np.random.rand(100), bins=8, range=(0.0, 1.0))
+        self._store.log_histogram(0, 100, "Phase.TRAINING", "Input Intensity Histogram", counts, bin_edges)
+        self._store.log_confusion_matrix(0, 120, "Phase.VALIDATION", "Confusion Matrix", np.eye(4))
+        self._store.flush()
+
+        histograms = self._store.histograms("Input Intensity Histogram")
+        confusion_matrices = self._store.confusion_matrices("Confusion Matrix", phase="Phase.VALIDATION")
+
+        self.assertEqual(len(histograms), 1)
+        np.testing.assert_array_equal(histograms[0][5], counts)
+        np.testing.assert_allclose(histograms[0][6], bin_edges)
+        self.assertEqual(len(confusion_matrices), 1)
+        np.testing.assert_array_equal(confusion_matrices[0][5], np.eye(4))
+
+    def test_should_replay_a_run_to_visdom(self):
+        self._store.log_scalar(0, 10, "Phase.TRAINING", "Total Loss", 1.0)
+        self._store.log_scalar(1, 20, "Phase.TRAINING", "Total Loss", 0.5)
+        self._store.log_confusion_matrix(1, 20, "Phase.TEST", "Confusion Matrix", np.eye(4))
+        self._store.flush()
+        sent = []
+
+        self._store.replay(sent.extend, "run_1")
+
+        self.assertEqual([visdom_datum.plot_type for visdom_datum in sent],
+                         [PlotType.LINE_PLOT, PlotType.LINE_PLOT, PlotType.HEATMAP_PLOT])
+        self.assertEqual([visdom_datum.y for visdom_datum in sent[:2]], [[1.0], [0.5]])
@@ -0,0 +1,130 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import json
+import threading
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from kerosene.loggers.visdom import PlotType, PlotFrequency
+from kerosene.loggers.visdom.data import VisdomData
+
+from deepNormalize.loggers.visdom import AsyncVisdomLogger
+
+
+class StubVisdomServer(HTTPServer):
+    """
+    Local server recording the windows posted to it, answering after `delay` seconds.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), StubVisdomRequestHandler)
+        self.delay = delay
+        self.updates = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/events".format(self.server_address[1])
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubVisdomRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        updates = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.delay)
+        self.server.updates.extend(updates)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpVisdomLogger(object):
+    """
+    Minimal Visdom logger sending one request per call.
+    """
+
+    def __init__(self, url):
+        self._url = url
+
+    def __call__(self, visdom_data):
+        body = json.dumps([{"win": visdom_datum.variable_name, "y": visdom_datum.y} for visdom_datum in visdom_data])
+        urllib.request.urlopen(urllib.request.Request(self._url, data=body.encode("utf-8"),
+                                                      headers={"Content-Type": "application/json"})).read()
+
+
+class AsyncVisdomLoggerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._server = StubVisdomServer()
+
+    def tearDown(self) -> None:
+        self._server.stop()
+
+    @staticmethod
+    def _line(step):
+        return VisdomData("Trainer", "Loss", PlotType.LINE_PLOT, PlotFrequency.EVERY_EPOCH, [step], [step])
+
+    @staticmethod
+    def _image(step):
+        return VisdomData("Trainer", "Images", PlotType.IMAGES_PLOT, PlotFrequency.EVERY_EPOCH, None, [step])
+
+    def test_logging_should_not_wait_on_the_server(self):
+        self._server.delay = 0.2
+        logger = AsyncVisdomLogger(HttpVisdomLogger(self._server.url), flush_interval=0.01)
+
+        start = time.time()
+        for step in range(20):
+            logger(self._line(step))
+        elapsed = time.time() - start
+        logger.close()
+
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual([update["y"] for update in self._server.updates], [[step] for step in range(20)])
+
+    def test_should_only_send_the_latest_update_of_an_image_window(self):
+        logger = AsyncVisdomLogger(HttpVisdomLogger(self._server.url), flush_interval=60)
+
+        for step in range(10):
+            logger([self._image(step), self._line(step)])
+        logger.flush()
+
+        self.assertEqual([update["y"] for update in self._server.updates if update["win"] == "Images"], [[9]])
+        self.assertEqual(len([update for update in self._server.updates if update["win"] == "Loss"]), 10)
+        logger.close()
+
+    def test_should_downsample_line_plots_under_backpressure(self):
+        logger = AsyncVisdomLogger(HttpVisdomLogger(self._server.url), flush_interval=60, max_pending=4)
+
+        for step in range(10):
+            logger(self._line(step))
+        self.assertLessEqual(logger.nb_pending, 4)
+        logger.close()
+
+        steps = [update["y"][0] for update in self._server.updates]
+        self.assertEqual(len(steps) + logger.dropped, 10)
+        self.assertEqual(steps[-1], 9)
+        self.assertEqual(steps, sorted(steps))
@@ -0,0 +1,123 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import numpy as np
+import torch
+from ignite.metrics import Accuracy, Precision, Recall
+
+from deepNormalize.metrics.gauges import PerDatasetConfusionMatrix, IntensityHistogramGauge, update_segmenter_metrics
+
+
+class PerDatasetConfusionMatrixTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self._pred = torch.randint(0, 4, (6, 8, 8, 8))
+        self._target = torch.randint(0, 4, (6, 8, 8, 8))
+        self._dataset_ids = torch.tensor([0, 2, 0, 1, 2, 2])
+
+    @staticmethod
+    def _confusion_matrix(pred, target):
+        counts = torch.zeros((4, 4), dtype=torch.long)
+        for t, p in zip(target.flatten().tolist(), pred.flatten().tolist()):
+            counts[t, p] += 1
+        return counts
+
+    def test_should_match_a_confusion_matrix_per_dataset(self):
+        gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        gauge.update(self._pred[:3], self._target[:3], self._dataset_ids[:3])
+        gauge.update(self._pred[3:], self._target[3:], self._dataset_ids[3:])
+
+        for dataset_id in range(3):
+            mask = self._dataset_ids == dataset_id
+            torch.testing.assert_close(gauge.compute(dataset_id),
+                                   self._confusion_matrix(self._pred[mask], self._target[mask]))
+        torch.testing.assert_close(gauge.compute(), self._confusion_matrix(self._pred, self._target))
+
+    def test_dice_should_be_perfect_on_identical_labels(self):
+        gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        counts = gauge.update(self._target, self._target, self._dataset_ids)
+
+        torch.testing.assert_close(PerDatasetConfusionMatrix.dice(counts), torch.ones((3, 4), dtype=torch.float64))
+
+    def test_metrics_should_match_the_ignite_metrics(self):
+        pred = torch.randn((6, 4, 8, 8, 8))
+        gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        gauge.update(torch.argmax(pred, dim=1), self._target, self._dataset_ids)
+        metrics = PerDatasetConfusionMatrix.metrics(gauge.compute())
+
+        for name, metric in [("Accuracy", Accuracy()), ("Precision", Precision(average=True)),
+                             ("Recall", Recall(average=True))]:
+            metric.update((pred, self._target))
+            self.assertAlmostEqual(metrics[name].item(), metric.compute())
+        self.assertAlmostEqual(metrics["Dice"].item(),
+                               PerDatasetConfusionMatrix.dice(gauge.compute())[1:].mean().item())
+
+    def test_should_compute_zeros_before_any_update(self):
+        gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+
+        torch.testing.assert_close(gauge.compute(), torch.zeros((4, 4), dtype=torch.long))
+
+    def test_should_update_only_the_configured_segmenter_metrics(self):
+        gauge = PerDatasetConfusionMatrix(num_datasets=3, num_classes=4)
+        updated = {}
+
+        self.assertIsNone(update_segmenter_metrics(updated.__setitem__, ["Dice", "Recall"], gauge))
+        gauge.update(self._pred, self._target, self._dataset_ids)
+        metrics = update_segmenter_metrics(updated.__setitem__, ["Dice", "Recall"], gauge)
+
+        self.assertEqual(updated, {"Dice": metrics["Dice"].item(), "Recall": metrics["Recall"].item()})
+
+
+class IntensityHistogramGaugeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        # Bin centers, away from the edges numpy and the gauge could round differently.
+        self._images = (torch.randint(0, 16, (6, 1, 8, 8, 8)).float() + 0.5) / 16
+        self._labels = torch.randint(0, 4, (6, 1, 8, 8, 8))
+        self._dataset_ids = torch.tensor([0, 2, 0, 1, 2, 2])
+
+    def test_should_match_numpy_histograms_per_dataset_and_class(self):
+        gauge = IntensityHistogramGauge(num_datasets=3, num_classes=4, bins=16)
+        gauge.update(self._images[:3], self._labels[:3], self._dataset_ids[:3])
+        gauge.update(self._images[3:], self._labels[3:], self._dataset_ids[3:])
+
+        for dataset_id in range(3):
+            for class_id in range(4):
+                mask = (self._dataset_ids.view(-1, 1, 1, 1, 1) == dataset_id) & (self._labels == class_id)
+                expected, expected_edges = np.histogram(self._images[mask].numpy(), bins=16, range=(0.0, 1.0))
+                counts, edges = gauge.histogram(dataset_id, class_id)
+                np.testing.assert_array_equal(counts, expected)
+                np.testing.assert_allclose(edges, expected_edges)
+
+        np.testing.assert_array_equal(gauge.histogram()[0],
+                                      np.histogram(self._images.numpy(), bins=16, range=(0.0, 1.0))[0])
+
+    def test_should_count_out_of_range_values_in_the_edge_bins(self):
+        gauge = IntensityHistogramGauge(num_datasets=1, num_classes=1, bins=4)
+        gauge.update(torch.tensor([[-1.0, 0.1, 1.0, 3.0]]), torch.zeros((1, 4)), torch.tensor([0]))
+
+        np.testing.assert_array_equal(gauge.histogram()[0], np.array([2, 0, 0, 2]))
+
+    def test_should_compute_zeros_after_reset(self):
+        gauge = IntensityHistogramGauge(num_datasets=3, num_classes=4, bins=16)
+        gauge.update(self._images, self._labels, self._dataset_ids)
+        gauge.reset()
+
+        np.testing.assert_array_equal(gauge.compute(), np.zeros((3, 4, 16)))
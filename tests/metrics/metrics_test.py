@@ -0,0 +1,111 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import numpy as np
+import torch
+from scipy.spatial.distance import directed_hausdorff
+
+from deepNormalize.metrics.metrics import surface_distances, mean_hausdorff_distance, _surface, batch_histogram, \
+    per_example_surface_distances, volume_hausdorff_distance
+
+
+class SurfaceDistancesTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._seg_pred = torch.zeros((2, 2, 16, 16, 16))
+        self._target = torch.zeros((2, 2, 16, 16, 16))
+        self._seg_pred[0, 1, 2:8, 2:8, 2:8] = 1
+        self._target[0, 1, 3:10, 2:8, 4:9] = 1
+        self._seg_pred[1, 1, 5:12, 5:12, 5:12] = 1
+        self._target[1, 1, 6:12, 4:12, 5:10] = 1
+        self._seg_pred[:, 0] = 1 - self._seg_pred[:, 1]
+        self._target[:, 0] = 1 - self._target[:, 1]
+
+    def _brute_force_hausdorff(self, seg_pred, target):
+        seg_pred_points = np.argwhere(_surface(seg_pred.numpy().astype(bool)))
+        target_points = np.argwhere(_surface(target.numpy().astype(bool)))
+        return max(directed_hausdorff(seg_pred_points, target_points)[0],
+                   directed_hausdorff(target_points, seg_pred_points)[0])
+
+    def test_hausdorff_should_match_brute_force_surface_distance(self):
+        expected = np.array([[self._brute_force_hausdorff(self._seg_pred[example, channel],
+                                                          self._target[example, channel]) for channel in range(2)]
+                             for example in range(2)]).mean(axis=0)
+
+        np.testing.assert_allclose(mean_hausdorff_distance(self._seg_pred, self._target), expected)
+
+    def test_volume_hausdorff_should_match_brute_force_volume_distance(self):
+        seg_pred, target = self._seg_pred[:, 1].long().numpy(), self._target[:, 1].long().numpy()
+        seg_pred[1, 0:3, 0:3, 0:3], target[1, 13:16, 13:16, 0:3] = 2, 2
+
+        for volume in range(2):
+            expected = [self._brute_force_hausdorff(torch.from_numpy(seg_pred[volume] == class_id),
+                                                    torch.from_numpy(target[volume] == class_id))
+                        for class_id in range(3)]
+
+            np.testing.assert_allclose(volume_hausdorff_distance(seg_pred[volume], target[volume], num_classes=3),
+                                       expected)
+
+    def test_should_be_zero_on_identical_segmentations(self):
+        hausdorff, hausdorff_95, average = surface_distances(self._target, self._target)
+
+        np.testing.assert_array_equal(hausdorff, np.zeros((2,)))
+        np.testing.assert_array_equal(hausdorff_95, np.zeros((2,)))
+        np.testing.assert_array_equal(average, np.zeros((2,)))
+
+    def test_should_order_hausdorff_percentile_and_average_distances(self):
+        hausdorff, hausdorff_95, average = surface_distances(self._seg_pred, self._target, num_workers=1)
+
+        self.assertTrue(np.all(hausdorff >= hausdorff_95))
+        self.assertTrue(np.all(hausdorff_95 >= 0))
+        self.assertTrue(np.all(hausdorff >= average))
+
+    def test_per_example_distances_should_average_to_the_batch_distances(self):
+        distances = per_example_surface_distances(self._seg_pred, self._target)
+
+        self.assertEqual(distances.shape, (2, 2, 3))
+        np.testing.assert_allclose(distances.mean(axis=0),
+                                   np.stack(surface_distances(self._seg_pred, self._target), axis=1))
+        np.testing.assert_allclose(distances[1:, :, 0].mean(axis=0),
+                                   mean_hausdorff_distance(self._seg_pred[1:], self._target[1:]))
+
+
+class BatchHistogramTest(unittest.TestCase):
+
+    def _histc(self, images, bins):
+        return torch.stack([torch.histc(image, bins=bins) for image in images])
+
+    def test_should_match_histc_on_every_image(self):
+        images = torch.randint(0, 256, (4, 1000)).float() * torch.tensor([[1.0], [0.5], [2.0], [0.25]])
+
+        torch.testing.assert_close(batch_histogram(images, bins=256), self._histc(images, bins=256))
+
+    def test_should_match_histc_on_random_intensities(self):
+        torch.manual_seed(0)
+        images = torch.randn(8, 32 * 32 * 32)
+
+        histograms = batch_histogram(images, bins=256)
+
+        # Values lying exactly on a bin edge may fall on either side depending on the rounding order.
+        self.assertLessEqual((histograms - self._histc(images, bins=256)).abs().sum(dim=1).max().item(), 2)
+        torch.testing.assert_close(histograms.sum(dim=1), torch.full((8,), 32.0 * 32 * 32))
+
+    def test_should_match_histc_on_constant_images(self):
+        images = torch.cat((torch.zeros(1, 100), torch.full((1, 100), 3.0)), dim=0)
+
+        torch.testing.assert_close(batch_histogram(images, bins=256), self._histc(images, bins=256))
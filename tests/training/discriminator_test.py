@@ -0,0 +1,73 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import torch
+
+from deepNormalize.training.discriminator import forward_real_fake
+
+
+class Discriminator(object):
+
+    def __init__(self, norm_layer):
+        self.model = torch.nn.Sequential(torch.nn.Conv3d(1, 4, 3, padding=1), norm_layer)
+
+    def forward(self, x):
+        x_conv1 = self.model(x)
+        return x_conv1.mean(dim=(2, 3, 4)), x_conv1, x_conv1, x_conv1, x_conv1
+
+
+class ForwardRealFakeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self._real = torch.rand(2, 1, 8, 8, 8)
+        self._fake = torch.rand(2, 1, 8, 8, 8) + 1.0
+
+    def _separate(self, D):
+        pred_real, x_conv1, _, _, _ = D.forward(self._real)
+        pred_fake, _, _, _, _ = D.forward(self._fake)
+        return pred_real, pred_fake, x_conv1
+
+    def test_fused_forward_should_match_separate_forwards_with_group_norm(self):
+        D = Discriminator(torch.nn.GroupNorm(2, 4))
+        expected_real, expected_fake, expected_fm = self._separate(D)
+
+        pred_real, pred_fake, (x_conv1, _, _, _) = forward_real_fake(D, self._real, self._fake)
+
+        torch.testing.assert_close(pred_real, expected_real)
+        torch.testing.assert_close(pred_fake, expected_fake)
+        torch.testing.assert_close(x_conv1, expected_fm)
+
+    def test_should_preserve_batch_norm_statistics(self):
+        D = Discriminator(torch.nn.BatchNorm3d(4))
+        expected_real, expected_fake, _ = self._separate(D)
+
+        pred_real, pred_fake, _ = forward_real_fake(D, self._real, self._fake, preserve_batch_norm_statistics=True)
+
+        torch.testing.assert_close(pred_real, expected_real)
+        torch.testing.assert_close(pred_fake, expected_fake)
+
+    def test_should_fuse_batch_norm_in_eval_mode(self):
+        D = Discriminator(torch.nn.BatchNorm3d(4))
+        D.model.eval()
+        expected_real, expected_fake, _ = self._separate(D)
+
+        pred_real, pred_fake, _ = forward_real_fake(D, self._real, self._fake)
+
+        torch.testing.assert_close(pred_real, expected_real)
+        torch.testing.assert_close(pred_fake, expected_fake)
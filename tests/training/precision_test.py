@@ -0,0 +1,98 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import torch
+
+from deepNormalize.config.types import PrecisionType
+from deepNormalize.training.precision import PrecisionPolicy
+
+
+class LinearTrainer(object):
+
+    def __init__(self):
+        torch.manual_seed(0)
+        self.model = torch.nn.Linear(4, 1)
+        self.optimizer = torch.optim.SGD(self.model.parameters(), lr=0.1)
+
+    def zero_grad(self):
+        self.optimizer.zero_grad()
+
+    def step(self):
+        self.optimizer.step()
+
+
+class RecordAutocast(torch.autograd.Function):
+    enabled = None
+
+    @staticmethod
+    def forward(ctx, inputs):
+        return inputs.clone()
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        RecordAutocast.enabled = torch.is_autocast_enabled("cpu")
+        return grad_output
+
+
+class PrecisionPolicyTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._inputs = torch.rand(8, 4)
+        self._target = torch.rand(8, 1)
+
+    def _train(self, model_trainer, policy, micro_batches):
+        for inputs, target in zip(self._inputs.chunk(micro_batches), self._target.chunk(micro_batches)):
+            policy.zero_grad(model_trainer)
+            loss = torch.nn.functional.mse_loss(model_trainer.model(inputs), target)
+            policy.backward(loss)
+            policy.step(model_trainer)
+            policy.update()
+
+    def test_accumulated_micro_batches_should_match_full_batch(self):
+        full, accumulated = LinearTrainer(), LinearTrainer()
+
+        self._train(full, PrecisionPolicy(PrecisionType.FP32, "cpu"), 1)
+        policy = PrecisionPolicy(PrecisionType.FP32, "cpu", {accumulated: 4})
+        self._train(accumulated, policy, 4)
+
+        torch.testing.assert_close(accumulated.model.weight, full.model.weight)
+        self.assertEqual(policy.accumulated(accumulated), 0)
+
+    def test_flush_should_step_partial_accumulation(self):
+        model_trainer = LinearTrainer()
+        weight = model_trainer.model.weight.clone()
+        policy = PrecisionPolicy(PrecisionType.FP32, "cpu", {model_trainer: 4})
+
+        self._train(model_trainer, policy, 2)
+        torch.testing.assert_close(model_trainer.model.weight, weight)
+
+        policy.flush()
+        self.assertFalse(torch.allclose(model_trainer.model.weight, weight))
+
+    def test_should_not_accumulate_with_fp16(self):
+        self.assertRaises(ValueError, PrecisionPolicy, PrecisionType.FP16, "cuda", {LinearTrainer(): 2})
+
+    def test_should_run_backward_outside_autocast(self):
+        model_trainer = LinearTrainer()
+        policy = PrecisionPolicy(PrecisionType.BF16, "cpu")
+
+        with policy.autocast():
+            loss = RecordAutocast.apply(model_trainer.model(self._inputs)).float().mean()
+            policy.backward(loss)
+
+        self.assertFalse(RecordAutocast.enabled)
@@ -0,0 +1,72 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import torch
+
+from deepNormalize.training.sampler import Sampler
+
+
+class SamplerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        ids = torch.arange(6)
+        self._inputs = [ids.float().view(-1, 1, 1, 1, 1).expand(-1, 1, 2, 2, 2).contiguous(),
+                        -ids.float().view(-1, 1, 1, 1, 1).expand(-1, 1, 2, 2, 2).contiguous() - 100]
+        self._targets = [ids.view(-1, 1, 1, 1, 1).expand(-1, 1, 2, 2, 2).contiguous(), ids]
+
+    def test_should_return_views_of_the_augmented_inputs(self):
+        inputs, targets = Sampler(1.0)(self._inputs, self._targets)
+
+        self.assertIs(inputs[1], self._inputs[1])
+        self.assertIs(targets[1][0], self._targets[0])
+        self.assertIs(targets[1][1], self._targets[1])
+
+    def test_should_return_views_of_the_non_augmented_inputs(self):
+        inputs, targets = Sampler(0.0)(self._inputs, self._targets)
+
+        self.assertIs(inputs[1], self._inputs[0])
+        self.assertIs(inputs[0], self._inputs[0])
+
+    def test_should_not_overwrite_the_previous_batch(self):
+        torch.manual_seed(0)
+        sampler = Sampler(0.5)
+
+        previous_inputs, previous_targets = sampler(self._inputs, self._targets)
+        expected_inputs, expected_targets = previous_inputs[1].clone(), previous_targets[1][1].clone()
+        sampler(self._inputs, self._targets)
+
+        torch.testing.assert_close(previous_inputs[1], expected_inputs)
+        torch.testing.assert_close(previous_targets[1][1], expected_targets)
+
+    def test_should_mix_inputs_with_their_targets(self):
+        torch.manual_seed(0)
+        sampler = Sampler(0.33)
+
+        inputs, targets = sampler(self._inputs, self._targets)
+        buffer = inputs[1]
+        inputs, targets = sampler(self._inputs, self._targets)
+        self.assertIsNot(inputs[1], buffer)
+        inputs, targets = sampler(self._inputs, self._targets)
+
+        self.assertIs(inputs[1], buffer)
+        ids = targets[1][1]
+        self.assertEqual(sorted(ids.tolist()), list(range(6)))
+        torch.testing.assert_close(targets[1][0][:, 0, 0, 0, 0], ids)
+        # The first ceil(6 * 0.33) = 2 patches are augmented.
+        torch.testing.assert_close(inputs[1][:2, 0, 0, 0, 0], -ids[:2].float() - 100)
+        torch.testing.assert_close(inputs[1][2:, 0, 0, 0, 0], ids[2:].float())
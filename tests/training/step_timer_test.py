@@ -0,0 +1,77 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from deepNormalize.training.step_timer import StepTimer
+
+
+class StepTimerTest(unittest.TestCase):
+
+    def _run_steps(self, step_timer, phase, steps):
+        for step in steps:
+            step_timer.begin(phase, step)
+            time.sleep(0.002)
+            step_timer.lap("Generator")
+            step_timer.lap("Segmenter")
+            step_timer.end()
+
+    def test_should_publish_percentiles_of_every_section(self):
+        step_timer = StepTimer(window=10)
+        self._run_steps(step_timer, "Training", range(20))
+        custom_variables = {}
+        step_timer.publish(custom_variables)
+
+        self.assertIn("Training Generator Time", custom_variables)
+        self.assertIn("Training Segmenter Time", custom_variables)
+        self.assertIn("Training Step Time", custom_variables)
+        self.assertEqual(len(custom_variables["Training Generator Time"]), 3)
+        self.assertGreaterEqual(custom_variables["Training Generator Time"][0], 2.0)
+        self.assertLessEqual(custom_variables["Training Generator Time"][0],
+                             custom_variables["Training Generator Time"][2])
+
+    def test_should_charge_data_wait_within_a_phase_only(self):
+        step_timer = StepTimer()
+        self._run_steps(step_timer, "Training", range(2))
+        self._run_steps(step_timer, "Validation", range(1))
+        percentiles = step_timer.percentiles()
+
+        self.assertIn(("Training", "Data Wait"), percentiles)
+        self.assertNotIn(("Validation", "Data Wait"), percentiles)
+
+    def test_should_not_time_when_disabled(self):
+        step_timer = StepTimer(enabled=False)
+        self._run_steps(step_timer, "Training", range(2))
+
+        self.assertEqual(step_timer.percentiles(), {})
+
+    def test_should_write_a_chrome_trace_of_the_step_window(self):
+        with tempfile.TemporaryDirectory() as save_folder:
+            path = os.path.join(save_folder, "trace.json")
+            step_timer = StepTimer(trace_steps=(2, 4), trace_path=path)
+            self._run_steps(step_timer, "Training", range(6))
+
+            with open(path) as trace:
+                events = json.load(trace)["traceEvents"]
+
+        self.assertEqual({event["args"]["step"] for event in events}, {2, 3})
+        self.assertIn("Generator", [event["name"] for event in events])
+        self.assertTrue(all(event["ph"] == "X" and event["dur"] >= 0 for event in events))
@@ -2,6 +2,7 @@ import unittest
 
 import matplotlib.pyplot as plt
 import numpy as np
+import torch
 from samitorch.inputs.images import Modality
 from samitorch.inputs.transformers import ToNumpyArray, PadToPatchShape, ToNDTensor
 from samitorch.utils.files import extract_file_paths
@@ -9,7 +10,8 @@ from torchvision.transforms import Compose
 
 from deepNormalize.inputs.datasets import iSEGSegmentationFactory, iSEGSliceDatasetFactory, MRBrainSSegmentationFactory, \
     ABIDESegmentationFactory
-from deepNormalize.utils.image_slicer import ImageReconstructor
+from deepNormalize.inputs.images import SliceType
+from deepNormalize.utils.image_slicer import ImageReconstructor, ImageSlicer, axial_plane, upsample_plane
 from deepNormalize.utils.utils import natural_sort
 
 
@@ -111,3 +113,58 @@ class SlicedImageReconstructorTest(unittest.TestCase):
         plt.imshow(img[150, :, :], cmap="gray")
         plt.show()
         np.testing.assert_array_almost_equal(img, self._image.squeeze(0), 6)
+
+
+class WeightedImageReconstructorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._image = np.random.rand(1, 64, 64, 48)
+
+    def test_should_output_original_image_with_weighted_fusion(self):
+        for fusion in ["uniform", "gaussian", "cosine"]:
+            reconstructor = ImageReconstructor([64, 64, 48], [1, 32, 32, 16], [1, 8, 8, 8], test_image=self._image,
+                                               inference_step=[1, 16, 16, 8], fusion=fusion)
+            img = reconstructor.reconstruct_from_patches_3d()
+            np.testing.assert_array_almost_equal(img, self._image.squeeze(0), 6)
+
+    def test_should_cover_the_border_with_a_step_not_dividing_the_image(self):
+        reconstructor = ImageReconstructor([64, 64, 48], [1, 32, 32, 16], [1, 8, 8, 8], test_image=self._image,
+                                           inference_step=[1, 20, 20, 12])
+        img = reconstructor.reconstruct_from_patches_3d()
+        self.assertFalse(np.isnan(img).any())
+        np.testing.assert_array_almost_equal(img, self._image.squeeze(0), 6)
+
+
+class AxialPlaneTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self._volume = torch.rand(2, 3, 8, 6, 6)
+        self._labels = torch.randint(0, 4, (2, 1, 8, 6, 6)).float()
+
+    def test_should_match_slice_of_trilinear_upsampled_volume(self):
+        for scale_factor in [5, 10, 20]:
+            upsampled = torch.nn.functional.interpolate(self._volume, scale_factor=scale_factor, mode="trilinear",
+                                                        align_corners=True)
+
+            slice = upsample_plane(axial_plane(self._volume, scale_factor), scale_factor)
+
+            np.testing.assert_array_almost_equal(slice.numpy(), upsampled[:, :, upsampled.shape[2] // 2].numpy(), 5)
+
+    def test_should_match_slice_of_nearest_upsampled_volume(self):
+        upsampled = torch.nn.functional.interpolate(self._labels, scale_factor=5, mode="nearest")
+
+        slice = upsample_plane(axial_plane(self._labels, 5, mode="nearest"), 5, mode="nearest")
+
+        np.testing.assert_array_equal(slice.numpy(), upsampled[:, :, upsampled.shape[2] // 2].numpy())
+
+    def test_should_normalize_slice_with_volume_range(self):
+        upsampled = torch.nn.functional.interpolate(self._volume, scale_factor=5, mode="trilinear",
+                                                    align_corners=True).numpy()
+        slice = upsample_plane(axial_plane(self._volume, 5), 5).unsqueeze(2).numpy()
+
+        expected = ImageSlicer().get_slice(SliceType.AXIAL, upsampled, upsampled.shape[2] // 2)
+        actual = ImageSlicer().get_slice(SliceType.AXIAL, slice, 0,
+                                         value_range=(self._volume.min().item(), self._volume.max().item()))
+
+        np.testing.assert_array_almost_equal(actual, expected, 5)
@@ -0,0 +1,51 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import gzip
+import os
+import tempfile
+import unittest
+
+import nibabel as nib
+import numpy as np
+
+from deepNormalize.utils.nifti_writer import NiftiWriter
+
+
+class NiftiWriterTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._folder = tempfile.mkdtemp()
+        self._image = np.random.rand(64, 64, 48)
+
+    def test_should_write_compressed_image_with_multiple_gzip_members(self):
+        writer = NiftiWriter(compression_level=1, chunk_size=64 * 1024)
+        path = writer.write(self._image, os.path.join(self._folder, "image.nii.gz"))
+        writer.close()
+
+        with gzip.open(path, "rb") as file:
+            file.read()
+        np.testing.assert_array_equal(nib.load(path).get_fdata(), self._image)
+        self.assertEqual(len(writer.latencies()), 1)
+
+    def test_should_write_uncompressed_image(self):
+        writer = NiftiWriter(compression_level=None)
+        path = writer.write(self._image, os.path.join(self._folder, "image.nii.gz"))
+        writer.flush()
+
+        self.assertTrue(path.endswith(".nii"))
+        np.testing.assert_array_equal(nib.load(path).get_fdata(), self._image)
+        writer.close()
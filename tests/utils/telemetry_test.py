@@ -0,0 +1,57 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+
+import queue
+import sys
+import time
+import unittest
+
+import torch
+
+from deepNormalize.utils.telemetry import TelemetrySampler, queue_depth
+
+
+class TelemetrySamplerTest(unittest.TestCase):
+
+    def test_should_publish_samples_from_the_background_thread(self):
+        sampler = TelemetrySampler(device_index=0, interval=0.01)
+        time.sleep(0.1)
+        custom_variables = {}
+        sampler.publish(custom_variables)
+        sampler.close()
+
+        self.assertIn("CPU Utilization", custom_variables)
+        self.assertGreaterEqual(custom_variables["CPU Utilization"][0], 0.0)
+        if sys.platform.startswith("linux"):
+            self.assertGreater(custom_variables["Process Memory"][0], 0.0)
+        self.assertEqual("GPU 0 Memory" in custom_variables, torch.cuda.is_available())
+
+    def test_should_not_sample_when_disabled(self):
+        sampler = TelemetrySampler(interval=0)
+        custom_variables = {}
+        sampler.publish(custom_variables)
+        sampler.close()
+
+        self.assertEqual(custom_variables, {})
+
+    def test_queue_depth_should_only_be_known_with_a_live_iterator(self):
+        data_loader = torch.utils.data.DataLoader(list(range(4)))
+        self.assertIsNone(queue_depth(data_loader))
+
+        data_loader._iterator = type("Iterator", (object,), {"_data_queue": queue.Queue()})()
+        data_loader._iterator._data_queue.put(0)
+        self.assertEqual(queue_depth(data_loader), 1)
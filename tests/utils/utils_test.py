@@ -0,0 +1,60 @@
+#  -*- coding: utf-8 -*-
+#  Copyright 2019 Pierre-Luc Delisle. All Rights Reserved.
+#  #
+#  Licensed under the MIT License;
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  #
+#      https://opensource.org/licenses/MIT
+#  #
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ==============================================================================
+
+import unittest
+
+import numpy as np
+import torch
+
+from deepNormalize.utils.utils import histogram, construct_class_histogram, construct_single_histogram
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._values = np.random.randint(0, 100, size=(1000,)).astype(np.float32)
+
+    def test_should_match_numpy_histogram(self):
+        counts, edges = histogram(torch.tensor(self._values), bins=128)
+        expected_counts, expected_edges = np.histogram(self._values, bins=128)
+
+        np.testing.assert_array_almost_equal(edges, expected_edges, 4)
+        np.testing.assert_array_equal(counts, expected_counts)
+
+    def test_should_drop_values_outside_of_range(self):
+        counts, _ = histogram(torch.tensor(self._values), bins=10, value_range=(0.0, 49.0))
+
+        self.assertEqual(counts.sum(), (self._values <= 49).sum())
+
+    def test_should_handle_empty_values(self):
+        counts, edges = histogram(torch.tensor([]), bins=128)
+
+        np.testing.assert_array_equal(counts, np.zeros((128,)))
+        self.assertEqual((edges[0], edges[-1]), (0.0, 1.0))
+
+
+class ConstructHistogramTest(unittest.TestCase):
+
+    def test_should_render_rgb_images_in_memory(self):
+        inputs = torch.rand(4, 1, 8, 8, 8)
+        target = [torch.randint(0, 4, (4, 1, 8, 8, 8)), torch.tensor([0, 1, 2, 0])]
+
+        image = construct_class_histogram(inputs, target, inputs * 2)
+
+        self.assertEqual(image.dtype, np.uint8)
+        self.assertEqual(image.shape[0], 3)
+        self.assertEqual(construct_single_histogram(np.random.rand(8, 8, 8), np.random.rand(8, 8, 8)).shape,
+                         image.shape)